@@ -0,0 +1,28 @@
+"""Rendered certificate PDFs, served from the content-addressed store."""
+import os
+import re
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from ..core.config import settings
+from ..services.certificate_pdf import store_path
+
+router = APIRouter(prefix="/certificates", tags=["Certificates"])
+
+DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+@router.get("/{digest}.pdf")
+async def certificate_pdf(digest: str) -> FileResponse:
+    """A rendered certificate; files never change, so clients may cache them for good."""
+    if not DIGEST.fullmatch(digest):
+        raise HTTPException(status_code=404)
+    path = store_path(settings.certificate_store_path, digest)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404)
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
@@ -0,0 +1,45 @@
+"""Streaming exports of progress data as NDJSON or CSV."""
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..services.export_service import MEDIA_TYPES, ExportFormat, ExportService, ExportTable
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+@router.get("/{table}")
+async def export_table(
+        table: ExportTable,
+        format: ExportFormat = ExportFormat.NDJSON,
+        course_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+) -> StreamingResponse:
+    """Stream every row of ``table`` matching the filters, in id order.
+
+    ``since`` (inclusive) and ``until`` (exclusive) filter on ``updated_at``
+    for progresses and on ``earned_at`` otherwise. Rows are sent while they
+    are read, so the response has no length and memory use does not grow
+    with its size.
+    """
+    try:
+        stmt = ExportService.build_query(table, course_id, since, until)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def body() -> AsyncIterator[bytes]:
+        yield ExportService.encode_header(table, format)
+        # Each chunk is awaited until the client accepted it
+        async for rows in ExportService.stream_rows(stmt):
+            yield ExportService.encode_rows(table, format, rows)
+
+    filename = f"{table.value}.{format.value}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
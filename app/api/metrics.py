@@ -0,0 +1,50 @@
+"""Prometheus scrape endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..cache.result_cache import result_cache
+from ..core import metrics
+from ..services.certificate_renderer import certificate_renderer
+from ..services.certificate_verification import certificate_verifier
+
+router = APIRouter(tags=["Root"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics.collected_counter(
+    "result_cache_events_total",
+    "Result cache lookups and failures, by event (hits, misses, evictions, errors)",
+    lambda: [((event,), value) for event, value in result_cache.stats().items()],
+    ["event"],
+)
+metrics.gauge(
+    "certificate_render_queued",
+    "Certificates waiting to be rendered",
+    lambda: [((), certificate_renderer.stats()["queued"])],
+)
+metrics.collected_counter(
+    "certificate_render_total",
+    "Certificates handed to the renderer, by outcome (rendered, hits, dropped, failed)",
+    lambda: [
+        ((outcome,), value) for outcome, value in certificate_renderer.stats().items() if outcome != "queued"
+    ],
+    ["outcome"],
+)
+metrics.gauge(
+    "certificate_bloom_entries",
+    "Certificate ids in the verifyCertificate Bloom filter",
+    lambda: [((), certificate_verifier.stats()["bloom_entries"])],
+)
+metrics.collected_counter(
+    "certificate_verifications_total",
+    "verifyCertificate calls, by how they were answered",
+    lambda: [
+        ((outcome,), value) for outcome, value in certificate_verifier.stats().items() if outcome != "bloom_entries"
+    ],
+    ["outcome"],
+)
+
+
+@router.get("/metrics")
+def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.registry.render(), media_type=CONTENT_TYPE)
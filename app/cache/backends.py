@@ -0,0 +1,183 @@
+"""Key-value backends for the result cache."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+from urllib.parse import urlparse
+
+
+class CacheBackend(Protocol):
+    evictions: int
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]: ...
+
+    async def set_many(self, items: Dict[str, str], ttl: Optional[float]) -> None: ...
+
+    async def set_if_absent(self, key: str, value: str) -> Optional[str]:
+        """Store ``value`` unless ``key`` exists; returns the value now stored."""
+        ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: str, ttl: Optional[float]) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        return [self._get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, str], ttl: Optional[float]) -> None:
+        for key, value in items.items():
+            self._set(key, value, ttl)
+
+    async def set_if_absent(self, key: str, value: str) -> Optional[str]:
+        current = self._get(key)
+        if current is not None:
+            return current
+        self._set(key, value, None)
+        return value
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class RedisProtocolError(Exception):
+    pass
+
+
+class RedisCache:
+    """Cache backend speaking the Redis protocol (RESP2) over one connection.
+
+    Only needs ``GET``/``MGET``/``SET``/``DEL``, so it works against Redis,
+    Valkey, KeyDB or a local fake implementing those commands.
+    """
+
+    def __init__(self, url: str, key_prefix: str = "progress:") -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.key_prefix = key_prefix
+        # Evictions happen inside the server and are reported by INFO stats
+        self.evictions = 0
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(*args: str) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> object:
+        assert self._reader is not None
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisProtocolError(f"Unexpected reply {line!r}")
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup: List[Tuple[str, ...]] = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", str(self.db)))
+        if setup:
+            await self._send(setup)
+
+    async def _send(self, commands: Sequence[Tuple[str, ...]]) -> List[object]:
+        """Pipeline ``commands`` and return their replies in order."""
+        assert self._writer is not None
+        self._writer.write(b"".join(self._encode(*command) for command in commands))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    async def _execute(self, commands: Sequence[Tuple[str, ...]]) -> List[object]:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._send(commands)
+            except BaseException:
+                # Replies still unread, of a cancelled read or behind an
+                # error reply, would be taken by the next caller
+                await self.close()
+                raise
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        [values] = await self._execute([("MGET", *[self.key_prefix + key for key in keys])])
+        assert isinstance(values, list)
+        return values
+
+    async def set_many(self, items: Dict[str, str], ttl: Optional[float]) -> None:
+        if not items:
+            return
+        expiry: Tuple[str, ...] = ("PX", str(int(ttl * 1000))) if ttl is not None else ()
+        await self._execute(
+            [("SET", self.key_prefix + key, value, *expiry) for key, value in items.items()]
+        )
+
+    async def set_if_absent(self, key: str, value: str) -> Optional[str]:
+        _, current = await self._execute(
+            [("SET", self.key_prefix + key, value, "NX"), ("GET", self.key_prefix + key)]
+        )
+        assert current is None or isinstance(current, str)
+        return current
+
+    async def delete(self, key: str) -> None:
+        await self._execute([("DEL", self.key_prefix + key)])
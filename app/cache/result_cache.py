@@ -0,0 +1,185 @@
+"""Read-through cache of per-user query results with precise invalidation.
+
+Every entry key embeds a per-user generation token. Invalidating a user
+replaces the token, which makes all of that user's entries unreachable at
+once; they then age out through TTL or LRU eviction.
+"""
+import enum
+import json
+import uuid
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from sqlalchemy import DateTime, Enum as SQLEnum, inspect
+
+from ..core.config import settings
+from ..db.base import Base
+from .backends import CacheBackend, MemoryCache, RedisCache
+
+K = TypeVar("K")
+T = TypeVar("T")
+ModelT = TypeVar("ModelT", bound=Base)
+
+# (user_id, rest of the key)
+CacheKey = Tuple[int, str]
+
+
+def model_to_dict(model: Base) -> Dict[str, Any]:
+    """Column values of an ORM instance in a JSON-compatible form."""
+    values: Dict[str, Any] = {}
+    for attr in inspect(type(model)).column_attrs:
+        value = getattr(model, attr.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        values[attr.key] = value
+    return values
+
+
+def model_from_dict(model_class: Type[ModelT], values: Dict[str, Any]) -> ModelT:
+    """Build a transient ORM instance from :func:`model_to_dict` output."""
+    converted: Dict[str, Any] = {}
+    for attr in inspect(model_class).column_attrs:
+        value = values.get(attr.key)
+        column_type = attr.columns[0].type
+        if value is not None:
+            if isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, SQLEnum) and column_type.enum_class is not None:
+                value = column_type.enum_class(value)
+        converted[attr.key] = value
+    return model_class(**converted)
+
+
+class ResultCache:
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def evictions(self) -> int:
+        return self.backend.evictions if self.backend is not None else 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+    async def _generations(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        assert self.backend is not None
+        user_ids = list(dict.fromkeys(user_ids))
+        stored = await self.backend.get_many([f"gen:{user_id}" for user_id in user_ids])
+
+        generations: Dict[int, str] = {}
+        for user_id, generation in zip(user_ids, stored):
+            if generation is None:
+                # First use or evicted; a fresh token never matches older entries
+                generation = await self.backend.set_if_absent(f"gen:{user_id}", uuid.uuid4().hex)
+            assert generation is not None
+            generations[user_id] = generation
+        return generations
+
+    async def load_many(
+        self,
+        namespace: str,
+        keys: Sequence[K],
+        cache_key: Callable[[K], CacheKey],
+        load: Callable[[List[K]], Awaitable[Sequence[T]]],
+        dump: Callable[[T], Any],
+        restore: Callable[[Any], T],
+    ) -> List[T]:
+        """Return values for ``keys``, calling ``load`` only for cache misses.
+
+        ``cache_key`` maps a key to its owning user and the rest of the
+        entry key, ``dump`` turns a loaded value into JSON-compatible data
+        and ``restore`` turns that data back into a value.
+        """
+        if self.backend is None:
+            return list(await load(list(keys)))
+
+        try:
+            cache_keys = [cache_key(key) for key in keys]
+            # Read generations before loading, so data loaded before a
+            # concurrent invalidation is stored under the old generation.
+            generations = await self._generations(user_id for user_id, _ in cache_keys)
+            entry_keys = [
+                f"{namespace}:{user_id}:{generations[user_id]}:{rest}"
+                for user_id, rest in cache_keys
+            ]
+            cached = await self.backend.get_many(entry_keys)
+        except Exception:
+            self.errors += 1
+            return list(await load(list(keys)))
+
+        results: List[Any] = [None] * len(keys)
+        missing: List[int] = []
+        for index, entry in enumerate(cached):
+            if entry is None:
+                missing.append(index)
+            else:
+                results[index] = restore(json.loads(entry))
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            loaded = await load([keys[index] for index in missing])
+            for index, value in zip(missing, loaded):
+                results[index] = value
+            try:
+                await self.backend.set_many(
+                    {entry_keys[index]: json.dumps(dump(value)) for index, value in zip(missing, loaded)},
+                    self.ttl,
+                )
+            except Exception:
+                self.errors += 1
+
+        return results
+
+    async def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        """Drop every cached result of ``user_ids``; call after committing."""
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set_many(
+                {f"gen:{user_id}": uuid.uuid4().hex for user_id in set(user_ids)}, None
+            )
+        except Exception:
+            self.errors += 1
+
+    async def invalidate_user(self, user_id: int) -> None:
+        await self.invalidate_users([user_id])
+
+
+def _create_backend() -> Optional[CacheBackend]:
+    if settings.result_cache_backend == "memory":
+        return MemoryCache(settings.result_cache_max_entries)
+    if settings.result_cache_backend == "redis":
+        return RedisCache(settings.result_cache_redis_url)
+    return None
+
+
+result_cache = ResultCache(_create_backend(), ttl=settings.result_cache_ttl)
@@ -14,9 +14,104 @@ class Settings(BaseSettings):
     DB_PASSWORD: str | None = None
     DB_HOST: str | None = None
     DB_PORT: int | None = None
+    # Key of the certificate signatures; without it new certificates get
+    # unsigned random signatures, checked against the stored value only
+    CERTIFICATE_SIGNING_KEY: str | None = None
+
+    # Level of the messages the app logs (DEBUG, INFO, WARNING, ...)
+    log_level: str = "INFO"
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Startup: create missing tables instead of requiring the database to be
+    # at the latest Alembic migration (create_all neither adds columns to
+    # existing tables nor backfills), and the number of pool connections to
+    # open and prime before /ready
+    create_schema_on_startup: bool = False
+    db_pool_prewarm: int = 0
 
     graphql_path: str = "/graphql"
     graphql_playground: bool = True
+    max_page_size: int = 100
+
+    # Admission limits of the static query cost analysis; field costs
+    # override app.graphql.query_cost.FIELD_COSTS, e.g. {"Query.getProgress": 2}
+    query_max_cost: int = 1000
+    query_max_depth: int = 10
+    query_cost_list_size: int = 20
+    query_field_costs: dict[str, int] = {}
+
+    # Seconds getCourseStatistics results are reused, and courses kept per process
+    course_statistics_ttl: float = 30.0
+    course_statistics_cache_size: int = 1000
+
+    # Users per process whose last recorded active day is remembered, which
+    # skips the streak update for their further activity that day
+    activity_cache_size: int = 100000
+
+    # Top users per metric each process keeps for the global leaderboards;
+    # ranks of the others are counted in SQL. 0 loads every user into the
+    # memory of every process at startup, roughly 150 MB per million users
+    leaderboard_max_users: int = 0
+
+    # Highest number of lessons a course may have; bounds the lesson bitset
+    max_course_lessons: int = 4096
+
+    # Rows fetched per round trip by the streaming export endpoints
+    export_batch_size: int = 5000
+
+    # Events buffered per subscription before the oldest are dropped
+    subscription_queue_size: int = 100
+
+    # Parsed and validated documents kept per process, keyed by query text
+    graphql_document_cache_size: int = 1000
+    # Automatic persisted queries; with allowlist_only only queries from the
+    # {sha256: query} JSON manifest at allowlist_path are executed
+    persisted_queries_max_size: int = 10000
+    persisted_queries_allowlist_path: str | None = None
+    persisted_queries_allowlist_only: bool = False
+
+    # Write-behind buffering of time-spent heartbeats
+    progress_buffer_enabled: bool = False
+    progress_buffer_flush_interval: float = 5.0
+    progress_buffer_max_size: int = 5000
+
+    # Certificate PDFs rendered by a process pool into a content-addressed
+    # directory; pdf_url is certificate_url_prefix/<digest>.pdf, served by
+    # GET /certificates/<digest>.pdf or anything in front of the directory
+    certificate_render_enabled: bool = True
+    certificate_render_workers: int = 2
+    certificate_render_queue_size: int = 10000
+    certificate_store_path: str = "certificate_store"
+    certificate_url_prefix: str = "/certificates"
+
+    # Background issuance of the certificates of completed courses, every
+    # interval seconds in batches; rows changed within lag seconds wait for
+    # the next sweep (see app.services.certificate_sweeper)
+    certificate_sweep_enabled: bool = False
+    certificate_sweep_interval: float = 300.0
+    certificate_sweep_batch_size: int = 1000
+    certificate_sweep_lag: float = 60.0
+
+    # verifyCertificate: certificates kept per process and for how many
+    # seconds, and the false positive rate and refresh interval (seconds)
+    # of the Bloom filter of issued certificate ids
+    certificate_verify_cache_size: int = 10000
+    certificate_verify_cache_ttl: float = 300.0
+    certificate_bloom_error_rate: float = 0.001
+    certificate_bloom_refresh_interval: float = 60.0
+
+    # Read-through result cache: "none", "memory" or "redis"
+    result_cache_backend: str = "none"
+    result_cache_ttl: float = 60.0
+    result_cache_max_entries: int = 10000
+    result_cache_redis_url: str = "redis://localhost:6379/0"
+
+    # Prometheus metrics at GET /metrics; resolver timing adds a histogram
+    # per "Type.field" of the fields with async resolvers
+    metrics_enabled: bool = True
+    metrics_resolver_timing: bool = True
 
     @property
     def DATABASE_URL(self) -> str:
@@ -0,0 +1,200 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are updated in place; gauges are read when
+``/metrics`` is scraped, from functions that return their current values.
+Each worker process keeps its own values, so scrape every worker (or run
+one per pod) as with any multi-process Prometheus target.
+"""
+import bisect
+import logging
+import math
+from collections.abc import Callable, Iterable, Sequence
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; from a cache hit to a slow multi-statement mutation
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """``(suffix, label names, label values, value)`` of every sample."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for labelvalues, value in self._values.items():
+            yield "", self.labelnames, labelvalues, value
+
+
+class Gauge(Metric):
+    """Current values, read from ``collect`` as ``(label values, value)`` pairs."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for labelvalues, value in self.collect():
+            yield "", self.labelnames, labelvalues, value
+
+
+class CollectedCounter(Gauge):
+    """A counter kept elsewhere, such as the hit count of a cache, read on scrape."""
+
+    type_name = "counter"
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: count in each bucket (not cumulative), then sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        counts = self._counts.get(labelvalues)
+        if counts is None:
+            counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+            self._sums[labelvalues] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labelvalues] += value
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        bucket_names = (*self.labelnames, "le")
+        for labelvalues, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                yield "_bucket", bucket_names, (*labelvalues, le), cumulative
+            yield "_sum", self.labelnames, labelvalues, self._sums[labelvalues]
+            yield "_count", self.labelnames, labelvalues, cumulative
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # One failing gauge should not hide the other metrics
+                logger.exception("Collecting metric %s failed", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, documentation, labelnames)
+    registry.register(metric)
+    return metric
+
+
+def histogram(
+    name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+) -> Histogram:
+    metric = Histogram(name, documentation, labelnames, buckets)
+    registry.register(metric)
+    return metric
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    labelnames: Sequence[str] = (),
+) -> Gauge:
+    metric = Gauge(name, documentation, collect, labelnames)
+    registry.register(metric)
+    return metric
+
+
+def collected_counter(
+    name: str,
+    documentation: str,
+    collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    labelnames: Sequence[str] = (),
+) -> CollectedCounter:
+    metric = CollectedCounter(name, documentation, collect, labelnames)
+    registry.register(metric)
+    return metric
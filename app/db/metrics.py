@@ -0,0 +1,96 @@
+"""Metrics of the connection pool and of the SQL statements sent to Postgres.
+
+Statements are counted and timed in total, and for the request running
+them: code that sets :data:`current_request` (the GraphQL metrics
+extension does per operation) gets the number of statements and the time
+spent in them. Tasks started by the request inherit it.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from ..core import metrics
+
+POOL_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a pool connection, including waiting for a free one and connecting",
+)
+STATEMENTS = metrics.counter("db_statements_total", "SQL statements executed")
+STATEMENT_DURATION = metrics.histogram("db_statement_duration_seconds", "Duration of SQL statements")
+ERRORS = metrics.counter("db_errors_total", "SQL statements that failed, by exception", ["error"])
+
+
+class RequestStatistics:
+    """Database use of one request."""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStatistics]] = ContextVar("current_request", default=None)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default pool of async engines, timing how long checkouts take."""
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# SQLAlchemy names the pool's logger after its class, which puts it under
+# the app's loggers; keep it at SQLAlchemy's default level
+logging.getLogger(f"{__name__}.{TimedQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    STATEMENTS.inc()
+    STATEMENT_DURATION.observe(elapsed)
+    request = current_request.get()
+    if request is not None:
+        request.statements += 1
+        request.seconds += elapsed
+
+
+def _handle_error(context: Any) -> None:
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+    ERRORS.inc(type(context.original_exception).__name__)
+
+
+def instrument(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    pool = engine.pool
+    metrics.gauge("db_pool_size", "Connections the pool keeps open", lambda: [((), pool.size())])  # type: ignore[attr-defined]
+    metrics.gauge(
+        "db_pool_checked_out", "Pool connections in use", lambda: [((), pool.checkedout())]  # type: ignore[attr-defined]
+    )
+    metrics.gauge(
+        "db_pool_checked_in", "Idle pool connections", lambda: [((), pool.checkedin())]  # type: ignore[attr-defined]
+    )
+    # Negative until pool_size connections have been opened
+    metrics.gauge(
+        "db_pool_overflow", "Connections open beyond pool_size",
+        lambda: [((), max(pool.overflow(), 0))],  # type: ignore[attr-defined]
+    )
@@ -1,12 +1,13 @@
 from logging.config import fileConfig
 from sqlalchemy import pool
+from sqlalchemy.engine import Connection
 from alembic import context
 import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 
 # Import your models and base
-from ...db.base import Base
-from ...models import LessonProgress, CourseCertificate, Achievement
+from app.db.base import Base
+from app.models import achievement, certificate, import_checkpoint, progress, sweep_checkpoint, user_statistics  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -27,7 +28,7 @@ target_metadata = Base.metadata
 # ... etc.
 
 
-def get_url():
+def get_url() -> str:
     """Get database URL from settings."""
     from app.core.config import settings
     return settings.DATABASE_URL
@@ -57,7 +58,7 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
-def do_run_migrations(connection):
+def do_run_migrations(connection: Connection) -> None:
     context.configure(connection=connection, target_metadata=target_metadata)
 
     with context.begin_transaction():
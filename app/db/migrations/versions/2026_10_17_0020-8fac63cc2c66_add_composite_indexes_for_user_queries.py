@@ -0,0 +1,48 @@
+"""Add composite indexes for user queries
+
+Indexes follow the per-user access paths of the GraphQL resolvers. They are
+built CONCURRENTLY so writes to these tables are not blocked meanwhile.
+
+Revision ID: 8fac63cc2c66
+Revises: 766a1ef26b87
+Create Date: 2026-10-17 00:20:42.805242
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8fac63cc2c66'
+down_revision: Union[str, None] = '766a1ef26b87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_progress_user_last_accessed', 'progresses', ['user_id', sa.literal_column('last_accessed_at DESC'), sa.literal_column('id DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('idx_progress_user_status', 'progresses', ['user_id', 'status'], unique=False, postgresql_include=['course_id'], postgresql_concurrently=True)
+        op.create_index('idx_achievement_user_earned', 'achievements', ['user_id', sa.literal_column('earned_at DESC'), sa.literal_column('id DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('idx_achievement_user_type', 'achievements', ['user_id', 'achievement_type'], unique=False, postgresql_concurrently=True)
+        op.create_index('idx_cert_user_earned', 'course_certificates', ['user_id', sa.literal_column('earned_at DESC'), sa.literal_column('id DESC')], unique=False, postgresql_concurrently=True)
+
+        # Prefixes of the composite and unique (user_id, course_id) indexes
+        op.drop_index(op.f('ix_progresses_user_id'), table_name='progresses', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_achievements_user_id'), table_name='achievements', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_course_certificates_user_id'), table_name='course_certificates', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_course_certificates_user_id'), 'course_certificates', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_achievements_user_id'), 'achievements', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_progresses_user_id'), 'progresses', ['user_id'], unique=False, postgresql_concurrently=True)
+
+        op.drop_index('idx_cert_user_earned', table_name='course_certificates', postgresql_concurrently=True)
+        op.drop_index('idx_achievement_user_type', table_name='achievements', postgresql_concurrently=True)
+        op.drop_index('idx_achievement_user_earned', table_name='achievements', postgresql_concurrently=True)
+        op.drop_index('idx_progress_user_status', table_name='progresses', postgresql_concurrently=True)
+        op.drop_index('idx_progress_user_last_accessed', table_name='progresses', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""Add course leaderboard index
+
+Serves the top of a course leaderboard by time spent. Built CONCURRENTLY so
+progress writes are not blocked meanwhile.
+
+Revision ID: 75d4565b88f3
+Revises: 8fac63cc2c66
+Create Date: 2026-10-17 00:33:07.266594
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '75d4565b88f3'
+down_revision: Union[str, None] = '8fac63cc2c66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_progress_course_time_spent', 'progresses', ['course_id', sa.literal_column('total_time_spent DESC'), 'user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_progress_course_time_spent', table_name='progresses', postgresql_concurrently=True)
+
+
+
+
+
+
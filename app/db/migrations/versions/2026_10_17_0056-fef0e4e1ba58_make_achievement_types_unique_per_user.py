@@ -0,0 +1,51 @@
+"""Make achievement types unique per user
+
+Rule-based awards insert with ON CONFLICT on (user_id, achievement_type).
+Existing duplicates are removed first, keeping the earliest, and the
+achievement counts of their users are corrected. The unique index is built
+CONCURRENTLY before the plain one is dropped, so lookups keep an index.
+
+Revision ID: fef0e4e1ba58
+Revises: 86805265f1c4
+Create Date: 2026-10-17 00:56:06.233205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fef0e4e1ba58'
+down_revision: Union[str, None] = '86805265f1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text("""
+        WITH duplicates AS (
+            DELETE FROM achievements a
+            USING achievements b
+            WHERE a.user_id = b.user_id
+              AND a.achievement_type = b.achievement_type
+              AND a.id > b.id
+            RETURNING a.user_id
+        )
+        UPDATE user_statistics s
+        SET total_achievements = s.total_achievements - d.removed, updated_at = now()
+        FROM (SELECT user_id, count(*) AS removed FROM duplicates GROUP BY user_id) d
+        WHERE s.user_id = d.user_id
+    """))
+    with op.get_context().autocommit_block():
+        op.create_index('idx_achievement_user_type_unique', 'achievements', ['user_id', 'achievement_type'], unique=True, postgresql_concurrently=True)
+        op.drop_index('idx_achievement_user_type', table_name='achievements', postgresql_concurrently=True)
+        op.execute('ALTER INDEX idx_achievement_user_type_unique RENAME TO idx_achievement_user_type')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_achievement_user_type_plain', 'achievements', ['user_id', 'achievement_type'], unique=False, postgresql_concurrently=True)
+        op.drop_index('idx_achievement_user_type', table_name='achievements', postgresql_concurrently=True)
+        op.execute('ALTER INDEX idx_achievement_user_type_plain RENAME TO idx_achievement_user_type')
@@ -0,0 +1,38 @@
+"""Index certificates pending rendering
+
+Partial index on the certificates without a PDF, which the render backfill
+walks in id order. It starts out covering every certificate issued without
+a client-supplied URL, and is built CONCURRENTLY.
+
+Revision ID: 344a888a9d2f
+Revises: e564f2d8dfb6
+Create Date: 2026-10-17 01:09:28.883258
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '344a888a9d2f'
+down_revision: Union[str, None] = 'e564f2d8dfb6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_cert_pdf_pending', 'course_certificates', ['id'], unique=False, postgresql_where=sa.text('pdf_url IS NULL'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_cert_pdf_pending', table_name='course_certificates', postgresql_concurrently=True)
+
+
+
+
+
+
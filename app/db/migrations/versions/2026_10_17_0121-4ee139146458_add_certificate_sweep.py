@@ -0,0 +1,47 @@
+"""Add certificate sweep
+
+Checkpoint table of incremental sweeps, and a partial index on the completed
+progresses in updated_at order that the certificate sweeper walks. The index
+is built CONCURRENTLY.
+
+Revision ID: 4ee139146458
+Revises: 344a888a9d2f
+Create Date: 2026-10-17 01:21:39.890914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4ee139146458'
+down_revision: Union[str, None] = '344a888a9d2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sweep_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('swept_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_id', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('idx_progress_completed_updated', 'progresses', ['updated_at', 'id'], unique=False, postgresql_where=sa.text("status = 'COMPLETED' OR completion_percentage >= 100"), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_progress_completed_updated', table_name='progresses', postgresql_concurrently=True)
+    op.drop_table('sweep_checkpoints')
+
+
+
+
+
+
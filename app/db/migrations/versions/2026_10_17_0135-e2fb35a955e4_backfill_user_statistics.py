@@ -0,0 +1,66 @@
+"""Backfill user statistics
+
+Rebuild the counters of the user_statistics rollup from progresses,
+course_certificates and achievements, with the aggregate of
+ProgressService.aggregate_users_statistics. The table is locked against
+concurrent deltas meanwhile, so rows already maintained by the mutations
+are rebuilt to the same values; streak columns are kept.
+
+Revision ID: e2fb35a955e4
+Revises: 4ee139146458
+Create Date: 2026-10-17 01:35:12.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2fb35a955e4'
+down_revision: Union[str, None] = '4ee139146458'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = (
+    'total_courses',
+    'total_courses_in_progress',
+    'total_completed_courses',
+    'total_certificates',
+    'total_achievements',
+    'total_time_spent',
+    'total_completed_lessons',
+    'completion_percentage_sum',
+)
+
+
+def upgrade() -> None:
+    op.execute('LOCK TABLE user_statistics IN SHARE ROW EXCLUSIVE MODE')
+    op.execute(f"""
+        INSERT INTO user_statistics (user_id, {', '.join(COUNTERS)})
+        SELECT
+            users.user_id,
+            count(p.id),
+            count(p.id) FILTER (WHERE p.status = 'IN_PROGRESS'),
+            count(p.id) FILTER (WHERE p.status = 'COMPLETED'),
+            (SELECT count(*) FROM course_certificates c WHERE c.user_id = users.user_id),
+            (SELECT count(*) FROM achievements a WHERE a.user_id = users.user_id),
+            coalesce(sum(p.total_time_spent), 0),
+            coalesce(sum(coalesce(bit_count(p.completed_lessons), 0)), 0),
+            coalesce(sum(p.completion_percentage), 0.0)
+        FROM (
+            SELECT user_id FROM progresses
+            UNION SELECT user_id FROM course_certificates
+            UNION SELECT user_id FROM achievements
+        ) AS users
+        LEFT JOIN progresses p ON p.user_id = users.user_id
+        GROUP BY users.user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            {', '.join(f'{name} = excluded.{name}' for name in COUNTERS)},
+            updated_at = now()
+    """)
+
+
+def downgrade() -> None:
+    # The rollup rows stay valid; nothing to undo
+    pass
@@ -0,0 +1,40 @@
+"""Index leaderboard metrics
+
+Serves the top users by each leaderboard metric and counts the users above
+a score, for ranks beyond the users kept in memory. Built CONCURRENTLY so
+statistics updates are not blocked meanwhile.
+
+Revision ID: 95c1eeafb55b
+Revises: e2fb35a955e4
+Create Date: 2026-10-17 02:10:41.530718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '95c1eeafb55b'
+down_revision: Union[str, None] = 'e2fb35a955e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'idx_user_statistics_time_spent': 'total_time_spent',
+    'idx_user_statistics_completed_courses': 'total_completed_courses',
+    'idx_user_statistics_achievements': 'total_achievements',
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            op.create_index(name, 'user_statistics', [sa.literal_column(f'{column} DESC'), 'user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='user_statistics', postgresql_concurrently=True)
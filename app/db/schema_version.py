@@ -0,0 +1,42 @@
+"""Check at startup that the database schema is at the latest Alembic revision.
+
+With ``create_schema_on_startup`` disabled the schema is managed by the
+migrations only; serving from a database they have not been applied to
+would fail later, on the first query touching a missing column.
+"""
+from pathlib import Path
+from typing import Tuple
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+
+def head_revisions() -> Tuple[str, ...]:
+    script = ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+    return tuple(sorted(script.get_heads()))
+
+
+def _current_revisions(connection: Connection) -> Tuple[str, ...]:
+    # Empty when the alembic_version table does not exist
+    return tuple(sorted(MigrationContext.configure(connection).get_current_heads()))
+
+
+async def check_schema_version(engine: AsyncEngine) -> None:
+    """Raise :class:`SchemaOutdatedError` unless the database is at the head revision."""
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revisions)
+    expected = head_revisions()
+    if current != expected:
+        raise SchemaOutdatedError(
+            f"Database schema is at revision {', '.join(current) or 'none'}, expected "
+            f"{', '.join(expected)}; run `alembic upgrade head` before starting"
+        )
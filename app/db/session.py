@@ -7,15 +7,18 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from ..core.config import settings
+from .metrics import TimedQueuePool, instrument
 
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     future=True,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
+instrument(engine)
 
 AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
@@ -0,0 +1,255 @@
+"""Per-request DataLoaders coalescing lookups into batched queries."""
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.dataloader import DataLoader
+
+from ..cache.result_cache import ModelT, ResultCache, model_from_dict, model_to_dict, result_cache
+from ..models.progress import Progress as ProgressModel
+from ..models.achievement import Achievement as AchievementModel
+from ..models.certificate import CourseCertificate as CertificateModel
+from ..services.progress_service import ProgressService
+
+UserCourseKey = Tuple[int, int]
+UserAchievementKey = Tuple[int, Optional[str]]
+
+
+def _dump_optional(model: Optional[ModelT]) -> Optional[Dict[str, Any]]:
+    return model_to_dict(model) if model is not None else None
+
+
+def _dump_list(models: List[ModelT]) -> List[Dict[str, Any]]:
+    return [model_to_dict(model) for model in models]
+
+
+def _restore_optional(model_class: Type[ModelT], data: Optional[Dict[str, Any]]) -> Optional[ModelT]:
+    return model_from_dict(model_class, data) if data is not None else None
+
+
+def _restore_list(model_class: Type[ModelT], data: List[Dict[str, Any]]) -> List[ModelT]:
+    return [model_from_dict(model_class, values) for values in data]
+
+
+class Loaders:
+    """DataLoaders bound to the database session of a single request.
+
+    Every ``load`` issued within one event-loop tick is collected and
+    resolved with a single ``WHERE ... IN (...)`` query per loader, after
+    serving what it can from the result cache.
+    """
+
+    def __init__(self, db_session: AsyncSession, cache: ResultCache = result_cache) -> None:
+        self.db_session = db_session
+        self.cache = cache
+        # AsyncSession does not allow concurrent statements, so batches
+        # dispatched by different loaders in the same tick take turns.
+        # Resolvers querying ``db_session`` directly hold it as well.
+        self.session_lock = asyncio.Lock()
+
+        self.progress: DataLoader[UserCourseKey, Optional[ProgressModel]] = DataLoader(
+            load_fn=self._load_progresses
+        )
+        self.certificate: DataLoader[UserCourseKey, Optional[CertificateModel]] = DataLoader(
+            load_fn=self._load_certificates
+        )
+        self.user_progresses: DataLoader[int, List[ProgressModel]] = DataLoader(
+            load_fn=self._load_user_progresses
+        )
+        self.user_certificates: DataLoader[int, List[CertificateModel]] = DataLoader(
+            load_fn=self._load_user_certificates
+        )
+        self.user_achievements: DataLoader[UserAchievementKey, List[AchievementModel]] = DataLoader(
+            load_fn=self._load_user_achievements
+        )
+        self.user_statistics: DataLoader[int, Dict[str, Any]] = DataLoader(
+            load_fn=self._load_user_statistics
+        )
+
+    async def _load_progresses(
+            self, keys: Sequence[UserCourseKey]
+    ) -> List[Optional[ProgressModel]]:
+        return await self.cache.load_many(
+            "progress",
+            keys,
+            lambda key: (key[0], str(key[1])),
+            self._query_progresses,
+            _dump_optional,
+            lambda data: _restore_optional(ProgressModel, data),
+        )
+
+    async def _query_progresses(
+            self, keys: Sequence[UserCourseKey]
+    ) -> List[Optional[ProgressModel]]:
+        stmt = select(ProgressModel).where(
+            tuple_(ProgressModel.user_id, ProgressModel.course_id).in_(keys)
+        )
+        async with self.session_lock:
+            result = await self.db_session.execute(stmt)
+            rows = result.scalars().all()
+
+        by_key = {(p.user_id, p.course_id): p for p in rows}
+        return [by_key.get(key) for key in keys]
+
+    async def _load_certificates(
+            self, keys: Sequence[UserCourseKey]
+    ) -> List[Optional[CertificateModel]]:
+        return await self.cache.load_many(
+            "certificate",
+            keys,
+            lambda key: (key[0], str(key[1])),
+            self._query_certificates,
+            _dump_optional,
+            lambda data: _restore_optional(CertificateModel, data),
+        )
+
+    async def _query_certificates(
+            self, keys: Sequence[UserCourseKey]
+    ) -> List[Optional[CertificateModel]]:
+        stmt = select(CertificateModel).where(
+            tuple_(CertificateModel.user_id, CertificateModel.course_id).in_(keys)
+        )
+        async with self.session_lock:
+            result = await self.db_session.execute(stmt)
+            rows = result.scalars().all()
+
+        by_key = {(c.user_id, c.course_id): c for c in rows}
+        return [by_key.get(key) for key in keys]
+
+    async def _load_user_progresses(
+            self, user_ids: Sequence[int]
+    ) -> List[List[ProgressModel]]:
+        results = await self.cache.load_many(
+            "user_progresses",
+            user_ids,
+            lambda user_id: (user_id, ""),
+            self._query_user_progresses,
+            _dump_list,
+            lambda data: _restore_list(ProgressModel, data),
+        )
+        for progresses in results:
+            for progress in progresses:
+                # Nested fields asking for the same rows are served from cache
+                self.progress.prime((progress.user_id, progress.course_id), progress)
+        return results
+
+    async def _query_user_progresses(
+            self, user_ids: Sequence[int]
+    ) -> List[List[ProgressModel]]:
+        stmt = (
+            select(ProgressModel)
+            .where(ProgressModel.user_id.in_(user_ids))
+            .order_by(ProgressModel.last_accessed_at.desc())
+        )
+        async with self.session_lock:
+            result = await self.db_session.execute(stmt)
+            rows = result.scalars().all()
+
+        by_user: Dict[int, List[ProgressModel]] = defaultdict(list)
+        for progress in rows:
+            by_user[progress.user_id].append(progress)
+        return [by_user[user_id] for user_id in user_ids]
+
+    async def _load_user_certificates(
+            self, user_ids: Sequence[int]
+    ) -> List[List[CertificateModel]]:
+        results = await self.cache.load_many(
+            "user_certificates",
+            user_ids,
+            lambda user_id: (user_id, ""),
+            self._query_user_certificates,
+            _dump_list,
+            lambda data: _restore_list(CertificateModel, data),
+        )
+        for certificates in results:
+            for certificate in certificates:
+                self.certificate.prime((certificate.user_id, certificate.course_id), certificate)
+        return results
+
+    async def _query_user_certificates(
+            self, user_ids: Sequence[int]
+    ) -> List[List[CertificateModel]]:
+        stmt = (
+            select(CertificateModel)
+            .where(CertificateModel.user_id.in_(user_ids))
+            .order_by(CertificateModel.earned_at.desc())
+        )
+        async with self.session_lock:
+            result = await self.db_session.execute(stmt)
+            rows = result.scalars().all()
+
+        by_user: Dict[int, List[CertificateModel]] = defaultdict(list)
+        for certificate in rows:
+            by_user[certificate.user_id].append(certificate)
+        return [by_user[user_id] for user_id in user_ids]
+
+    async def _load_user_achievements(
+            self, keys: Sequence[UserAchievementKey]
+    ) -> List[List[AchievementModel]]:
+        return await self.cache.load_many(
+            "user_achievements",
+            keys,
+            lambda key: (key[0], key[1] or ""),
+            self._query_user_achievements,
+            _dump_list,
+            lambda data: _restore_list(AchievementModel, data),
+        )
+
+    async def _query_user_achievements(
+            self, keys: Sequence[UserAchievementKey]
+    ) -> List[List[AchievementModel]]:
+        all_types = {user_id for user_id, achievement_type in keys if achievement_type is None}
+        typed = [
+            (user_id, achievement_type)
+            for user_id, achievement_type in keys
+            if achievement_type is not None and user_id not in all_types
+        ]
+
+        conditions = []
+        if all_types:
+            conditions.append(AchievementModel.user_id.in_(all_types))
+        if typed:
+            conditions.append(
+                tuple_(AchievementModel.user_id, AchievementModel.achievement_type).in_(typed)
+            )
+        stmt = (
+            select(AchievementModel)
+            .where(or_(*conditions))
+            .order_by(AchievementModel.earned_at.desc())
+        )
+        async with self.session_lock:
+            result = await self.db_session.execute(stmt)
+            rows = result.scalars().all()
+
+        by_user: Dict[int, List[AchievementModel]] = defaultdict(list)
+        for achievement in rows:
+            by_user[achievement.user_id].append(achievement)
+        return [
+            [
+                a for a in by_user[user_id]
+                if achievement_type is None or a.achievement_type == achievement_type
+            ]
+            for user_id, achievement_type in keys
+        ]
+
+    async def _load_user_statistics(
+            self, user_ids: Sequence[int]
+    ) -> List[Dict[str, Any]]:
+        return await self.cache.load_many(
+            # Versioned with the shape of the cached statistics
+            "user_statistics:v3",
+            user_ids,
+            lambda user_id: (user_id, ""),
+            self._query_user_statistics,
+            lambda statistics: statistics,
+            lambda data: data,
+        )
+
+    async def _query_user_statistics(
+            self, user_ids: Sequence[int]
+    ) -> List[Dict[str, Any]]:
+        async with self.session_lock:
+            statistics = await ProgressService.get_users_statistics(self.db_session, user_ids)
+        return [statistics[user_id] for user_id in user_ids]
@@ -0,0 +1,153 @@
+"""Latency, SQL and error metrics of GraphQL operations.
+
+Operations are labelled by their type and root fields, e.g.
+``query`` / ``getUserStatistics,leaderboard``, which the schema bounds,
+rather than by the operation name the client picks.
+"""
+import inspect
+import time
+from collections.abc import Awaitable, Iterator
+from typing import Any, List, Optional, Tuple
+
+from graphql import FieldNode, GraphQLError, OperationDefinitionNode
+from strawberry.extensions import SchemaExtension
+
+from ..core import metrics
+from ..db.metrics import RequestStatistics, current_request
+
+OPERATION_DURATION = metrics.histogram(
+    "graphql_operation_duration_seconds",
+    "Duration of GraphQL operations, parsing to result",
+    ["operation_type", "operation"],
+)
+REQUEST_STATEMENTS = metrics.histogram(
+    "graphql_request_sql_statements",
+    "SQL statements executed per GraphQL operation",
+    ["operation_type", "operation"],
+    buckets=metrics.COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = metrics.histogram(
+    "graphql_request_db_seconds",
+    "Time spent in SQL statements per GraphQL operation",
+    ["operation_type", "operation"],
+)
+ERRORS = metrics.counter(
+    "graphql_errors_total",
+    "Errors returned by GraphQL operations, by extensions code or exception",
+    ["operation", "code"],
+)
+RESOLVER_DURATION = metrics.histogram(
+    "graphql_resolver_duration_seconds",
+    "Duration of async field resolvers",
+    ["field"],
+)
+
+# Operation label of documents that could not be parsed, and of those that
+# failed validation, whose field names need not exist in the schema
+UNKNOWN = "unknown"
+INVALID = "invalid"
+
+
+def _error_code(error: GraphQLError, default: str) -> str:
+    code = (error.extensions or {}).get("code")
+    if code:
+        return str(code)
+    if error.original_error is not None:
+        return type(error.original_error).__name__
+    return default
+
+
+class GraphQLMetrics(SchemaExtension):
+    """Time operations and count their SQL statements and errors."""
+
+    def __init__(self, *, execution_context: Any = None) -> None:
+        # Set once the document has been parsed and validated
+        self.executed = False
+
+    def on_operation(self) -> Iterator[None]:
+        statistics = RequestStatistics()
+        token = current_request.set(statistics)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            try:
+                current_request.reset(token)
+            except ValueError:
+                # Subscriptions are closed from another context than the
+                # one they started in, which keeps its own value anyway
+                pass
+            operation_type, operation = self._labels()
+            OPERATION_DURATION.observe(elapsed, operation_type, operation)
+            REQUEST_STATEMENTS.observe(statistics.statements, operation_type, operation)
+            REQUEST_DB_TIME.observe(statistics.seconds, operation_type, operation)
+            if self.execution_context.graphql_document is None:
+                default = "GRAPHQL_PARSE_FAILED"
+            elif not self.executed:
+                default = "GRAPHQL_VALIDATION_FAILED"
+            else:
+                default = "GraphQLError"
+            for error in self._errors():
+                ERRORS.inc(operation, _error_code(error, default))
+
+    def on_execute(self) -> Iterator[None]:
+        self.executed = True
+        yield
+
+    def _labels(self) -> Tuple[str, str]:
+        operation = self._operation()
+        if operation is None:
+            return UNKNOWN, UNKNOWN
+        if not self.executed:
+            return operation.operation.value, INVALID
+        fields = sorted({
+            selection.name.value
+            for selection in operation.selection_set.selections
+            if isinstance(selection, FieldNode)
+        })
+        return operation.operation.value, ",".join(fields) or UNKNOWN
+
+    def _errors(self) -> List[GraphQLError]:
+        # Strawberry copies execution errors into pre_execution_errors too
+        execution_context = self.execution_context
+        errors = list(execution_context.pre_execution_errors or [])
+        result = execution_context.result
+        if result is not None and result.errors:
+            seen = {id(error) for error in errors}
+            errors.extend(error for error in result.errors if id(error) not in seen)
+        return errors
+
+    def _operation(self) -> Optional[OperationDefinitionNode]:
+        document = self.execution_context.graphql_document
+        if document is None:
+            return None
+        operation_name = self.execution_context.operation_name
+        for definition in document.definitions:
+            if isinstance(definition, OperationDefinitionNode) and (
+                operation_name is None
+                or (definition.name is not None and definition.name.value == operation_name)
+            ):
+                return definition
+        return None
+
+
+class ResolverMetrics(GraphQLMetrics):
+    """:class:`GraphQLMetrics`, and the duration of every async resolver.
+
+    Plain attribute resolvers are not timed: they take no measurable time
+    and a histogram per field of every row would cost more than they do.
+    """
+
+    def resolve(self, _next: Any, root: Any, info: Any, *args: Any, **kwargs: Any) -> Any:
+        result = _next(root, info, *args, **kwargs)
+        if inspect.isawaitable(result):
+            return self._timed(result, f"{info.parent_type.name}.{info.field_name}")
+        return result
+
+    async def _timed(self, result: Awaitable[Any], field: str) -> Any:
+        started = time.perf_counter()
+        try:
+            return await result
+        finally:
+            RESOLVER_DURATION.observe(time.perf_counter() - started, field)
@@ -1,17 +1,21 @@
 import strawberry
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy import select, func, and_
 
 from ..models.progress import Progress as ProgressModel
 from ..models.progress import ProgressStatus as ProgressStatusEnum
-from ..models.achievement import Achievement as AchievementModel
 from ..models.certificate import CourseCertificate as CertificateModel
 from ..graphql.types.progress import Progress, ProgressStatus
 from ..graphql.types.achievement import Achievement
 from ..graphql.types.certificate import CourseCertificate
+from ..cache.result_cache import result_cache
+from ..graphql.loaders import Loaders
+from ..services.certificate_renderer import certificate_renderer
+from ..services.progress_buffer import progress_buffer
+from ..services.progress_service import ProgressService, ProgressUpdate
+from ..services.statistics_service import StatisticsDelta, StatisticsService
 
 
 @strawberry.input
@@ -22,6 +26,38 @@ class UpdateProgressInput:
     time_spent_seconds: Optional[int] = None
     notes: Optional[str] = None
 
+    def to_update(self, user_id: int) -> ProgressUpdate:
+        return ProgressUpdate(
+            user_id=user_id,
+            course_id=self.course_id,
+            status=ProgressStatusEnum(self.status.value) if self.status else None,
+            completion_percentage=self.completion_percentage,
+            time_spent_seconds=self.time_spent_seconds,
+            notes=self.notes,
+        )
+
+
+@strawberry.input
+class UserProgressUpdateInput(UpdateProgressInput):
+    user_id: int
+
+
+@strawberry.input
+class CompleteLessonInput:
+    course_id: int
+    lesson_index: int = strawberry.field(description="Position of the lesson in the course, from 0")
+    lesson_count: Optional[int] = strawberry.field(
+        default=None, description="Lessons in the course; completion is derived from it"
+    )
+
+    def to_update(self, user_id: int) -> ProgressUpdate:
+        return ProgressUpdate(
+            user_id=user_id,
+            course_id=self.course_id,
+            completed_lesson=self.lesson_index,
+            lesson_count=self.lesson_count,
+        )
+
 
 @strawberry.input
 class CreateAchievementInput:
@@ -51,73 +87,69 @@ class Mutation:
             info: strawberry.Info
     ) -> Progress:
         db_session: AsyncSession = info.context["db_session"]
+        update = input.to_update(user_id)
+
+        if progress_buffer.enabled and update.is_heartbeat:
+            # Heartbeats for existing rows are summed in memory and written
+            # in batches; the response includes the buffered time.
+            loaders: Loaders = info.context["loaders"]
+            existing = await loaders.progress.load(update.key)
+            if existing is not None:
+                progress_buffer.add(
+                    user_id, input.course_id, update.time_spent_seconds or 0, datetime.now(timezone.utc)
+                )
+                return Progress.from_model(existing)
+
+        progress = await ProgressService.upsert_progress(db_session, update)
+        # Convert before committing, the commit expires the returned row
+        result = Progress.from_model(progress)
+        await db_session.commit()
+        await result_cache.invalidate_user(user_id)
+        return result
 
-        # Check if progress exists
-        stmt = select(ProgressModel).where(
-            and_(
-                ProgressModel.user_id == user_id,
-                ProgressModel.course_id == input.course_id
-            )
+    @strawberry.mutation
+    async def bulk_update_progress(
+            self,
+            inputs: List[UserProgressUpdateInput],
+            info: strawberry.Info
+    ) -> List[Progress]:
+        """Apply many progress updates in one transaction.
+
+        Returns the stored progress for each input, in input order. Inputs
+        repeating a user and course are applied in order, and each of them
+        returns the row as stored after the whole batch.
+        """
+        db_session: AsyncSession = info.context["db_session"]
+
+        progresses = await ProgressService.upsert_progresses(
+            db_session, [item.to_update(item.user_id) for item in inputs]
         )
-        result = await db_session.execute(stmt)
-        existing_progress = result.scalar_one_or_none()
-
-        now = datetime.now(timezone.utc)
-
-        if existing_progress:
-            # Update existing progress
-            if input.status:
-                existing_progress.status = ProgressStatusEnum(input.status.value)
-                if input.status == ProgressStatus.COMPLETED:
-                    existing_progress.completed_at = now
-                    existing_progress.completion_percentage = 100.0
-                elif existing_progress.status == ProgressStatusEnum.NOT_STARTED and input.status != ProgressStatus.NOT_STARTED:
-                    existing_progress.started_at = existing_progress.started_at or now
-
-            if input.completion_percentage is not None:
-                existing_progress.completion_percentage = input.completion_percentage
-
-            if input.time_spent_seconds is not None:
-                existing_progress.total_time_spent += input.time_spent_seconds
-
-            if input.notes is not None:
-                existing_progress.notes = input.notes
-
-            existing_progress.last_accessed_at = now
-            await db_session.commit()
-            await db_session.refresh(existing_progress)
-            return Progress.from_model(existing_progress)
-        else:
-            # Create new progress
-            status = ProgressStatusEnum.NOT_STARTED
-            if input.status:
-                status = ProgressStatusEnum(input.status.value)
-
-            started_at = None
-            if status != ProgressStatusEnum.NOT_STARTED:
-                started_at = now
-
-            completed_at = None
-            completion_percentage = input.completion_percentage or 0.0
-            if status == ProgressStatusEnum.COMPLETED:
-                completed_at = now
-                completion_percentage = 100.0
-
-            new_progress = ProgressModel(
-                user_id=user_id,
-                course_id=input.course_id,
-                status=status,
-                started_at=started_at,
-                completed_at=completed_at,
-                last_accessed_at=now,
-                completion_percentage=completion_percentage,
-                total_time_spent=input.time_spent_seconds or 0,
-                notes=input.notes,
-            )
-            db_session.add(new_progress)
-            await db_session.commit()
-            await db_session.refresh(new_progress)
-            return Progress.from_model(new_progress)
+        result = [Progress.from_model(p) for p in progresses]
+        await db_session.commit()
+        await result_cache.invalidate_users(item.user_id for item in inputs)
+        return result
+
+    @strawberry.mutation
+    async def complete_lesson(
+            self,
+            user_id: int,
+            input: CompleteLessonInput,
+            info: strawberry.Info
+    ) -> Progress:
+        """Mark a lesson of a course completed.
+
+        Completion percentage and status follow from the completed lessons
+        once the lesson count is known; completing the last lesson completes
+        the course. Completing a lesson again changes nothing else.
+        """
+        db_session: AsyncSession = info.context["db_session"]
+
+        progress = await ProgressService.upsert_progress(db_session, input.to_update(user_id))
+        # Convert before committing, the commit expires the returned row
+        result = Progress.from_model(progress)
+        await db_session.commit()
+        await result_cache.invalidate_user(user_id)
+        return result
 
     @strawberry.mutation
     async def create_achievement(
@@ -128,16 +160,19 @@ class Mutation:
     ) -> Achievement:
         db_session: AsyncSession = info.context["db_session"]
 
-        achievement = AchievementModel(
-            user_id=user_id,
-            achievement_type=input.achievement_type,
-            achievement_name=input.achievement_name,
+        # An achievement type the user already has is returned as it is
+        achievement = await ProgressService.add_achievement(
+            db_session,
+            user_id,
+            input.achievement_type,
+            input.achievement_name,
             description=input.description,
         )
-        db_session.add(achievement)
+        # Convert before committing, the commit expires the new row
+        result = Achievement.from_model(achievement)
         await db_session.commit()
-        await db_session.refresh(achievement)
-        return Achievement.from_model(achievement)
+        await result_cache.invalidate_user(user_id)
+        return result
 
     @strawberry.mutation
     async def create_certificate(
@@ -187,6 +222,10 @@ class Mutation:
             notes=input.notes,
         )
         db_session.add(certificate)
+        await StatisticsService.apply_delta(db_session, user_id, StatisticsDelta(total_certificates=1))
         await db_session.commit()
+        await result_cache.invalidate_user(user_id)
         await db_session.refresh(certificate)
+        # Rendered in the background unless the client passed a pdf_url
+        certificate_renderer.submit([certificate])
         return CourseCertificate.from_model(certificate)
@@ -0,0 +1,205 @@
+"""Automatic persisted queries (APQ), the allowlist and the document cache.
+
+Clients following the APQ protocol send only the SHA-256 hash of a query in
+``extensions.persistedQuery``; when the server does not know the hash yet it
+answers ``PersistedQueryNotFound`` and the client retries with the query text,
+which is then registered under its hash.
+
+The HTTP router resolves hashes; the allowlist is enforced by a schema
+extension, so it also covers operations sent over WebSockets or multipart
+subscriptions, which do not pass through the router. Parsed documents and
+validation results are cached per query text by Strawberry's extensions.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+
+from graphql import GraphQLError
+from strawberry.extensions import ParserCache, SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.types import ExecutionResult
+
+from ..core.config import settings
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DocumentParserCache(ParserCache):
+    """:class:`~strawberry.extensions.ParserCache` leaving syntax errors to Strawberry.
+
+    An error raised by the hook would skip Strawberry's handling of failed
+    parses, which reports them to the other extensions; failures are not
+    cached anyway, so parsing again costs nothing extra.
+    """
+
+    def on_parse(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        try:
+            execution_context.graphql_document = self.cached_parse_document(
+                execution_context.query, **execution_context.parse_options
+            )
+        except GraphQLError:
+            pass
+        yield
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def load_allowlist(path: str) -> Dict[str, str]:
+    """Read a ``{sha256: query}`` JSON manifest, checking every hash."""
+    with open(path, encoding="utf-8") as manifest:
+        queries: Dict[str, str] = json.load(manifest)
+    for sha256, query in queries.items():
+        if query_hash(query) != sha256:
+            raise ValueError(f"Allowlist entry {sha256} does not match its query")
+    return queries
+
+
+class PersistedQueryError(Exception):
+
+    def __init__(self, message: str, code: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class PersistedQueries:
+    """Hash to query text mapping for APQ, optionally restricted to an allowlist.
+
+    In allowlist-only mode nothing is registered at runtime: only queries
+    whose hash is in the manifest are executed, sent as hash or as text.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        allowlist: Optional[Dict[str, str]] = None,
+        allowlist_only: bool = False,
+    ) -> None:
+        if allowlist_only and allowlist is None:
+            raise ValueError("Allowlist-only mode needs an allowlist")
+        self.allowlist = allowlist or {}
+        self.allowlist_only = allowlist_only
+        self._registered: LRUCache[str, str] = LRUCache(max_size)
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        query = self.allowlist.get(sha256)
+        if query is None and not self.allowlist_only:
+            query = self._registered.get(sha256)
+        return query
+
+    def resolve(self, query: Optional[str], extensions: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Return the query text to execute for a request.
+
+        Raises :class:`PersistedQueryError` for an unknown or mismatched hash.
+        """
+        persisted = (extensions or {}).get("persistedQuery")
+        sha256: Optional[str] = None
+        if isinstance(persisted, dict):
+            if persisted.get("version") != 1:
+                raise PersistedQueryError(
+                    "Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED"
+                )
+            sha256 = persisted.get("sha256Hash")
+
+        if query is None:
+            if sha256 is None:
+                return None
+            query = self.lookup(sha256)
+            if query is None:
+                raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+            return query
+
+        actual = query_hash(query)
+        if sha256 is not None and sha256 != actual:
+            raise PersistedQueryError(
+                "provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH"
+            )
+        # Only allowed queries are registered; PersistedQueryAllowlist
+        # rejects the others on every transport
+        if sha256 is not None and self.allowed(query):
+            self._registered.put(sha256, query)
+        return query
+
+    def allowed(self, query: str) -> bool:
+        return not self.allowlist_only or query_hash(query) in self.allowlist
+
+
+def _create_persisted_queries() -> PersistedQueries:
+    allowlist = None
+    if settings.persisted_queries_allowlist_path:
+        allowlist = load_allowlist(settings.persisted_queries_allowlist_path)
+    return PersistedQueries(
+        max_size=settings.persisted_queries_max_size,
+        allowlist=allowlist,
+        allowlist_only=settings.persisted_queries_allowlist_only,
+    )
+
+
+persisted_queries = _create_persisted_queries()
+
+
+class PersistedQueryAllowlist(SchemaExtension):
+    """Reject queries outside the allowlist in allowlist-only mode.
+
+    Must come after :class:`~strawberry.extensions.ValidationCache`, which
+    sets the validation errors before its hook yields too.
+    """
+
+    def on_validate(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        query = execution_context.query
+        if query is not None and not persisted_queries.allowed(query):
+            # Validation is skipped when errors are already set
+            execution_context.pre_execution_errors = [GraphQLError(
+                "Query is not in the persisted query allowlist",
+                extensions={"code": "PERSISTED_QUERY_NOT_ALLOWED"},
+            )]
+        yield
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """GraphQL router resolving persisted query hashes before execution."""
+
+    async def execute_single(self, *args: Any, **kwargs: Any) -> ExecutionResult:
+        request_data: GraphQLRequestData = kwargs["request_data"]
+        try:
+            request_data.query = persisted_queries.resolve(
+                request_data.query, request_data.extensions
+            )
+        except PersistedQueryError as exc:
+            error = GraphQLError(str(exc), extensions={"code": exc.code})
+            return ExecutionResult(data=None, errors=[error])
+        return await super().execute_single(*args, **kwargs)
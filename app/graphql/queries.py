@@ -1,7 +1,8 @@
 import strawberry
+from datetime import datetime, timezone
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, distinct
+from sqlalchemy import select, and_
 
 from ..models.progress import Progress as ProgressModel
 from ..models.progress import ProgressStatus as ProgressStatusEnum
@@ -9,8 +10,21 @@ from ..models.achievement import Achievement as AchievementModel
 from ..models.certificate import CourseCertificate as CertificateModel
 from ..graphql.types.progress import Progress
 from ..graphql.types.achievement import Achievement
-from ..graphql.types.certificate import CourseCertificate
-from ..graphql.types.statistics import LearningStatistics
+from ..graphql.types.certificate import CertificateVerification, CourseCertificate
+from ..graphql.types.statistics import CourseStatistics, LearningStatistics
+from ..graphql.types.leaderboard import LeaderboardEntry, LeaderboardMetric
+from ..graphql.types.pagination import Connection, Edge, PageInfo
+from ..graphql.loaders import Loaders
+from ..services.certificate_verification import certificate_verifier
+from ..services.course_statistics_service import CourseStatisticsService
+from ..services.leaderboard import LeaderboardMetric as LeaderboardMetricEnum
+from ..services.leaderboard import LeaderboardService, leaderboard
+from ..services.pagination import PaginationService
+from ..services.progress_buffer import progress_buffer
+from ..services.streaks import current_streak, day_number
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_LEADERBOARD_SIZE = 10
 
 
 @strawberry.type
@@ -22,17 +36,40 @@ class Query:
             info: strawberry.Info,
             course_id: Optional[int] = None
     ) -> List[Progress]:
-        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
 
-        stmt = select(ProgressModel).where(ProgressModel.user_id == user_id)
         if course_id:
-            stmt = stmt.where(ProgressModel.course_id == course_id)
-        stmt = stmt.order_by(ProgressModel.last_accessed_at.desc())
+            progress = await loaders.progress.load((user_id, course_id))
+            return [Progress.from_model(progress)] if progress else []
 
-        result = await db_session.execute(stmt)
-        progresses = result.scalars().all()
+        progresses = await loaders.user_progresses.load(user_id)
         return [Progress.from_model(p) for p in progresses]
 
+    @strawberry.field
+    async def get_user_progress_connection(
+            self,
+            user_id: int,
+            info: strawberry.Info,
+            first: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> Connection[Progress]:
+        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
+
+        stmt = select(ProgressModel).where(ProgressModel.user_id == user_id)
+        async with loaders.session_lock:
+            rows, has_next_page = await PaginationService.paginate(
+                db_session, stmt, ProgressModel.last_accessed_at, ProgressModel.id, first, after
+            )
+
+        return Connection(
+            edges=[Edge(cursor=cursor, node=Progress.from_model(p)) for p, cursor in rows],
+            page_info=PageInfo(
+                has_next_page=has_next_page,
+                end_cursor=rows[-1][1] if rows else None,
+            ),
+        )
+
     @strawberry.field
     async def get_progress(
             self,
@@ -40,16 +77,9 @@ class Query:
             course_id: int,
             info: strawberry.Info
     ) -> Optional[Progress]:
-        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
 
-        stmt = select(ProgressModel).where(
-            and_(
-                ProgressModel.user_id == user_id,
-                ProgressModel.course_id == course_id
-            )
-        )
-        result = await db_session.execute(stmt)
-        progress = result.scalar_one_or_none()
+        progress = await loaders.progress.load((user_id, course_id))
         return Progress.from_model(progress) if progress else None
 
     @strawberry.field
@@ -59,6 +89,7 @@ class Query:
             info: strawberry.Info
     ) -> List[int]:
         db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
 
         stmt = select(ProgressModel.course_id).where(
             and_(
@@ -67,8 +98,9 @@ class Query:
             )
         ).distinct()
 
-        result = await db_session.execute(stmt)
-        course_ids = result.scalars().all()
+        async with loaders.session_lock:
+            result = await db_session.execute(stmt)
+            course_ids = result.scalars().all()
         return list(course_ids)
 
     @strawberry.field
@@ -78,15 +110,38 @@ class Query:
             info: strawberry.Info,
             achievement_type: Optional[str] = None
     ) -> List[Achievement]:
+        loaders: Loaders = info.context["loaders"]
 
+        achievements = await loaders.user_achievements.load((user_id, achievement_type or None))
+        return [Achievement.from_model(a) for a in achievements]
+
+    @strawberry.field
+    async def get_user_achievements_connection(
+            self,
+            user_id: int,
+            info: strawberry.Info,
+            achievement_type: Optional[str] = None,
+            first: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> Connection[Achievement]:
         db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
+
         stmt = select(AchievementModel).where(AchievementModel.user_id == user_id)
         if achievement_type:
             stmt = stmt.where(AchievementModel.achievement_type == achievement_type)
-        stmt = stmt.order_by(AchievementModel.earned_at.desc())
-        result = await db_session.execute(stmt)
-        achievements = result.scalars().all()
-        return [Achievement.from_model(a) for a in achievements]
+        async with loaders.session_lock:
+            rows, has_next_page = await PaginationService.paginate(
+                db_session, stmt, AchievementModel.earned_at, AchievementModel.id, first, after
+            )
+
+        return Connection(
+            edges=[Edge(cursor=cursor, node=Achievement.from_model(a)) for a, cursor in rows],
+            page_info=PageInfo(
+                has_next_page=has_next_page,
+                end_cursor=rows[-1][1] if rows else None,
+            ),
+        )
 
     @strawberry.field
     async def get_user_certificates(
@@ -95,15 +150,40 @@ class Query:
             info: strawberry.Info,
             course_id: Optional[int] = None
     ) -> List[CourseCertificate]:
-        db_session: AsyncSession = info.context["db_session"]
-        stmt = select(CertificateModel).where(CertificateModel.user_id == user_id)
+        loaders: Loaders = info.context["loaders"]
+
         if course_id:
-            stmt = stmt.where(CertificateModel.course_id == course_id)
-        stmt = stmt.order_by(CertificateModel.earned_at.desc())
-        result = await db_session.execute(stmt)
-        certificates = result.scalars().all()
+            certificate = await loaders.certificate.load((user_id, course_id))
+            return [CourseCertificate.from_model(certificate)] if certificate else []
+
+        certificates = await loaders.user_certificates.load(user_id)
         return [CourseCertificate.from_model(c) for c in certificates]
 
+    @strawberry.field
+    async def get_user_certificates_connection(
+            self,
+            user_id: int,
+            info: strawberry.Info,
+            first: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> Connection[CourseCertificate]:
+        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
+
+        stmt = select(CertificateModel).where(CertificateModel.user_id == user_id)
+        async with loaders.session_lock:
+            rows, has_next_page = await PaginationService.paginate(
+                db_session, stmt, CertificateModel.earned_at, CertificateModel.id, first, after
+            )
+
+        return Connection(
+            edges=[Edge(cursor=cursor, node=CourseCertificate.from_model(c)) for c, cursor in rows],
+            page_info=PageInfo(
+                has_next_page=has_next_page,
+                end_cursor=rows[-1][1] if rows else None,
+            ),
+        )
+
     @strawberry.field
     async def get_certificate(
             self,
@@ -111,77 +191,81 @@ class Query:
             course_id: int,
             info: strawberry.Info
     ) -> Optional[CourseCertificate]:
+        loaders: Loaders = info.context["loaders"]
 
-        db_session: AsyncSession = info.context["db_session"]
-        stmt = select(CertificateModel).where(
-            and_(
-                CertificateModel.user_id == user_id,
-                CertificateModel.course_id == course_id
-            )
-        )
-        result = await db_session.execute(stmt)
-        certificate = result.scalar_one_or_none()
+        certificate = await loaders.certificate.load((user_id, course_id))
         return CourseCertificate.from_model(certificate) if certificate else None
 
+    @strawberry.field
+    async def verify_certificate(
+            self,
+            certificate_id: str,
+            signature: str,
+            info: strawberry.Info
+    ) -> CertificateVerification:
+        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
+
+        async with loaders.session_lock:
+            verification = await certificate_verifier.verify(db_session, certificate_id, signature)
+        return CertificateVerification.from_model(certificate_id, verification)
+
     @strawberry.field
     async def get_user_statistics(
             self,
             user_id: int,
             info: strawberry.Info
     ) -> LearningStatistics:
-        db_session: AsyncSession = info.context["db_session"]
+        loaders: Loaders = info.context["loaders"]
 
-        # Total completed courses
-        completed_courses_stmt = select(func.count()).select_from(ProgressModel).where(
-            and_(
-                ProgressModel.user_id == user_id,
-                ProgressModel.status == ProgressStatusEnum.COMPLETED
-            )
-        )
-        completed_courses = (await db_session.execute(completed_courses_stmt)).scalar() or 0
+        statistics = await loaders.user_statistics.load(user_id)
 
-        # Total courses in progress
-        in_progress_stmt = select(func.count()).select_from(ProgressModel).where(
-            and_(
-                ProgressModel.user_id == user_id,
-                ProgressModel.status == ProgressStatusEnum.IN_PROGRESS
-            )
+        return LearningStatistics(
+            user_id=user_id,
+            total_completed_lessons=statistics["total_completed_lessons"],
+            total_courses_in_progress=statistics["total_courses_in_progress"],
+            total_completed_courses=statistics["total_completed_courses"],
+            total_certificates=statistics["total_certificates"],
+            total_achievements=statistics["total_achievements"],
+            total_time_spent_seconds=statistics["total_time_spent"] + progress_buffer.pending_time(user_id),
+            average_completion_percentage=statistics["average_completion"],
+            current_streak_days=current_streak(
+                statistics["last_active_day"],
+                statistics["current_streak"],
+                day_number(datetime.now(timezone.utc)),
+            ),
+            longest_streak_days=statistics["longest_streak"],
         )
-        total_courses_in_progress = (await db_session.execute(in_progress_stmt)).scalar() or 0
 
-        # Total certificates
-        certs_stmt = select(func.count()).select_from(CertificateModel).where(
-            CertificateModel.user_id == user_id
-        )
-        total_certificates = (await db_session.execute(certs_stmt)).scalar() or 0
+    @strawberry.field
+    async def get_course_statistics(self, course_id: int) -> CourseStatistics:
+        """Completion and time statistics over all learners of a course.
 
-        # Total achievements
-        achievements_stmt = select(func.count()).select_from(AchievementModel).where(
-            AchievementModel.user_id == user_id
-        )
-        total_achievements = (await db_session.execute(achievements_stmt)).scalar() or 0
-
-        # Total time spent and average completion
-        stats_stmt = select(
-            func.sum(ProgressModel.total_time_spent).label("total_time"),
-            func.avg(ProgressModel.completion_percentage).label("avg_completion")
-        ).where(ProgressModel.user_id == user_id)
-        stats_result = await db_session.execute(stats_stmt)
-        stats_row = stats_result.first()
-        total_time_spent = int(stats_row.total_time or 0) if stats_row else 0
-        avg_completion = float(stats_row.avg_completion or 0.0) if stats_row else 0.0
-
-        # For completed lessons, we'll use a placeholder since we don't have a lesson model
-        # In a real system, you'd query a lessons table or join with course service
-        total_completed_lessons = 0  # This would come from a lesson progress table
+        Served from a cache refreshed every ``course_statistics_ttl`` seconds.
+        """
+        statistics = await CourseStatisticsService.get_course_statistics(course_id)
+        return CourseStatistics.from_statistics(statistics)
 
-        return LearningStatistics(
-            user_id=user_id,
-            total_completed_lessons=total_completed_lessons,
-            total_courses_in_progress=total_courses_in_progress,
-            total_completed_courses=completed_courses,
-            total_certificates=total_certificates,
-            total_achievements=total_achievements,
-            total_time_spent_seconds=total_time_spent,
-            average_completion_percentage=avg_completion,
-        )
+    @strawberry.field
+    async def leaderboard(
+            self,
+            metric: LeaderboardMetric,
+            info: strawberry.Info,
+            course_id: Optional[int] = None,
+            limit: int = DEFAULT_LEADERBOARD_SIZE
+    ) -> List[LeaderboardEntry]:
+        """Top users by ``metric``, overall or within one course."""
+        metric_enum = LeaderboardMetricEnum(metric.value)
+        if course_id is None:
+            entries = await leaderboard.top(metric_enum, limit)
+        else:
+            db_session: AsyncSession = info.context["db_session"]
+            loaders: Loaders = info.context["loaders"]
+            async with loaders.session_lock:
+                entries = await LeaderboardService.course_top(db_session, course_id, metric_enum, limit)
+        return [LeaderboardEntry.from_model(entry) for entry in entries]
+
+    @strawberry.field
+    async def user_rank(self, user_id: int, metric: LeaderboardMetric) -> Optional[LeaderboardEntry]:
+        entry = await leaderboard.rank(user_id, LeaderboardMetricEnum(metric.value))
+        return LeaderboardEntry.from_model(entry) if entry else None
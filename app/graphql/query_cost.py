@@ -0,0 +1,235 @@
+"""Static cost and depth analysis rejecting expensive operations before execution."""
+from collections.abc import Iterator
+from typing import Any, Dict, Optional, Tuple
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLNamedType,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    ListValueNode,
+    NamedTypeNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    ValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    value_from_ast_untyped,
+)
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from strawberry.extensions import SchemaExtension
+
+from ..core.config import settings
+
+# Cost of resolving a field once, by "Type.fieldName": roughly the database
+# work it causes. Fields not listed are plain attributes and cost nothing.
+FIELD_COSTS: Dict[str, int] = {
+    "Query.getProgress": 1,
+    "Query.getCertificate": 1,
+    "Query.verifyCertificate": 1,
+    "Query.getUserProgress": 1,
+    "Query.getUserCertificates": 1,
+    "Query.getUserAchievements": 1,
+    "Query.getCompletedCourses": 1,
+    "Query.getUserStatistics": 5,
+    "Query.getCourseStatistics": 10,
+    "Query.getUserProgressConnection": 2,
+    "Query.getUserAchievementsConnection": 2,
+    "Query.getUserCertificatesConnection": 2,
+    "Query.leaderboard": 1,
+    "Query.userRank": 1,
+    "Progress.certificate": 1,
+    "CourseCertificate.progress": 1,
+    "Mutation.updateUserProgress": 5,
+    "Mutation.bulkUpdateProgress": 2,
+    "Mutation.completeLesson": 5,
+    "Mutation.createAchievement": 5,
+    "Mutation.createCertificate": 5,
+}
+
+# Arguments bounding how often the children of a field are resolved: an
+# integer page size or the list of inputs of a bulk mutation.
+SIZE_ARGUMENTS = ("first", "limit", "inputs")
+# Arguments whose items are each worth the field's own cost: the inputs of
+# a bulk mutation are each written, like one call of the single mutation.
+PER_ITEM_ARGUMENTS = ("inputs",)
+
+
+class QueryCostLimiter(SchemaExtension):
+    """Reject operations over ``query_max_cost`` or ``query_max_depth``.
+
+    The cost is estimated from the document alone: every field costs its
+    :data:`FIELD_COSTS` entry times the number of parents it is resolved for,
+    and times its number of inputs for bulk mutations, where lists without a
+    size argument count as ``query_cost_list_size`` items. The estimate is returned in the ``cost`` response extension.
+    """
+
+    def __init__(self, *, execution_context: Any = None) -> None:
+        self.field_costs = {**FIELD_COSTS, **settings.query_field_costs}
+        self.cost = 0
+        self.depth = 0
+        self._fragments: Dict[str, FragmentDefinitionNode] = {}
+        self._variables: Dict[str, Any] = {}
+
+    def on_execute(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        document = execution_context.graphql_document
+        operation = self._operation()
+        if document is not None and operation is not None:
+            self._schema = execution_context.schema._schema
+            root_type = self._schema.get_root_type(operation.operation)
+            self._fragments = {
+                definition.name.value: definition
+                for definition in document.definitions
+                if isinstance(definition, FragmentDefinitionNode)
+            }
+            self._variables = execution_context.variables or {}
+            assert root_type is not None
+            self.cost, self.depth = self._measure(operation.selection_set, root_type, 1)
+
+            error = None
+            if self.depth > settings.query_max_depth:
+                error = GraphQLError(
+                    f"Query depth {self.depth} exceeds the maximum of {settings.query_max_depth}",
+                    extensions={"code": "QUERY_TOO_DEEP"},
+                )
+            elif self.cost > settings.query_max_cost:
+                error = GraphQLError(
+                    f"Query cost {self.cost} exceeds the maximum of {settings.query_max_cost}",
+                    extensions={"code": "QUERY_TOO_COMPLEX"},
+                )
+            if error is not None:
+                # Execution is skipped when a result is already set
+                execution_context.result = GraphQLExecutionResult(data=None, errors=[error])
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        return {
+            "cost": {
+                "requested": self.cost,
+                "maximum": settings.query_max_cost,
+                "depth": self.depth,
+            }
+        }
+
+    def _operation(self) -> Optional[OperationDefinitionNode]:
+        document = self.execution_context.graphql_document
+        if document is None:
+            return None
+        operation_name = self.execution_context.operation_name
+        for definition in document.definitions:
+            if isinstance(definition, OperationDefinitionNode) and (
+                operation_name is None
+                or (definition.name is not None and definition.name.value == operation_name)
+            ):
+                return definition
+        return None
+
+    def _measure(
+        self,
+        selection_set: SelectionSetNode,
+        parent_type: GraphQLNamedType,
+        multiplier: int,
+        list_size: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        """Return the cost and depth of ``selection_set`` on ``parent_type``.
+
+        ``list_size`` is the size argument of the enclosing field, such as the
+        ``first`` of a connection, which bounds the lists selected below it.
+        """
+        cost = 0
+        depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._measure_field(
+                    selection, parent_type, multiplier, list_size
+                )
+            else:
+                # Fragment cycles are rejected by validation before this runs
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = self._fragments.get(selection.name.value)
+                    if fragment is None:
+                        continue
+                    type_condition: Optional[NamedTypeNode] = fragment.type_condition
+                    fragment_selection_set = fragment.selection_set
+                else:
+                    assert isinstance(selection, InlineFragmentNode)
+                    type_condition = selection.type_condition
+                    fragment_selection_set = selection.selection_set
+
+                fragment_type = parent_type
+                if type_condition is not None:
+                    fragment_type = self._schema.get_type(type_condition.name.value) or parent_type
+                field_cost, field_depth = self._measure(
+                    fragment_selection_set, fragment_type, multiplier, list_size
+                )
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def _measure_field(
+        self,
+        field: FieldNode,
+        parent_type: GraphQLNamedType,
+        multiplier: int,
+        list_size: Optional[int],
+    ) -> Tuple[int, int]:
+        name = field.name.value
+        if name.startswith("__") or not isinstance(parent_type, GraphQLObjectType):
+            # Introspection is served from the schema, not the database
+            return 0, 0
+        field_definition = parent_type.fields.get(name)
+        if field_definition is None:
+            return 0, 0
+
+        size = self._size(field)
+        cost = multiplier * self.field_costs.get(f"{parent_type.name}.{name}", 0)
+        if size is not None and self._per_item(field):
+            cost *= size
+        if field.selection_set is None:
+            return cost, 1
+
+        if is_list_type(get_nullable_type(field_definition.type)):
+            items = next(
+                (value for value in (size, list_size) if value is not None), settings.query_cost_list_size
+            )
+            child_cost, child_depth = self._measure(
+                field.selection_set, get_named_type(field_definition.type), multiplier * items
+            )
+        else:
+            child_cost, child_depth = self._measure(
+                field.selection_set, get_named_type(field_definition.type), multiplier, size
+            )
+        return cost + child_cost, child_depth + 1
+
+    @staticmethod
+    def _per_item(field: FieldNode) -> bool:
+        return any(argument.name.value in PER_ITEM_ARGUMENTS for argument in field.arguments or ())
+
+    def _size(self, field: FieldNode) -> Optional[int]:
+        for argument in field.arguments or ():
+            if argument.name.value in SIZE_ARGUMENTS:
+                return self._argument_size(argument.value)
+        return None
+
+    def _argument_size(self, value: ValueNode) -> Optional[int]:
+        if isinstance(value, VariableNode):
+            resolved = self._variables.get(value.name.value)
+        elif isinstance(value, ListValueNode):
+            return len(value.values)
+        else:
+            resolved = value_from_ast_untyped(value)
+        if isinstance(resolved, list):
+            return len(resolved)
+        if isinstance(resolved, int) and not isinstance(resolved, bool):
+            # Page sizes outside 1..max_page_size are rejected when resolving,
+            # but must not lower the cost of the fields next to them
+            if resolved == 0:
+                return 0
+            return min(max(resolved, 1), settings.max_page_size)
+        return None
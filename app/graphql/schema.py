@@ -1,5 +1,26 @@
 import strawberry
+from strawberry.extensions import ValidationCache
+
 from ..graphql.queries import Query
 from ..graphql.mutations import Mutation
+from ..graphql.subscriptions import Subscription
+from ..graphql.persisted_queries import DocumentParserCache, PersistedQueryAllowlist
+from ..core.config import settings
+from ..graphql.metrics import GraphQLMetrics, ResolverMetrics
+from ..graphql.query_cost import QueryCostLimiter
+
+extensions: list = [
+    DocumentParserCache(maxsize=settings.graphql_document_cache_size),
+    ValidationCache(maxsize=settings.graphql_document_cache_size),
+    PersistedQueryAllowlist,
+    QueryCostLimiter,
+]
+if settings.metrics_enabled:
+    extensions.append(ResolverMetrics if settings.metrics_resolver_timing else GraphQLMetrics)
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=extensions,
+)
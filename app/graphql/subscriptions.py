@@ -0,0 +1,52 @@
+import strawberry
+from collections.abc import AsyncGenerator
+from typing import Any, Dict, Optional, Type, TypeVar
+
+from sqlalchemy import select
+
+from ..cache.result_cache import model_from_dict
+from ..db.base import Base
+from ..db.session import AsyncSessionLocal
+from ..models.achievement import Achievement as AchievementModel
+from ..models.progress import Progress as ProgressModel
+from ..graphql.types.achievement import Achievement
+from ..graphql.types.progress import Progress
+from ..services.notifications import ACHIEVEMENT_EARNED, PROGRESS_UPDATED, notification_hub
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+
+async def _to_model(model_class: Type[ModelT], event: Dict[str, Any]) -> Optional[ModelT]:
+    if not event.get("truncated"):
+        return model_from_dict(model_class, event)
+    # Rows too large for a NOTIFY payload are sent as their id only
+    async with AsyncSessionLocal() as db_session:
+        result = await db_session.execute(
+            select(model_class).where(model_class.id == event["id"])  # type: ignore[attr-defined]
+        )
+        return result.scalar_one_or_none()
+
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def progress_updated(
+            self,
+            user_id: int,
+            course_id: Optional[int] = None
+    ) -> AsyncGenerator[Progress, None]:
+        """Progress of a user, pushed after every committed change."""
+        async for event in notification_hub.subscribe(PROGRESS_UPDATED, user_id):
+            if course_id is not None and event.get("course_id", course_id) != course_id:
+                continue
+            progress = await _to_model(ProgressModel, event)
+            if progress is not None and (course_id is None or progress.course_id == course_id):
+                yield Progress.from_model(progress)
+
+    @strawberry.subscription
+    async def achievement_earned(self, user_id: int) -> AsyncGenerator[Achievement, None]:
+        """Achievements as a user earns them."""
+        async for event in notification_hub.subscribe(ACHIEVEMENT_EARNED, user_id):
+            achievement = await _to_model(AchievementModel, event)
+            if achievement is not None:
+                yield Achievement.from_model(achievement)
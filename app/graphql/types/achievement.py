@@ -25,6 +25,6 @@ class Achievement:
             achievement_name=model.achievement_name,
             description=model.description,
             earned_at=model.earned_at,
-            metadata=model.metadata,
+            metadata=model.notes,
         )
 
@@ -1,8 +1,13 @@
 import strawberry
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import TYPE_CHECKING, Annotated, Optional
 
 from ...models.certificate import CourseCertificate as CourseCertificateModel
+from ...services.certificate_verification import Verification
+
+if TYPE_CHECKING:
+    from .progress import Progress
 
 
 @strawberry.type
@@ -22,6 +27,15 @@ class CourseCertificate:
     created_at: datetime
     updated_at: datetime
 
+    @strawberry.field
+    async def progress(
+            self, info: strawberry.Info
+    ) -> Optional[Annotated["Progress", strawberry.lazy(".progress")]]:
+        from .progress import Progress
+
+        progress = await info.context["loaders"].progress.load((self.user_id, self.course_id))
+        return Progress.from_model(progress) if progress else None
+
     @classmethod
     def from_model(cls, model: CourseCertificateModel) -> "CourseCertificate":
         return cls(
@@ -41,3 +55,39 @@ class CourseCertificate:
             updated_at=model.updated_at,
         )
 
+
+
+@strawberry.enum
+class CertificateVerificationStatus(Enum):
+    VALID = "valid"
+    EXPIRED = "expired"
+    INVALID_SIGNATURE = "invalid_signature"
+    NOT_FOUND = "not_found"
+
+
+@strawberry.type
+class CertificateVerification:
+    certificate_id: str
+    status: CertificateVerificationStatus
+    valid: bool
+    # The certificate as stored, unless not found or the signature did not match
+    user_id: Optional[int] = None
+    course_id: Optional[int] = None
+    earned_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    grade: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, certificate_id: str, model: Verification) -> "CertificateVerification":
+        status = CertificateVerificationStatus(model.status.value)
+        certificate = model.certificate or {}
+        return cls(
+            certificate_id=certificate_id,
+            status=status,
+            valid=status is CertificateVerificationStatus.VALID,
+            user_id=certificate.get("user_id"),
+            course_id=certificate.get("course_id"),
+            earned_at=certificate.get("earned_at"),
+            expires_at=certificate.get("expires_at"),
+            grade=certificate.get("grade"),
+        )
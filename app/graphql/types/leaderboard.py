@@ -0,0 +1,22 @@
+import strawberry
+from enum import Enum
+
+from ...services.leaderboard import LeaderboardEntry as LeaderboardEntryModel
+
+
+@strawberry.enum
+class LeaderboardMetric(Enum):
+    TIME_SPENT = "total_time_spent"
+    COMPLETED_COURSES = "total_completed_courses"
+    ACHIEVEMENTS = "total_achievements"
+
+
+@strawberry.type
+class LeaderboardEntry:
+    rank: int = strawberry.field(description="1 + number of users with a higher score; ties share a rank")
+    user_id: int
+    score: int
+
+    @classmethod
+    def from_model(cls, model: LeaderboardEntryModel) -> "LeaderboardEntry":
+        return cls(rank=model.rank, user_id=model.user_id, score=model.score)
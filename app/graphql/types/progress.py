@@ -1,9 +1,14 @@
 import strawberry
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Annotated, List, Optional
 from enum import Enum
 
 from ...models.progress import Progress as ProgressModel, ProgressStatus as ProgressStatusEnum
+from ...services.lessons import completed_count, completed_indexes
+from ...services.progress_buffer import progress_buffer
+
+if TYPE_CHECKING:
+    from .certificate import CourseCertificate
 
 
 @strawberry.enum
@@ -25,14 +30,30 @@ class Progress:
     last_accessed_at: datetime
     completion_percentage: float
     total_time_spent: int
+    completed_lessons: List[int] = strawberry.field(description="Indexes of the completed lessons")
+    completed_lesson_count: int
+    lesson_count: Optional[int] = strawberry.field(description="Lessons in the course, when known")
     notes: Optional[str]
     created_at: datetime
     updated_at: datetime
 
+    @strawberry.field
+    async def certificate(
+            self, info: strawberry.Info
+    ) -> Optional[Annotated["CourseCertificate", strawberry.lazy(".certificate")]]:
+        from .certificate import CourseCertificate
+
+        certificate = await info.context["loaders"].certificate.load((self.user_id, self.course_id))
+        return CourseCertificate.from_model(certificate) if certificate else None
+
     @classmethod
     def from_model(cls, model: ProgressModel) -> "Progress":
-        """Convert SQLAlchemy model to Strawberry GraphQL type."""
-        return cls(
+        """Convert SQLAlchemy model to Strawberry GraphQL type.
+
+        Heartbeats still held in the write-behind buffer are added, so the
+        result reflects every accepted update.
+        """
+        progress = cls(
             id=model.id,
             user_id=model.user_id,
             course_id=model.course_id,
@@ -42,7 +63,17 @@ class Progress:
             last_accessed_at=model.last_accessed_at,
             completion_percentage=model.completion_percentage,
             total_time_spent=model.total_time_spent,
+            completed_lessons=completed_indexes(model.completed_lessons),
+            completed_lesson_count=completed_count(model.completed_lessons),
+            lesson_count=model.lesson_count,
             notes=model.notes,
             created_at=model.created_at,
             updated_at=model.updated_at,
         )
+
+        pending = progress_buffer.pending(model.user_id, model.course_id)
+        if pending is not None:
+            progress.total_time_spent += pending.time_spent_seconds
+            if pending.last_accessed_at and pending.last_accessed_at > progress.last_accessed_at:
+                progress.last_accessed_at = pending.last_accessed_at
+        return progress
@@ -1,5 +1,7 @@
 import strawberry
-from typing import List
+from typing import Any, Dict, List, Optional
+
+from .progress import ProgressStatus
 
 
 @strawberry.type
@@ -12,7 +14,58 @@ class LearningStatistics:
     total_achievements: int = strawberry.field(description="Total number of achievements")
     total_time_spent_seconds: int = strawberry.field(description="Total time spent learning in seconds")
     average_completion_percentage: float = strawberry.field(description="Average completion percentage across all courses")
+    current_streak_days: int = strawberry.field(description="Consecutive days with activity up to today or yesterday (UTC)")
+    longest_streak_days: int = strawberry.field(description="Longest run of consecutive days with activity")
+
+
+@strawberry.type
+class StatusCount:
+    status: ProgressStatus
+    count: int
+
+
+@strawberry.type
+class CompletionBucket:
+    lower_bound: float = strawberry.field(description="Inclusive lower completion percentage")
+    upper_bound: float = strawberry.field(description="Exclusive upper completion percentage, inclusive for 100")
+    count: int
 
 
+@strawberry.type
+class CourseFunnel:
+    enrolled: int = strawberry.field(description="Learners with progress in the course")
+    started: int = strawberry.field(description="Learners past NOT_STARTED or with any completion")
+    halfway: int = strawberry.field(description="Learners at 50% completion or more")
+    completed: int = strawberry.field(description="Learners who completed the course")
 
 
+@strawberry.type
+class CourseStatistics:
+    course_id: int
+    total_learners: int
+    status_counts: List[StatusCount]
+    completion_histogram: List[CompletionBucket]
+    time_spent_p50: Optional[float] = strawberry.field(description="Median time spent in seconds")
+    time_spent_p90: Optional[float] = strawberry.field(description="90th percentile of time spent in seconds")
+    average_time_to_completion_seconds: Optional[float] = strawberry.field(
+        description="Average time from start to completion of completed learners"
+    )
+    funnel: CourseFunnel
+
+    @classmethod
+    def from_statistics(cls, statistics: Dict[str, Any]) -> "CourseStatistics":
+        return cls(
+            course_id=statistics["course_id"],
+            total_learners=statistics["total_learners"],
+            status_counts=[
+                StatusCount(status=ProgressStatus(status), count=count)
+                for status, count in statistics["status_counts"].items()
+            ],
+            completion_histogram=[
+                CompletionBucket(**bucket) for bucket in statistics["completion_histogram"]
+            ],
+            time_spent_p50=statistics["time_spent_p50"],
+            time_spent_p90=statistics["time_spent_p90"],
+            average_time_to_completion_seconds=statistics["average_time_to_completion"],
+            funnel=CourseFunnel(**statistics["funnel"]),
+        )
@@ -0,0 +1,62 @@
+"""Pool pre-warming run at startup, before readiness is reported."""
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from ..cache.result_cache import ResultCache
+from ..db.session import engine
+from .loaders import Loaders
+from .schema import schema
+
+# Reads every hot query shape for a user that does not exist, so nothing is
+# returned but each statement gets prepared on the connection.
+WARMUP_QUERY = """
+query Warmup($userId: Int!) {
+  getProgress(userId: $userId, courseId: 0) { id certificate { id } }
+  getUserProgress(userId: $userId) { id }
+  getCompletedCourses(userId: $userId)
+  getUserAchievements(userId: $userId) { id }
+  getUserCertificates(userId: $userId) { id }
+  getUserStatistics(userId: $userId) { userId }
+}
+"""
+
+WARMUP_USER_ID = -1
+
+
+async def _warm_connection(connection: AsyncConnection) -> None:
+    async with AsyncSession(bind=connection) as db_session:
+        # Bypass the result cache so every statement reaches the connection
+        loaders = Loaders(db_session, cache=ResultCache(None, ttl=0))
+        result = await schema.execute(
+            WARMUP_QUERY,
+            variable_values={"userId": WARMUP_USER_ID},
+            context_value={"db_session": db_session, "loaders": loaders},
+        )
+        await db_session.rollback()
+    if result.errors:
+        raise RuntimeError(result.errors)
+
+
+async def prewarm_pool(connections: int) -> float:
+    """Open ``connections`` pool connections at once and prime each of them.
+
+    asyncpg prepares statements per connection, so the warm-up query runs on
+    every connection. Returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(engine.connect() for _ in range(connections)), return_exceptions=True
+    )
+    opened = [result for result in results if isinstance(result, AsyncConnection)]
+    try:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        await asyncio.gather(*(_warm_connection(connection) for connection in opened))
+    finally:
+        # Back to the pool, with their prepared statement caches
+        for connection in opened:
+            await connection.close()
+    return time.perf_counter() - start
@@ -1,7 +1,9 @@
 """GraphQL context provider for Strawberry."""
+from collections.abc import AsyncIterator
 from typing import Any
 
 from .db.session import AsyncSessionLocal
+from .graphql.loaders import Loaders
 
 #
 # async def get_context() -> dict[str, Any]:
@@ -18,15 +20,13 @@ from .db.session import AsyncSessionLocal
 #     return {"db_session": db_session}
 
 
-async def get_context() -> dict[str, Any]:
+async def get_context() -> AsyncIterator[dict[str, Any]]:
     async with AsyncSessionLocal() as db_session:
         try:
-            yield {"db_session": db_session}
+            yield {"db_session": db_session, "loaders": Loaders(db_session)}
 
             await db_session.commit()
-        except:
+        except Exception:
             await db_session.rollback()
-
-        finally:
-            print("Cleanup")
+            raise
 
@@ -1,31 +1,100 @@
 """Main FastAPI application for Progress Service."""
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import strawberry
-from strawberry.fastapi import GraphQLRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 
+from .api.certificates import router as certificates_router
+from .api.export import router as export_router
+from .api.metrics import router as metrics_router
+from .cache.result_cache import result_cache
 from .core.config import settings
 from .db.session import engine
 from .db.base import Base
-from .graphql.queries import Query
-from .graphql.mutations import Mutation
+from .db.schema_version import check_schema_version
+from .graphql.persisted_queries import PersistedQueryRouter
+from .graphql.schema import schema
+from .graphql.warmup import prewarm_pool
 from .graphql_context import get_context
+from .services.certificate_renderer import certificate_renderer
+from .services.certificate_sweeper import certificate_sweeper
+from .services.certificate_verification import certificate_verifier
+from .services.leaderboard import leaderboard
+from .services.notifications import notification_hub
+from .services.progress_buffer import progress_buffer
+
+# A handler for the app's messages unless logging is configured already;
+# only the app's loggers take log_level, SQLAlchemy logs SQL at INFO
+logging.basicConfig(format="%(levelname)s:\t%(name)s: %(message)s")
+logging.getLogger(__package__).setLevel(settings.log_level.upper())
+logger = logging.getLogger(__name__)
+
+# Set once startup work, including pool pre-warming, has finished
+startup_complete = asyncio.Event()
+
+
+async def _warm_up(started_at: float) -> None:
+    # Connections beyond pool_size would be closed again when returned
+    connections = min(settings.db_pool_prewarm, settings.db_pool_size)
+    if connections > 0:
+        try:
+            elapsed = await prewarm_pool(connections)
+            logger.info("Pre-warmed %d connections in %.3fs", connections, elapsed)
+        except Exception:
+            logger.exception("Pool pre-warming failed")
+    try:
+        started = time.perf_counter()
+        await leaderboard.load()
+        logger.info("Loaded leaderboards in %.3fs", time.perf_counter() - started)
+    except Exception:
+        # Loaded again on first use
+        logger.exception("Loading leaderboards failed")
+    try:
+        started = time.perf_counter()
+        await certificate_verifier.load()
+        logger.info("Loaded certificate filter in %.3fs", time.perf_counter() - started)
+    except Exception:
+        # Retried by the periodic refresh
+        logger.exception("Loading certificate filter failed")
+    startup_complete.set()
+    logger.info("Ready %.3fs after startup began", time.perf_counter() - started_at)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    print("Starting...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    logger.info("Starting...")
+    started_at = time.perf_counter()
+    if settings.create_schema_on_startup:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        await check_schema_version(engine)
+    progress_buffer.start()
+    certificate_renderer.start()
+    certificate_verifier.start()
+    certificate_sweeper.start()
+    # Serve liveness right away; /ready reports when warming is done
+    warm_up = asyncio.create_task(_warm_up(started_at))
     yield
 
-    print("Stopping...")
+    logger.info("Stopping...")
+    warm_up.cancel()
+    await progress_buffer.stop()
+    # Before the renderer, which takes what the last batch queued
+    await certificate_sweeper.stop()
+    await certificate_renderer.stop()
+    await certificate_verifier.stop()
+    await notification_hub.stop()
+    await engine.dispose()
 
 app = FastAPI(
-    title=settings.PROJECT_NAME,
+    title=settings.PROJECT_NAME or "Progress Service",
     description="Progress tracking service for online learning platform with GraphQL API",
     version="0.1.0",
     lifespan=lifespan,
@@ -40,21 +109,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
-
-
-graphql_app = GraphQLRouter(
+graphql_app = PersistedQueryRouter(
     schema, 
     graphiql=settings.graphql_playground,
-    context_getter=get_context
+    # FastAPI resolves it as a dependency, which may yield
+    context_getter=get_context,  # type: ignore[arg-type]
 )
 
 app.include_router(graphql_app, prefix=settings.graphql_path)
+app.include_router(export_router)
+app.include_router(certificates_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
 
 
 @app.get("/", tags=["Root"])
-def health_check() -> dict[str, str]:
+def health_check() -> dict[str, str | None]:
     return {
         "message": f"Welcome to {settings.PROJECT_NAME} API",
         "version": "1.0.0",
@@ -64,3 +134,22 @@ def health_check() -> dict[str, str]:
         "graphql_playground": f"{settings.graphql_path}" if settings.graphql_playground else None,
     }
 
+
+@app.get("/ready", tags=["Root"])
+async def readiness_check() -> JSONResponse:
+    """Readiness probe: 200 once startup finished and the database answers."""
+    if not startup_complete.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception:
+        # Details stay in the log; the probe is not authenticated
+        logger.warning("Readiness check failed", exc_info=True)
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+
+@app.get("/cache/stats", tags=["Root"])
+def cache_stats() -> dict[str, int]:
+    return result_cache.stats()
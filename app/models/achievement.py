@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import String, DateTime, func, Text, Integer, Index
+from sqlalchemy import String, DateTime, func, Text, Integer, Index, desc
 
 from ..db.base import Base
 
@@ -10,7 +10,7 @@ class Achievement(Base):
     __tablename__ = "achievements"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
     achievement_type: Mapped[str] = mapped_column(String(100), nullable=False)  # e.g., "first_lesson", "course_complete", "streak_7_days"
     achievement_name: Mapped[str] = mapped_column(String(200), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -30,3 +30,9 @@ class Achievement(Base):
         nullable=False
     )
 
+    __table_args__ = (
+        Index('idx_achievement_user_earned', 'user_id', desc('earned_at'), desc('id')),
+        # A user earns each achievement type once
+        Index('idx_achievement_user_type', 'user_id', 'achievement_type', unique=True),
+    )
+
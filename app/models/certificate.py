@@ -1,11 +1,12 @@
 """Model for course certificates earned by users."""
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 import uuid
 
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import Integer, String, DateTime, func, Float, Text, Index
+from sqlalchemy import Integer, String, DateTime, func, Float, Text, Index, desc, text
 
+from ..core.certificate_signing import signature_default
 from ..db.base import Base
 
 
@@ -22,11 +23,13 @@ class CourseCertificate(Base):
         default=lambda: str(uuid.uuid4())
     )
 
-    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
     course_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
 
+    # Set in Python as well so that it is known to the signature
     earned_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
         server_default=func.now(),
         nullable=False
     )
@@ -43,10 +46,11 @@ class CourseCertificate(Base):
 
     completion_time: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
 
+    # HMAC over the fields above, see app.core.certificate_signing
     digital_signature: Mapped[str] = mapped_column(
         String(255),
         nullable=False,
-        default=lambda: str(uuid.uuid4())
+        default=signature_default
     )
 
     pdf_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
@@ -66,5 +70,8 @@ class CourseCertificate(Base):
 
     __table_args__ = (
         Index('idx_user_course_cert', 'user_id', 'course_id', unique=True),
+        Index('idx_cert_user_earned', 'user_id', desc('earned_at'), desc('id')),
+        # Certificates still to be rendered, for python -m app.tools.render_certificates
+        Index('idx_cert_pdf_pending', 'id', postgresql_where=text('pdf_url IS NULL')),
     )
 
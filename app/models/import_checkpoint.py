@@ -0,0 +1,29 @@
+"""Progress of bulk imports, committed together with the rows they loaded."""
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import BigInteger, String, DateTime, func
+
+from ..db.base import Base
+
+
+class ImportCheckpoint(Base):
+    __tablename__ = "import_checkpoints"
+
+    # Names the import job, by default its table and source file
+    name: Mapped[str] = mapped_column(String(500), primary_key=True)
+    # Source records merged so far; an interrupted import skips these
+    records_done: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    completed: Mapped[bool] = mapped_column(nullable=False, default=False, server_default="false")
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
@@ -1,10 +1,12 @@
 """Model for tracking overall course progress for users."""
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 import enum
 
+from asyncpg import BitString
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import Integer, Float, Text, DateTime, func, Enum as SQLEnum, Index
+from sqlalchemy import Integer, Float, Text, DateTime, func, Enum as SQLEnum, Index, desc, text, TypeDecorator
+from sqlalchemy.dialects.postgresql import BIT
 
 from ..db.base import Base
 
@@ -16,12 +18,31 @@ class ProgressStatus(str, enum.Enum):
     ABANDONED = "abandoned"
 
 
+class Bits(TypeDecorator[str]):
+    """``bit varying`` read and written as a string of "0" and "1"."""
+
+    impl = BIT
+    cache_ok = True
+
+    def __init__(self) -> None:
+        super().__init__(varying=True)
+
+    def process_bind_param(self, value: Optional[str], dialect: Any) -> Optional[BitString]:
+        return BitString(value) if value is not None else None
+
+    def process_result_value(self, value: Any, dialect: Any) -> Optional[str]:
+        if value is None:
+            return None
+        # asyncpg's BitString, or SQLAlchemy's str subclass on 2.1
+        return value.as_string().replace(" ", "") if hasattr(value, "as_string") else str(value)
+
+
 class Progress(Base):
     __tablename__ = "progresses"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
-    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
     course_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
 
     status: Mapped[ProgressStatus] = mapped_column(
@@ -60,6 +81,11 @@ class Progress(Base):
         server_default="0"
     )
 
+    # Lesson n is bit n, see app.services.lessons; NULL before the first lesson
+    completed_lessons: Mapped[Optional[str]] = mapped_column(Bits(), nullable=True)
+    # Lessons in the course, as last reported by a lesson completion
+    lesson_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
@@ -76,4 +102,15 @@ class Progress(Base):
 
     __table_args__ = (
         Index('idx_user_course_progress', 'user_id', 'course_id', unique=True),
+        # getUserProgress ordering and its keyset pagination
+        Index('idx_progress_user_last_accessed', 'user_id', desc('last_accessed_at'), desc('id')),
+        # Completed courses and status counts; index-only for getCompletedCourses
+        Index('idx_progress_user_status', 'user_id', 'status', postgresql_include=['course_id']),
+        # Course leaderboards; the top is read without sorting the course
+        Index('idx_progress_course_time_spent', 'course_id', desc('total_time_spent'), 'user_id'),
+        # Completed courses in change order, for the certificate sweeper
+        Index(
+            'idx_progress_completed_updated', 'updated_at', 'id',
+            postgresql_where=text("status = 'COMPLETED' OR completion_percentage >= 100"),
+        ),
     )
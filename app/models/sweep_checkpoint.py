@@ -0,0 +1,29 @@
+"""Position of incremental sweeps, committed together with the work they did."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import BigInteger, String, DateTime, func
+
+from ..db.base import Base
+
+
+class SweepCheckpoint(Base):
+    __tablename__ = "sweep_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # Rows up to (swept_until, last_id) in the sweep's order are done
+    swept_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
@@ -0,0 +1,57 @@
+"""Rollup of per-user learning statistics maintained alongside the base tables."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import BigInteger, Integer, Float, DateTime, Index, desc, func
+
+from ..db.base import Base
+
+
+class UserStatistics(Base):
+    __tablename__ = "user_statistics"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+
+    total_courses: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_courses_in_progress: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_completed_courses: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_certificates: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_achievements: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_time_spent: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    total_completed_lessons: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    # Sum rather than average so it can be maintained with deltas
+    completion_percentage_sum: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        default=0.0,
+        server_default="0.0"
+    )
+
+    # Learning streak, see app.services.streaks: the last active day (days
+    # since 1970-01-01 UTC), a bitmap of the days before it and the streaks
+    last_active_day: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    recent_activity: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    current_streak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    longest_streak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # Leaderboards: the top users by each metric, and the number of
+        # users above a score for ranks beyond the ones kept in memory
+        Index('idx_user_statistics_time_spent', desc('total_time_spent'), 'user_id'),
+        Index('idx_user_statistics_completed_courses', desc('total_completed_courses'), 'user_id'),
+        Index('idx_user_statistics_achievements', desc('total_achievements'), 'user_id'),
+    )
@@ -12,3 +12,5 @@ class LearningStatistics:
     total_achievements: int
     total_time_spent_seconds: int
     average_completion_percentage: float
+    current_streak_days: int
+    longest_streak_days: int
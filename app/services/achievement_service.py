@@ -0,0 +1,172 @@
+"""Achievements awarded by declarative rules as the per-user counters change.
+
+Rules are indexed by the event they listen to, and every event is a counter
+of the ``user_statistics`` rollup going up, the learning streak included.
+Writers already update that row and read it back, so a rule is checked only
+when its counter moves and only against the before and after values: no
+history is scanned. A rule awards its achievement when the counter crosses
+its threshold, and the unique ``(user_id, achievement_type)`` index makes
+awards idempotent.
+"""
+import enum
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.achievement import Achievement
+from .notifications import ACHIEVEMENT_EARNED, NotificationService
+
+
+class AchievementEvent(str, enum.Enum):
+    """Events rules listen to, named after the counter whose increase signals them."""
+
+    COURSE_COMPLETED = "total_completed_courses"
+    CERTIFICATE_EARNED = "total_certificates"
+    TIME_SPENT = "total_time_spent"
+    LESSON_COMPLETED = "total_completed_lessons"
+    STREAK_EXTENDED = "current_streak"
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    """Award ``achievement_type`` once the counter of ``event`` reaches ``threshold``."""
+
+    achievement_type: str
+    achievement_name: str
+    description: str
+    event: AchievementEvent
+    threshold: int
+
+
+ACHIEVEMENT_RULES = (
+    AchievementRule(
+        "first_lesson", "First Lesson", "Completed a first lesson",
+        AchievementEvent.LESSON_COMPLETED, 1,
+    ),
+    AchievementRule(
+        "lessons_complete_100", "A Hundred Lessons", "Completed a hundred lessons",
+        AchievementEvent.LESSON_COMPLETED, 100,
+    ),
+    AchievementRule(
+        "course_complete", "Course Complete", "Completed a first course",
+        AchievementEvent.COURSE_COMPLETED, 1,
+    ),
+    AchievementRule(
+        "courses_complete_5", "Five Courses", "Completed five courses",
+        AchievementEvent.COURSE_COMPLETED, 5,
+    ),
+    AchievementRule(
+        "courses_complete_25", "Twenty-five Courses", "Completed twenty-five courses",
+        AchievementEvent.COURSE_COMPLETED, 25,
+    ),
+    AchievementRule(
+        "first_certificate", "Certified", "Earned a first course certificate",
+        AchievementEvent.CERTIFICATE_EARNED, 1,
+    ),
+    AchievementRule(
+        "streak_7_days", "Week Streak", "Learned seven days in a row",
+        AchievementEvent.STREAK_EXTENDED, 7,
+    ),
+    AchievementRule(
+        "streak_30_days", "Month Streak", "Learned thirty days in a row",
+        AchievementEvent.STREAK_EXTENDED, 30,
+    ),
+    AchievementRule(
+        "time_spent_10_hours", "Ten Hours In", "Spent ten hours learning",
+        AchievementEvent.TIME_SPENT, 10 * 3600,
+    ),
+    AchievementRule(
+        "time_spent_100_hours", "A Hundred Hours In", "Spent a hundred hours learning",
+        AchievementEvent.TIME_SPENT, 100 * 3600,
+    ),
+)
+
+
+class AchievementRules:
+    """Rules indexed by event, each event's rules sorted by threshold."""
+
+    def __init__(self, rules: Iterable[AchievementRule]) -> None:
+        self._by_event: Dict[AchievementEvent, List[AchievementRule]] = defaultdict(list)
+        for rule in sorted(rules, key=lambda rule: rule.threshold):
+            self._by_event[rule.event].append(rule)
+
+    def crossed(
+        self, before: Optional[Mapping[str, Any]], after: Mapping[str, Any]
+    ) -> List[AchievementRule]:
+        """Rules whose threshold a user's counters passed going from ``before`` to ``after``.
+
+        ``before`` is ``None`` for a user without counters yet. Events whose
+        counter is not in ``after`` are not checked.
+        """
+        crossed: List[AchievementRule] = []
+        for event, rules in self._by_event.items():
+            if event.value not in after:
+                continue
+            old = before[event.value] if before is not None else 0
+            new = after[event.value]
+            if new <= old:
+                continue
+            for rule in rules:
+                if rule.threshold > new:
+                    break
+                if rule.threshold > old:
+                    crossed.append(rule)
+        return crossed
+
+
+achievement_rules = AchievementRules(ACHIEVEMENT_RULES)
+
+
+class AchievementService:
+
+    @staticmethod
+    async def insert(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Achievement]:
+        """Insert achievements that users do not have yet and publish them.
+
+        Returns the rows that were inserted; a row whose user already has
+        its ``achievement_type`` is skipped. The caller updates the
+        statistics rollup and commits.
+        """
+        if not rows:
+            return []
+        stmt = (
+            pg_insert(Achievement)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Achievement.user_id, Achievement.achievement_type])
+            .returning(Achievement)
+        )
+        inserted = list((await db.scalars(stmt)).all())
+        await NotificationService.publish(db, ACHIEVEMENT_EARNED, inserted)  # type: ignore[arg-type]
+        return inserted
+
+    @staticmethod
+    async def award(
+        db: AsyncSession, awards: Iterable[Tuple[int, AchievementRule]]
+    ) -> List[Achievement]:
+        """Insert the achievements of ``(user_id, rule)`` pairs not awarded yet."""
+        return await AchievementService.insert(db, [
+            {
+                "user_id": user_id,
+                "achievement_type": rule.achievement_type,
+                "achievement_name": rule.achievement_name,
+                "description": rule.description,
+            }
+            for user_id, rule in awards
+        ])
+
+    @staticmethod
+    async def get_achievement(
+        db: AsyncSession, user_id: int, achievement_type: str
+    ) -> Optional[Achievement]:
+        query = select(Achievement).where(
+            and_(
+                Achievement.user_id == user_id,
+                Achievement.achievement_type == achievement_type,
+            )
+        )
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
@@ -0,0 +1,110 @@
+"""Certificate PDFs, rendered in worker processes of the certificate renderer.
+
+Kept free of application imports so a spawned worker starts quickly. The
+output depends only on the certificate contents, which makes a digest of
+the contents a valid name for the file.
+"""
+import os
+import tempfile
+import zlib
+from typing import Any, List, Mapping, Tuple
+
+# Landscape A4 in points
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+
+
+def _escape(text: str) -> str:
+    # PDF literal strings with the standard fonts are Latin-1
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _lines(content: Mapping[str, Any]) -> List[Tuple[str, int, str]]:
+    """``(font, size, text)`` of each line, top to bottom."""
+    lines = [
+        ("F2", 36, "Certificate of Completion"),
+        ("F1", 16, "This certifies that"),
+        ("F2", 24, f"Learner {content['user_id']}"),
+        ("F1", 16, f"completed course {content['course_id']}"),
+        ("F1", 14, f"on {content['earned_at'][:10]}"),
+    ]
+    details = []
+    if content.get("grade"):
+        details.append(f"Grade {content['grade']}")
+    if content.get("final_score") is not None:
+        details.append(f"Score {content['final_score']:g}")
+    if content.get("completion_time"):
+        details.append(f"{content['completion_time']:.1f} hours")
+    if details:
+        lines.append(("F1", 14, ", ".join(details)))
+    if content.get("expires_at"):
+        lines.append(("F1", 12, f"Valid until {content['expires_at'][:10]}"))
+    lines.append(("F1", 10, f"Certificate {content['certificate_id']}"))
+    return lines
+
+
+def _page(content: Mapping[str, Any]) -> bytes:
+    commands = ["2 w 36 36 770 523 re S", "0.5 w 46 46 750 503 re S", "BT"]
+    y = 470
+    for font, size, text in _lines(content):
+        # Helvetica averages about half an em per character; close enough to centre
+        x = max(60, (PAGE_WIDTH - len(text) * size * 0.5) / 2)
+        commands.append(f"/{font} {size} Tf 1 0 0 1 {x:.1f} {y} Tm ({_escape(text)}) Tj")
+        y -= int(size * 2.2)
+    commands.append("ET")
+    return "\n".join(commands).encode("latin-1")
+
+
+def render_pdf(content: Mapping[str, Any]) -> bytes:
+    """A one-page PDF of a certificate, from :func:`certificate_content` values."""
+    stream = zlib.compress(_page(content), 9)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            "/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+def store_path(directory: str, digest: str) -> str:
+    # Two-character fan-out keeps directories small
+    return os.path.join(directory, digest[:2], f"{digest}.pdf")
+
+
+def render_to_store(directory: str, digest: str, content: Mapping[str, Any]) -> bool:
+    """Render into the store unless the file exists; returns whether it rendered.
+
+    Files are written under a temporary name and renamed, so readers and
+    concurrent renders of the same digest never see a partial file.
+    """
+    path = store_path(directory, digest)
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pdf = render_pdf(content)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(pdf)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return True
@@ -0,0 +1,217 @@
+"""Background rendering of certificate PDFs into a content-addressed store.
+
+Issuing a certificate only enqueues its contents; the mutation never waits
+for a render. A dispatcher takes queued certificates in batches, renders
+them in a bounded process pool and fills in their ``pdf_url`` with one
+``UPDATE`` per batch. Files are named by a digest of the contents and the
+renderer version, so a certificate that was rendered before is a cache hit
+and costs no render. The queue is bounded too: certificates that do not
+fit, or are still queued at shutdown, keep a NULL ``pdf_url`` and are
+picked up by ``python -m app.tools.render_certificates``.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, String, bindparam, func, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.result_cache import result_cache
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.certificate import CourseCertificate
+from .certificate_pdf import render_to_store, store_path
+
+logger = logging.getLogger(__name__)
+
+# Part of every digest; bump when the layout changes to render everything anew
+RENDERER_VERSION = 1
+
+CertificateContent = Dict[str, Any]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def certificate_content(certificate: CourseCertificate) -> CertificateContent:
+    """The fields printed on a certificate, plus its id to store the URL."""
+    return {
+        "id": certificate.id,
+        "certificate_id": certificate.certificate_id,
+        "user_id": certificate.user_id,
+        "course_id": certificate.course_id,
+        "earned_at": _isoformat(certificate.earned_at),
+        "expires_at": _isoformat(certificate.expires_at),
+        "final_score": certificate.final_score,
+        "grade": certificate.grade,
+        "completion_time": certificate.completion_time,
+    }
+
+
+def content_digest(content: CertificateContent) -> str:
+    printed = {name: value for name, value in content.items() if name != "id"}
+    canonical = json.dumps([RENDERER_VERSION, printed], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def pdf_url(digest: str) -> str:
+    return f"{settings.certificate_url_prefix}/{digest}.pdf"
+
+
+class CertificateRenderer:
+    """Bounded queue of certificates to render and the process pool rendering them.
+
+    :meth:`submit` never blocks; certificates are dropped when the queue is
+    full or the renderer is not running, and rendered later by the backfill.
+    """
+
+    def __init__(self, enabled: bool, workers: int, queue_size: int, directory: str) -> None:
+        self.enabled = enabled
+        self.workers = workers
+        self.directory = directory
+        self.rendered = 0
+        self.hits = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue: "asyncio.Queue[CertificateContent]" = asyncio.Queue(maxsize=queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def submit(self, certificates: Iterable[CourseCertificate]) -> None:
+        """Queue certificates without a PDF; call after they are committed."""
+        if not self.running:
+            return
+        for certificate in certificates:
+            if certificate.pdf_url is not None:
+                continue
+            try:
+                self._queue.put_nowait(certificate_content(certificate))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning("Certificate render queue full, %d certificates left for the backfill", self.dropped)
+
+    async def _render(self, content: CertificateContent) -> Optional[Tuple[int, str]]:
+        digest = content_digest(content)
+        if os.path.exists(store_path(self.directory, digest)):
+            self.hits += 1
+            return content["id"], pdf_url(digest)
+
+        assert self._pool is not None
+        loop = asyncio.get_running_loop()
+        try:
+            rendered = await loop.run_in_executor(
+                self._pool, render_to_store, self.directory, digest, content
+            )
+        except Exception:
+            self.failed += 1
+            logger.exception("Rendering certificate %s failed", content["certificate_id"])
+            return None
+        if rendered:
+            self.rendered += 1
+        else:
+            self.hits += 1
+        return content["id"], pdf_url(digest)
+
+    async def render(self, contents: List[CertificateContent]) -> List[Tuple[int, str]]:
+        """Render certificates, in parallel up to the pool size; returns ``(id, pdf_url)``.
+
+        Starts the pool when it is not running, for use outside the
+        application.
+        """
+        if self._pool is None:
+            # Fresh interpreters; forking would copy the event loop and connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        results = await asyncio.gather(*(self._render(content) for content in contents))
+        return [result for result in results if result is not None]
+
+    @staticmethod
+    async def store_urls(db: AsyncSession, urls: List[Tuple[int, str]]) -> List[int]:
+        """Set ``pdf_url`` of certificates that have none; returns their users."""
+        if not urls:
+            return []
+        rendered = (
+            func.unnest(
+                bindparam("ids", [id_ for id_, _ in urls], type_=ARRAY(Integer)),
+                bindparam("urls", [url for _, url in urls], type_=ARRAY(String)),
+            )
+            .table_valued("id", "pdf_url")
+            .render_derived(name="rendered")
+        )
+        stmt = (
+            update(CourseCertificate)
+            .where(CourseCertificate.id == rendered.c.id, CourseCertificate.pdf_url.is_(None))
+            .values(pdf_url=rendered.c.pdf_url)
+            .returning(CourseCertificate.user_id)
+        )
+        result = await db.execute(stmt, execution_options={"synchronize_session": False})
+        return list(result.scalars().all())
+
+    async def _next_batch(self) -> List[CertificateContent]:
+        # Enough to keep every worker busy while the previous results are stored
+        batch = [await self._queue.get()]
+        while len(batch) < self.workers * 8 and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                urls = await self.render(batch)
+                async with AsyncSessionLocal() as db:
+                    user_ids = await self.store_urls(db, urls)
+                    await db.commit()
+                await result_cache.invalidate_users(user_ids)
+            except Exception:
+                # The certificates keep a NULL pdf_url for the backfill
+                logger.exception("Certificate render batch failed")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop dispatching; certificates still queued are left for the backfill."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "rendered": self.rendered,
+            "hits": self.hits,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+certificate_renderer = CertificateRenderer(
+    enabled=settings.certificate_render_enabled,
+    workers=settings.certificate_render_workers,
+    queue_size=settings.certificate_render_queue_size,
+    directory=settings.certificate_store_path,
+)
@@ -0,0 +1,176 @@
+"""Issue the certificates of completed courses in set-based batches.
+
+Each batch finds the next ``progresses`` rows that are completed or at
+100% and have no certificate yet with one anti-join, in the order of
+``updated_at`` and id, and inserts their certificates with one
+``INSERT ... ON CONFLICT DO NOTHING``, so certificates issued meanwhile by
+``createCertificate`` or :meth:`ProgressService.generate_certificate_if_eligible`
+are skipped. The position reached is committed with the batch, and the next
+sweep starts from there.
+
+Rows changed within the last ``certificate_sweep_lag`` seconds are left to
+the next sweep, so transactions still in flight when a sweep passes their
+``updated_at`` are not skipped. Imports keep the ``updated_at`` of their
+source, so rows imported behind the position need a sweep with ``restart``.
+Only one process sweeps at a time; the others skip while the checkpoint
+row is locked.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import exists, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.result_cache import result_cache
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.certificate import CourseCertificate
+from ..models.progress import Progress, ProgressStatus
+from ..models.sweep_checkpoint import SweepCheckpoint
+from .certificate_renderer import certificate_renderer
+from .statistics_service import StatisticsDelta, StatisticsService
+
+logger = logging.getLogger(__name__)
+
+SWEEP_NAME = "certificates"
+
+
+async def _claim_checkpoint(db: AsyncSession, restart: bool) -> Optional[SweepCheckpoint]:
+    """Lock the checkpoint for this transaction; None while another process sweeps."""
+    await db.execute(
+        pg_insert(SweepCheckpoint).values(name=SWEEP_NAME).on_conflict_do_nothing()
+    )
+    stmt = (
+        select(SweepCheckpoint)
+        .where(SweepCheckpoint.name == SWEEP_NAME)
+        .with_for_update(skip_locked=True)
+    )
+    checkpoint = (await db.scalars(stmt)).one_or_none()
+    if checkpoint is not None and restart:
+        checkpoint.swept_until = None
+        checkpoint.last_id = 0
+    return checkpoint
+
+
+class CertificateSweeper:
+
+    def __init__(self, enabled: bool, interval: float, batch_size: int, lag: float) -> None:
+        self.enabled = enabled
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lag = lag
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def _sweep_batch(
+        self, db: AsyncSession, checkpoint: SweepCheckpoint, cutoff: datetime
+    ) -> Optional[List[CourseCertificate]]:
+        """Issue the next batch and advance the checkpoint; None once swept up to ``cutoff``."""
+        has_certificate = exists().where(
+            CourseCertificate.user_id == Progress.user_id,
+            CourseCertificate.course_id == Progress.course_id,
+        )
+        stmt = (
+            select(Progress.id, Progress.user_id, Progress.course_id, Progress.total_time_spent, Progress.updated_at)
+            .where(
+                or_(Progress.status == ProgressStatus.COMPLETED, Progress.completion_percentage >= 100.0),
+                Progress.updated_at < cutoff,
+                ~has_certificate,
+            )
+            .order_by(Progress.updated_at, Progress.id)
+            .limit(self.batch_size)
+        )
+        if checkpoint.swept_until is not None:
+            stmt = stmt.where(
+                tuple_(Progress.updated_at, Progress.id) > (checkpoint.swept_until, checkpoint.last_id)
+            )
+        rows = (await db.execute(stmt)).all()
+        if not rows:
+            checkpoint.swept_until = cutoff
+            checkpoint.last_id = 0
+            return None
+
+        # Executemany, batched into multi-row statements by SQLAlchemy; the
+        # signature default needs the other defaults of each row, which a
+        # single multi-VALUES statement does not give it
+        insert = (
+            pg_insert(CourseCertificate)
+            .on_conflict_do_nothing(index_elements=[CourseCertificate.user_id, CourseCertificate.course_id])
+            .returning(CourseCertificate)
+        )
+        certificates = list((await db.scalars(insert, [
+            {
+                "user_id": row.user_id,
+                "course_id": row.course_id,
+                # Hours, as createCertificate computes it
+                "completion_time": row.total_time_spent / 3600.0,
+            }
+            for row in rows
+        ])).all())
+        issued = Counter(certificate.user_id for certificate in certificates)
+        await StatisticsService.apply_deltas(db, {
+            user_id: StatisticsDelta(total_certificates=count) for user_id, count in issued.items()
+        })
+        checkpoint.swept_until = rows[-1].updated_at
+        checkpoint.last_id = rows[-1].id
+        # Keep them loaded for the renderer; the commit would expire them
+        for certificate in certificates:
+            db.expunge(certificate)
+        return certificates
+
+    async def sweep(self, restart: bool = False) -> int:
+        """Issue certificates up to ``lag`` seconds ago; returns how many were issued."""
+        async with AsyncSessionLocal() as db:
+            now: datetime = (await db.execute(select(func.now()))).scalar_one()
+        cutoff = now - timedelta(seconds=self.lag)
+
+        issued = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                checkpoint = await _claim_checkpoint(db, restart)
+                if checkpoint is None:
+                    logger.info("Certificate sweep skipped: another process is sweeping")
+                    return issued
+                restart = False
+                certificates = await self._sweep_batch(db, checkpoint, cutoff)
+                await db.commit()
+            if certificates is None:
+                return issued
+
+            issued += len(certificates)
+            await result_cache.invalidate_users({certificate.user_id for certificate in certificates})
+            certificate_renderer.submit(certificates)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                issued = await self.sweep()
+                if issued:
+                    logger.info("Certificate sweep issued %d certificates", issued)
+            except Exception:
+                logger.exception("Certificate sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+certificate_sweeper = CertificateSweeper(
+    enabled=settings.certificate_sweep_enabled,
+    interval=settings.certificate_sweep_interval,
+    batch_size=settings.certificate_sweep_batch_size,
+    lag=settings.certificate_sweep_lag,
+)
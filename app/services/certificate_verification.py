@@ -0,0 +1,206 @@
+"""Verification of a certificate id and signature, as printed on a certificate.
+
+HMAC signatures are checked against the key first, so forgeries are
+rejected without touching the database. Legacy random signatures carry no
+proof, and are first looked up in a Bloom filter of the issued certificate
+ids, which rejects unknown ids without a query as well. What passes is read
+from an in-process LRU of certificates, or by the unique ``certificate_id``
+on a miss, and compared with the stored signature; for HMAC signatures the
+signed fields must also still match the row.
+
+The filter is read once and extended every ``certificate_bloom_refresh_interval``
+seconds with certificates inserted since, so a legacy signature imported in
+another process may be reported as not found until the next refresh.
+"""
+import asyncio
+import enum
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.backends import MemoryCache
+from ..core.certificate_signing import is_signed, read_signature, signed_fields, signing_enabled
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.certificate import CourseCertificate
+from .bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+# Rows read per round trip while loading the filter
+LOAD_BATCH_SIZE = 10000
+
+# Ids the filter is sized for beyond those issued when it is built
+MIN_CAPACITY = 1024
+
+_FIELDS = (
+    "certificate_id", "user_id", "course_id", "earned_at", "expires_at",
+    "final_score", "grade", "digital_signature",
+)
+
+
+class VerificationStatus(str, enum.Enum):
+    VALID = "valid"
+    EXPIRED = "expired"
+    INVALID_SIGNATURE = "invalid_signature"
+    NOT_FOUND = "not_found"
+
+
+class Verification(NamedTuple):
+    status: VerificationStatus
+    # The stored certificate fields, when its signature matched
+    certificate: Optional[Dict[str, Any]] = None
+
+
+def _dump(certificate: Dict[str, Any]) -> str:
+    return json.dumps(
+        {key: value.isoformat() if isinstance(value, datetime) else value
+         for key, value in certificate.items()}
+    )
+
+
+def _load(cached: str) -> Dict[str, Any]:
+    certificate: Dict[str, Any] = json.loads(cached)
+    for key in ("earned_at", "expires_at"):
+        if certificate[key] is not None:
+            certificate[key] = datetime.fromisoformat(certificate[key])
+    return certificate
+
+
+class CertificateVerifier:
+
+    def __init__(
+        self, cache_size: int, cache_ttl: float, error_rate: float, refresh_interval: float
+    ) -> None:
+        self.cache_ttl = cache_ttl
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._cache = MemoryCache(cache_size)
+        self._bloom: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+
+        # Outcomes, by what decided them
+        self.rejected_by_signature = 0
+        self.rejected_by_bloom = 0
+        self.cache_hits = 0
+        self.lookups = 0
+
+    async def _read_ids(self, bloom: BloomFilter, after: int) -> int:
+        """Add the ids of certificates with ``id > after``; returns the last id."""
+        stmt = (
+            select(CourseCertificate.id, CourseCertificate.certificate_id)
+            .where(CourseCertificate.id > after)
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.stream(stmt)
+            async for partition in result.partitions():
+                for row_id, certificate_id in partition:
+                    bloom.add(certificate_id)
+                    after = max(after, row_id)
+        return after
+
+    async def load(self) -> None:
+        """Build the filter of all issued certificate ids."""
+        async with self._lock:
+            async with AsyncSessionLocal() as db_session:
+                count = await db_session.scalar(select(func.count()).select_from(CourseCertificate))
+            bloom = BloomFilter(max(2 * (count or 0), MIN_CAPACITY), self.error_rate)
+            self._last_id = await self._read_ids(bloom, 0)
+            self._bloom = bloom
+
+    async def refresh(self) -> None:
+        """Add certificates inserted since the last read, rebuilding once the filter is full."""
+        if self._bloom is None or self._bloom.count >= self._bloom.capacity:
+            await self.load()
+            return
+        async with self._lock:
+            self._last_id = await self._read_ids(self._bloom, self._last_id)
+
+    async def _find(self, db: AsyncSession, certificate_id: str) -> Optional[Dict[str, Any]]:
+        cached = (await self._cache.get_many([certificate_id]))[0]
+        if cached is not None:
+            self.cache_hits += 1
+            return _load(cached)
+
+        self.lookups += 1
+        stmt = select(*(getattr(CourseCertificate, field) for field in _FIELDS)).where(
+            CourseCertificate.certificate_id == certificate_id
+        )
+        row = (await db.execute(stmt)).one_or_none()
+        if row is None:
+            # Not cached: the certificate may be committed any moment
+            return None
+        certificate = dict(row._mapping)
+        await self._cache.set_many({certificate_id: _dump(certificate)}, self.cache_ttl)
+        return certificate
+
+    async def verify(self, db: AsyncSession, certificate_id: str, signature: str) -> Verification:
+        fields = None
+        # Without the key, signed certificates are checked like unsigned ones
+        if is_signed(signature) and signing_enabled():
+            fields = read_signature(certificate_id, signature)
+            if fields is None:
+                self.rejected_by_signature += 1
+                return Verification(VerificationStatus.INVALID_SIGNATURE)
+        elif self._bloom is not None and certificate_id not in self._bloom:
+            self.rejected_by_bloom += 1
+            return Verification(VerificationStatus.NOT_FOUND)
+
+        certificate = await self._find(db, certificate_id)
+        if certificate is None:
+            return Verification(VerificationStatus.NOT_FOUND)
+        if certificate["digital_signature"] != signature:
+            return Verification(VerificationStatus.INVALID_SIGNATURE)
+        if fields is not None and fields != signed_fields(certificate):
+            # Authentic signature, but the row was changed since it was signed
+            return Verification(VerificationStatus.INVALID_SIGNATURE)
+
+        expires_at = certificate["expires_at"]
+        if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            return Verification(VerificationStatus.EXPIRED, certificate)
+        return Verification(VerificationStatus.VALID, certificate)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Certificate filter refresh failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "bloom_entries": self._bloom.count if self._bloom is not None else 0,
+            "rejected_by_signature": self.rejected_by_signature,
+            "rejected_by_bloom": self.rejected_by_bloom,
+            "cache_hits": self.cache_hits,
+            "lookups": self.lookups,
+        }
+
+
+certificate_verifier = CertificateVerifier(
+    cache_size=settings.certificate_verify_cache_size,
+    cache_ttl=settings.certificate_verify_cache_ttl,
+    error_rate=settings.certificate_bloom_error_rate,
+    refresh_interval=settings.certificate_bloom_refresh_interval,
+)
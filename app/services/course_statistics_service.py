@@ -0,0 +1,121 @@
+"""Per-course analytics computed in one aggregate pass over ``progresses``.
+
+Results are cached per course for ``course_statistics_ttl`` seconds, and
+concurrent requests for a course that is not cached share one query, so a
+popular course is scanned at most once per TTL and worker.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.backends import MemoryCache
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.progress import Progress, ProgressStatus
+
+# Completion percentage histogram: ten buckets of ten points, 100% in the last
+HISTOGRAM_BUCKETS = 10
+HALFWAY_PERCENTAGE = 50.0
+
+
+def _statistics_query(course_id: int) -> Any:
+    bucket = func.least(
+        func.greatest(
+            func.width_bucket(Progress.completion_percentage, 0.0, 100.0, HISTOGRAM_BUCKETS), 1
+        ),
+        HISTOGRAM_BUCKETS,
+    )
+    completed = Progress.status == ProgressStatus.COMPLETED
+    return select(
+        func.count().label("total"),
+        *(
+            func.count().filter(Progress.status == status).label(f"status_{status.value}")
+            for status in ProgressStatus
+        ),
+        *(
+            func.count().filter(bucket == index).label(f"bucket_{index}")
+            for index in range(1, HISTOGRAM_BUCKETS + 1)
+        ),
+        func.percentile_cont(0.5).within_group(Progress.total_time_spent).label("time_spent_p50"),
+        func.percentile_cont(0.9).within_group(Progress.total_time_spent).label("time_spent_p90"),
+        func.avg(func.extract("epoch", Progress.completed_at - Progress.started_at)).filter(
+            and_(completed, Progress.started_at.is_not(None), Progress.completed_at.is_not(None))
+        ).label("average_time_to_completion"),
+        func.count().filter(
+            or_(Progress.status != ProgressStatus.NOT_STARTED, Progress.completion_percentage > 0)
+        ).label("started"),
+        func.count().filter(
+            or_(completed, Progress.completion_percentage >= HALFWAY_PERCENTAGE)
+        ).label("halfway"),
+    ).where(Progress.course_id == course_id)
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+_cache = MemoryCache(settings.course_statistics_cache_size)
+# Queries running for courses that are not cached, by course id
+_in_flight: Dict[int, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+class CourseStatisticsService:
+
+    @staticmethod
+    async def compute(db: AsyncSession, course_id: int) -> Dict[str, Any]:
+        """Status counts, completion histogram, time percentiles and funnel of a course."""
+        row = (await db.execute(_statistics_query(course_id))).mappings().one()
+        step = 100.0 / HISTOGRAM_BUCKETS
+        return {
+            "course_id": course_id,
+            "total_learners": row["total"],
+            "status_counts": {status.value: row[f"status_{status.value}"] for status in ProgressStatus},
+            "completion_histogram": [
+                {
+                    "lower_bound": (index - 1) * step,
+                    "upper_bound": index * step,
+                    "count": row[f"bucket_{index}"],
+                }
+                for index in range(1, HISTOGRAM_BUCKETS + 1)
+            ],
+            "time_spent_p50": _optional_float(row["time_spent_p50"]),
+            "time_spent_p90": _optional_float(row["time_spent_p90"]),
+            "average_time_to_completion": _optional_float(row["average_time_to_completion"]),
+            "funnel": {
+                "enrolled": row["total"],
+                "started": row["started"],
+                "halfway": row["halfway"],
+                "completed": row[f"status_{ProgressStatus.COMPLETED.value}"],
+            },
+        }
+
+    @staticmethod
+    async def _compute_and_cache(course_id: int, key: str) -> Dict[str, Any]:
+        async with AsyncSessionLocal() as db_session:
+            statistics = await CourseStatisticsService.compute(db_session, course_id)
+        await _cache.set_many({key: json.dumps(statistics)}, settings.course_statistics_ttl)
+        return statistics
+
+    @staticmethod
+    async def get_course_statistics(course_id: int) -> Dict[str, Any]:
+        """Cached statistics of a course.
+
+        The query runs in a task and session of its own, shared by all
+        requests waiting for the course, so a cancelled request does not
+        abort it for the others.
+        """
+        key = f"course_statistics:{course_id}"
+        cached = (await _cache.get_many([key]))[0]
+        if cached is not None:
+            statistics: Dict[str, Any] = json.loads(cached)
+            return statistics
+
+        task = _in_flight.get(course_id)
+        if task is None:
+            task = asyncio.create_task(CourseStatisticsService._compute_and_cache(course_id, key))
+            _in_flight[course_id] = task
+            task.add_done_callback(lambda _: _in_flight.pop(course_id, None))
+        return await asyncio.shield(task)
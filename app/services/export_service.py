@@ -0,0 +1,126 @@
+"""Full-table exports streamed from a server-side cursor.
+
+Rows are fetched ``export_batch_size`` at a time and encoded batch by
+batch, so memory stays flat however many rows are exported.
+"""
+import csv
+import enum
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Column, Select, Table, select
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.achievement import Achievement
+from ..models.certificate import CourseCertificate
+from ..models.progress import Progress
+
+
+class ExportTable(str, enum.Enum):
+    PROGRESSES = "progresses"
+    CERTIFICATES = "certificates"
+    ACHIEVEMENTS = "achievements"
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+# Table of each export and the column its time range applies to
+EXPORT_TABLES: Dict[ExportTable, Table] = {
+    ExportTable.PROGRESSES: Progress.__table__,  # type: ignore[dict-item]
+    ExportTable.CERTIFICATES: CourseCertificate.__table__,  # type: ignore[dict-item]
+    ExportTable.ACHIEVEMENTS: Achievement.__table__,  # type: ignore[dict-item]
+}
+TIME_COLUMNS: Dict[ExportTable, str] = {
+    ExportTable.PROGRESSES: "updated_at",
+    ExportTable.CERTIFICATES: "earned_at",
+    ExportTable.ACHIEVEMENTS: "earned_at",
+}
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class ExportService:
+
+    @staticmethod
+    def columns(table: ExportTable) -> List[Column[Any]]:
+        return list(EXPORT_TABLES[table].columns)
+
+    @staticmethod
+    def build_query(
+            table: ExportTable,
+            course_id: Optional[int] = None,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None
+    ) -> Select[Any]:
+        """Rows of ``table`` in id order; ``since`` is inclusive, ``until`` exclusive."""
+        source = EXPORT_TABLES[table]
+        if course_id is not None and "course_id" not in source.columns:
+            raise ValueError(f"{table.value} cannot be filtered by course")
+
+        stmt = select(*source.columns).order_by(source.c.id)
+        if course_id is not None:
+            stmt = stmt.where(source.c.course_id == course_id)
+        time_column = source.c[TIME_COLUMNS[table]]
+        if since is not None:
+            stmt = stmt.where(time_column >= since)
+        if until is not None:
+            stmt = stmt.where(time_column < until)
+        return stmt
+
+    @staticmethod
+    async def stream_rows(stmt: Select[Any]) -> AsyncIterator[Sequence[Sequence[Any]]]:
+        """Yield the rows of ``stmt`` in batches from a server-side cursor.
+
+        The next batch is fetched only once the previous one has been
+        consumed, so a slow consumer holds back the cursor rather than
+        filling memory.
+        """
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.stream(
+                stmt.execution_options(yield_per=settings.export_batch_size)
+            )
+            async for partition in result.partitions():
+                yield partition
+
+    @staticmethod
+    def encode_header(table: ExportTable, export_format: ExportFormat) -> bytes:
+        if export_format != ExportFormat.CSV:
+            return b""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(column.name for column in ExportService.columns(table))
+        return buffer.getvalue().encode()
+
+    @staticmethod
+    def encode_rows(
+            table: ExportTable,
+            export_format: ExportFormat,
+            rows: Sequence[Sequence[Any]]
+    ) -> bytes:
+        buffer = io.StringIO()
+        if export_format == ExportFormat.CSV:
+            # NULL is an empty field; enums and datetimes as in NDJSON
+            csv.writer(buffer).writerows([_value(value) for value in row] for row in rows)
+        else:
+            names = [column.name for column in ExportService.columns(table)]
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(names, map(_value, row)))))
+                buffer.write("\n")
+        return buffer.getvalue().encode()
@@ -0,0 +1,259 @@
+"""Leaderboards ranked from the ``user_statistics`` rollup.
+
+Every worker keeps the scores of all users in one :class:`RankedSet` per
+metric, so a user's rank and the top of a leaderboard take O(log n) instead
+of sorting all users per request. The sets are loaded once and then kept
+current from ``statistics_updated`` notifications, which every change to
+the rollup publishes in its transaction; workers apply them independently,
+so for a moment after a change they may disagree.
+
+With ``leaderboard_max_users`` a worker keeps only that many top users per
+metric, which bounds its memory and load time; ranks of the other users are
+counted in SQL on the metric's index. A set always holds every user scoring above its lowest key,
+so ranks within it stay exact as users move in and out. Sets that shrank to
+half of the bound are reloaded on next use.
+"""
+import asyncio
+import enum
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.progress import Progress
+from ..models.user_statistics import UserStatistics
+from .notifications import STATISTICS_UPDATED, notification_hub
+from .ranking import RankedSet
+
+
+class LeaderboardMetric(str, enum.Enum):
+    """Ranked metrics, named after their ``user_statistics`` column."""
+
+    TIME_SPENT = "total_time_spent"
+    COMPLETED_COURSES = "total_completed_courses"
+    ACHIEVEMENTS = "total_achievements"
+
+
+METRICS = tuple(LeaderboardMetric)
+METRIC_COLUMNS = [metric.value for metric in METRICS]
+
+# Keys sort by score descending, then by user id; ids are offset so that
+# negative ids keep their order
+USER_ID_OFFSET = 1 << 31
+KEY_SPAN = 1 << 32
+
+# Rows read per round trip while loading the rankings
+LOAD_BATCH_SIZE = 10000
+
+
+class LeaderboardEntry(NamedTuple):
+    rank: int
+    user_id: int
+    score: int
+
+
+def _key(user_id: int, score: int) -> int:
+    return -score * KEY_SPAN + user_id + USER_ID_OFFSET
+
+
+def _decode(key: int) -> Tuple[int, int]:
+    return key % KEY_SPAN - USER_ID_OFFSET, -(key // KEY_SPAN)
+
+
+def _ranked(rows: Iterable[Tuple[int, int]], first_rank: int = 1) -> List[LeaderboardEntry]:
+    """Number ``(user_id, score)`` rows sorted by score; ties share a rank."""
+    entries: List[LeaderboardEntry] = []
+    for position, (user_id, score) in enumerate(rows):
+        if entries and entries[-1].score == score:
+            rank = entries[-1].rank
+        else:
+            rank = first_rank + position
+        entries.append(LeaderboardEntry(rank=rank, user_id=user_id, score=score))
+    return entries
+
+
+def _check_limit(limit: int) -> None:
+    if not 1 <= limit <= settings.max_page_size:
+        raise ValueError(f"limit must be between 1 and {settings.max_page_size}")
+
+
+class Leaderboard:
+    """Rankings of the users by each :class:`LeaderboardMetric`.
+
+    ``max_users`` bounds the users kept per metric, the top ones; 0 keeps all.
+    """
+
+    def __init__(self, max_users: int = 0) -> None:
+        self.max_users = max_users
+        self._rankings: Dict[LeaderboardMetric, RankedSet] = {}
+        # Scores of the users in each ranking
+        self._scores: Dict[LeaderboardMetric, Dict[int, int]] = {}
+        # Whether a ranking holds every user rather than the top ones
+        self._complete: Dict[LeaderboardMetric, bool] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        # Events that arrive while the snapshot is read, replayed after it
+        self._pending: Optional[List[Dict[str, Any]]] = None
+
+    async def _read_scores(self) -> Dict[LeaderboardMetric, Dict[int, int]]:
+        scores: Dict[LeaderboardMetric, Dict[int, int]] = {metric: {} for metric in METRICS}
+        async with AsyncSessionLocal() as db_session:
+            if not self.max_users:
+                stmt = select(UserStatistics.user_id, *(
+                    getattr(UserStatistics, column) for column in METRIC_COLUMNS
+                )).execution_options(yield_per=LOAD_BATCH_SIZE)
+                result = await db_session.stream(stmt)
+                async for partition in result.partitions():
+                    for user_id, *values in partition:
+                        for metric, value in zip(METRICS, values):
+                            scores[metric][user_id] = value
+                return scores
+
+            for metric in METRICS:
+                column = getattr(UserStatistics, metric.value)
+                stmt = (
+                    select(UserStatistics.user_id, column)
+                    .order_by(column.desc(), UserStatistics.user_id)
+                    .limit(self.max_users)
+                )
+                scores[metric] = dict((await db_session.execute(stmt)).tuples().all())
+        return scores
+
+    async def load(self) -> None:
+        """Read the scores once; later changes arrive as notifications.
+
+        Events carry the stored values and arrive in commit order, so
+        replaying those received during the read leaves every user at the
+        latest committed score, whether or not the snapshot included it.
+        """
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._pending = []
+            try:
+                await notification_hub.add_handler(STATISTICS_UPDATED, self._on_event)
+                self._scores = await self._read_scores()
+                self._complete = {
+                    metric: not self.max_users or len(self._scores[metric]) < self.max_users
+                    for metric in METRICS
+                }
+                self._rankings = {
+                    metric: RankedSet(_key(user_id, score) for user_id, score in self._scores[metric].items())
+                    for metric in METRICS
+                }
+                self._loaded = True
+                for event in self._pending:
+                    self._apply(event)
+            finally:
+                self._pending = None
+
+    def _on_event(self, event: Optional[Dict[str, Any]]) -> None:
+        if event is None:
+            # Changes may be missed until listening again; reload on next use
+            self._loaded = False
+        elif self._pending is not None:
+            self._pending.append(event)
+        elif self._loaded:
+            self._apply(event)
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        user_id = event["user_id"]
+        for metric in METRICS:
+            score = event[metric.value]
+            scores = self._scores[metric]
+            previous = scores.get(user_id)
+            if previous == score:
+                continue
+            ranking = self._rankings[metric]
+            if previous is not None:
+                ranking.discard(_key(user_id, previous))
+                del scores[user_id]
+
+            key = _key(user_id, score)
+            lowest = ranking.last()
+            # Users scoring below the lowest kept one may be behind others
+            # that are not kept
+            if self._complete[metric] or (lowest is not None and key < lowest):
+                ranking.add(key)
+                scores[user_id] = score
+                if len(ranking) > self.max_users and not self._complete[metric]:
+                    dropped = ranking.last()
+                    assert dropped is not None
+                    ranking.discard(dropped)
+                    del scores[_decode(dropped)[0]]
+            elif len(ranking) <= self.max_users // 2:
+                self._loaded = False
+
+    async def top(self, metric: LeaderboardMetric, limit: int) -> List[LeaderboardEntry]:
+        _check_limit(limit)
+        await self.load()
+        if not self._complete[metric] and len(self._rankings[metric]) < limit:
+            self._loaded = False
+            await self.load()
+        ranking = self._rankings[metric]
+        rows: List[Tuple[int, int]] = []
+        for key in ranking.iter_from(0):
+            if len(rows) == limit:
+                break
+            rows.append(_decode(key))
+        return _ranked(rows)
+
+    async def rank(self, user_id: int, metric: LeaderboardMetric) -> Optional[LeaderboardEntry]:
+        """Rank of ``user_id``, ``None`` for users without statistics.
+
+        The rank is one more than the number of users with a higher score.
+        """
+        await self.load()
+        score = self._scores[metric].get(user_id)
+        if score is None:
+            if self._complete[metric]:
+                return None
+            return await self._count_rank(user_id, metric)
+        # Keys below the smallest key with this score have higher scores
+        higher = self._rankings[metric].bisect_left(-score * KEY_SPAN)
+        return LeaderboardEntry(rank=higher + 1, user_id=user_id, score=score)
+
+    async def _count_rank(self, user_id: int, metric: LeaderboardMetric) -> Optional[LeaderboardEntry]:
+        # Reads the metric's index from the top down to the user's score, so
+        # it costs O(rank) rather than a scan of the table
+        column = getattr(UserStatistics, metric.value)
+        async with AsyncSessionLocal() as db_session:
+            score: Optional[int] = await db_session.scalar(
+                select(column).where(UserStatistics.user_id == user_id)
+            )
+            if score is None:
+                return None
+            higher = (await db_session.execute(select(func.count()).where(column > score))).scalar_one()
+        return LeaderboardEntry(rank=higher + 1, user_id=user_id, score=score)
+
+
+leaderboard = Leaderboard(max_users=settings.leaderboard_max_users)
+
+
+class LeaderboardService:
+
+    @staticmethod
+    async def course_top(
+            db: AsyncSession,
+            course_id: int,
+            metric: LeaderboardMetric,
+            limit: int
+    ) -> List[LeaderboardEntry]:
+        """Top of a course's leaderboard, read from ``idx_progress_course_time_spent``.
+
+        Only time spent is ranked per course; the index scan stops after
+        ``limit`` rows, however many users take the course.
+        """
+        if metric != LeaderboardMetric.TIME_SPENT:
+            raise ValueError("Course leaderboards only rank TIME_SPENT")
+        _check_limit(limit)
+        stmt = (
+            select(Progress.user_id, Progress.total_time_spent)
+            .where(Progress.course_id == course_id)
+            .order_by(Progress.total_time_spent.desc(), Progress.user_id)
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+        return _ranked((user_id, score) for user_id, score in result.all())
@@ -0,0 +1,145 @@
+"""Change events published with ``pg_notify`` and fanned out per worker.
+
+Events are sent inside the writing transaction, so subscribers only hear
+about committed changes. Each worker keeps one asyncpg connection that
+LISTENs on all channels and hands events to in-memory subscriber queues.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import Text
+
+from ..cache.result_cache import model_to_dict
+from ..core.config import settings
+from ..db.base import Base
+from ..db.session import engine
+
+PROGRESS_UPDATED = "progress_updated"
+ACHIEVEMENT_EARNED = "achievement_earned"
+STATISTICS_UPDATED = "statistics_updated"
+CHANNELS = (PROGRESS_UPDATED, ACHIEVEMENT_EARNED, STATISTICS_UPDATED)
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_PAYLOAD_SIZE = 7900
+
+SubscriberKey = Tuple[str, int]
+# Called with every event of a channel, and with None when the connection is lost
+EventHandler = Callable[[Optional[Dict[str, Any]]], None]
+
+
+def _payload(model: Base) -> str:
+    values = model_to_dict(model)
+    payload = json.dumps(values)
+    if len(payload.encode()) > MAX_PAYLOAD_SIZE:
+        # Subscribers reload rows sent without their values
+        payload = json.dumps({"id": values["id"], "user_id": values["user_id"], "truncated": True})
+    return payload
+
+
+class NotificationService:
+
+    @staticmethod
+    async def publish(db: AsyncSession, channel: str, models: List[Base]) -> None:
+        """Queue one event per row on ``channel``, delivered when ``db`` commits."""
+        await NotificationService._notify(db, channel, [_payload(model) for model in models])
+
+    @staticmethod
+    async def publish_events(db: AsyncSession, channel: str, events: List[Dict[str, Any]]) -> None:
+        """Queue small events given as values, each with a ``user_id``."""
+        await NotificationService._notify(db, channel, [json.dumps(event) for event in events])
+
+    @staticmethod
+    async def _notify(db: AsyncSession, channel: str, payloads: List[str]) -> None:
+        if not payloads:
+            return
+        rows = (
+            func.unnest(bindparam("payloads", type_=ARRAY(Text)))
+            .table_valued("payload")
+            .render_derived(name="payloads")
+        )
+        stmt = select(func.pg_notify(channel, rows.c.payload))
+        await db.execute(stmt, {"payloads": payloads})
+
+
+class NotificationHub:
+    """Fans out events of one LISTEN connection to subscriber queues."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._connection: Optional[asyncpg.Connection] = None
+        self._connect_lock = asyncio.Lock()
+        # None tells a subscriber the connection was lost
+        self._subscribers: Dict[SubscriberKey, Set["asyncio.Queue[Optional[Dict[str, Any]]]"]] = (
+            defaultdict(set)
+        )
+        self._handlers: Dict[str, List[EventHandler]] = defaultdict(list)
+
+    async def _listen(self) -> None:
+        async with self._connect_lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+            connection = await asyncpg.connect(dsn)
+            for channel in CHANNELS:
+                await connection.add_listener(channel, self._dispatch)
+            connection.add_termination_listener(self._terminated)
+            self._connection = connection
+
+    def _dispatch(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        event = json.loads(payload)
+        for handler in self._handlers.get(channel, ()):
+            handler(event)
+        for queue in self._subscribers.get((channel, event["user_id"]), ()):
+            if queue.full():
+                # Slow subscribers miss the oldest events rather than grow
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _terminated(self, connection: Any) -> None:
+        self._connection = None
+        for handlers in self._handlers.values():
+            for handler in handlers:
+                handler(None)
+        for queues in self._subscribers.values():
+            for queue in queues:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def add_handler(self, channel: str, handler: EventHandler) -> None:
+        """Call ``handler`` with every event of ``channel``, once listening."""
+        if handler not in self._handlers[channel]:
+            self._handlers[channel].append(handler)
+        await self._listen()
+
+    async def subscribe(self, channel: str, user_id: int) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the events of ``user_id`` on ``channel`` until cancelled."""
+        key = (channel, user_id)
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(self.queue_size)
+        self._subscribers[key].add(queue)
+        try:
+            await self._listen()
+            while True:
+                event = await queue.get()
+                if event is None:
+                    raise ConnectionError("Lost the notification connection")
+                yield event
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+notification_hub = NotificationHub(queue_size=settings.subscription_queue_size)
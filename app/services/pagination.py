@@ -0,0 +1,62 @@
+"""Keyset pagination over ``(sort column, id)`` in descending order."""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from ..core.config import settings
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class PaginationService:
+
+    @staticmethod
+    async def paginate(
+            db: AsyncSession,
+            stmt: Select[Any],
+            sort_column: InstrumentedAttribute[Any],
+            id_column: InstrumentedAttribute[int],
+            first: int,
+            after: Optional[str] = None,
+    ) -> Tuple[List[Tuple[Any, str]], bool]:
+        """Return up to ``first`` rows after the ``after`` cursor, each with its
+        own cursor, and whether more rows follow.
+
+        Seeks with ``WHERE (sort_column, id) < (...)`` instead of OFFSET, so
+        every page costs the same on an index over ``(..., sort_column, id)``.
+        """
+        if not 1 <= first <= settings.max_page_size:
+            raise ValueError(f"first must be between 1 and {settings.max_page_size}")
+
+        if after is not None:
+            stmt = stmt.where(tuple_(sort_column, id_column) < decode_cursor(after))
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc()).limit(first + 1)
+
+        result = await db.execute(stmt)
+        rows = list(result.scalars().all())
+
+        page = rows[:first]
+        edges = [
+            (row, encode_cursor(getattr(row, sort_column.key), getattr(row, id_column.key)))
+            for row in page
+        ]
+        return edges, len(rows) > first
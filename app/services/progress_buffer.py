@@ -0,0 +1,157 @@
+"""In-process write-behind buffer coalescing time-spent heartbeats."""
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from ..cache.result_cache import result_cache
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from .progress_service import ProgressService, ProgressUpdate
+
+logger = logging.getLogger(__name__)
+
+ProgressKey = Tuple[int, int]
+
+
+@dataclass
+class PendingProgress:
+    """Heartbeats of one ``(user_id, course_id)`` not yet written to Postgres."""
+
+    time_spent_seconds: int = 0
+    last_accessed_at: Optional[datetime] = None
+
+    def add(self, time_spent_seconds: int, accessed_at: datetime) -> None:
+        self.time_spent_seconds += time_spent_seconds
+        if self.last_accessed_at is None or accessed_at > self.last_accessed_at:
+            self.last_accessed_at = accessed_at
+
+
+class ProgressWriteBuffer:
+    """Sums heartbeat deltas per course and flushes them in batched upserts.
+
+    Flushes run every ``flush_interval`` seconds, as soon as ``max_size``
+    keys are pending, and on shutdown. Until a delta is committed it can be
+    read back with :meth:`pending` so responses stay read-your-writes.
+    """
+
+    def __init__(self, enabled: bool, flush_interval: float, max_size: int) -> None:
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+
+        self._pending: Dict[ProgressKey, PendingProgress] = {}
+        # Deltas taken by a flush that has not committed yet
+        self._flushing: Dict[ProgressKey, PendingProgress] = {}
+        self._pending_time_by_user: Dict[int, int] = defaultdict(int)
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def add(
+        self, user_id: int, course_id: int, time_spent_seconds: int, accessed_at: datetime
+    ) -> None:
+        key = (user_id, course_id)
+        self._pending.setdefault(key, PendingProgress()).add(time_spent_seconds, accessed_at)
+        self._pending_time_by_user[user_id] += time_spent_seconds
+
+        if len(self._pending) >= self.max_size:
+            self._wakeup.set()
+
+    def pending(self, user_id: int, course_id: int) -> Optional[PendingProgress]:
+        """Buffered heartbeats of a course that are not visible in the database yet."""
+        key = (user_id, course_id)
+        pending = self._pending.get(key)
+        flushing = self._flushing.get(key)
+        if pending is None or flushing is None:
+            return pending or flushing
+
+        merged = PendingProgress()
+        for part in (flushing, pending):
+            assert part.last_accessed_at is not None
+            merged.add(part.time_spent_seconds, part.last_accessed_at)
+        return merged
+
+    def pending_time(self, user_id: int) -> int:
+        """Buffered seconds of a user across all courses."""
+        return self._pending_time_by_user.get(user_id, 0)
+
+    async def flush(self) -> int:
+        """Write all buffered heartbeats; returns the number of rows written."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            self._flushing, self._pending = self._pending, {}
+            updates = [
+                ProgressUpdate(
+                    user_id=user_id,
+                    course_id=course_id,
+                    time_spent_seconds=pending.time_spent_seconds,
+                    accessed_at=pending.last_accessed_at,
+                )
+                for (user_id, course_id), pending in self._flushing.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as db:
+                    await ProgressService.upsert_progresses(db, updates)
+                    await db.commit()
+            except BaseException:
+                # Keep the deltas for the next flush, also when cancelled
+                for key, pending in self._flushing.items():
+                    assert pending.last_accessed_at is not None
+                    self._pending.setdefault(key, PendingProgress()).add(
+                        pending.time_spent_seconds, pending.last_accessed_at
+                    )
+                self._flushing = {}
+                raise
+
+            # Committed: stop merging the deltas into reads before awaiting
+            # anything, or reads would count them twice. Until the cache is
+            # invalidated, cached rows may still miss them.
+            flushed, self._flushing = self._flushing, {}
+            for (user_id, _), pending in flushed.items():
+                self._pending_time_by_user[user_id] -= pending.time_spent_seconds
+                if not self._pending_time_by_user[user_id]:
+                    del self._pending_time_by_user[user_id]
+            await result_cache.invalidate_users(user_id for user_id, _ in flushed)
+
+            return len(updates)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Progress buffer flush failed")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+progress_buffer = ProgressWriteBuffer(
+    enabled=settings.progress_buffer_enabled,
+    flush_interval=settings.progress_buffer_flush_interval,
+    max_size=settings.progress_buffer_max_size,
+)
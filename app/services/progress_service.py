@@ -1,12 +1,262 @@
-from typing import List, Dict, Any, Optional
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Set, Tuple
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import Boolean, Integer, select, func, and_, or_, bindparam, case, cast, column, literal_column, tuple_, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from ..cache.result_cache import result_cache
 from ..models.certificate import CourseCertificate
 from ..models.progress import Progress
 from ..models.progress import ProgressStatus
 from ..models.achievement import Achievement
+from .achievement_service import AchievementService
+from .certificate_renderer import certificate_renderer
+from .lessons import completed_count_sql, lesson_bits, lesson_values, lessons_fit
+from .notifications import PROGRESS_UPDATED, NotificationService
+from .streaks import day_number
+from .statistics_service import (
+    STATISTICS_COLUMNS,
+    ProgressState,
+    StatisticsDelta,
+    StatisticsService,
+)
+
+
+@dataclass
+class ProgressUpdate:
+    """A change to a user's progress in a course; ``None`` fields are left as they are."""
+
+    user_id: int
+    course_id: int
+    status: Optional[ProgressStatus] = None
+    completion_percentage: Optional[float] = None
+    time_spent_seconds: Optional[int] = None
+    notes: Optional[str] = None
+    # When the course was accessed, if earlier than the write (buffered heartbeats)
+    accessed_at: Optional[datetime] = None
+    # A lesson completed by the update, and the number of lessons in the course
+    completed_lesson: Optional[int] = None
+    lesson_count: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self.user_id, self.course_id
+
+    @property
+    def shape(self) -> Tuple[bool, ...]:
+        """Which optional fields are set; updates of one shape share a statement."""
+        return (
+            self.status is not None,
+            self.completion_percentage is not None,
+            self.time_spent_seconds is not None,
+            self.notes is not None,
+            self.completed_lesson is not None,
+        )
+
+    @property
+    def is_heartbeat(self) -> bool:
+        """Whether the update only adds time spent."""
+        return self.shape == (False, False, True, False, False)
+
+    @property
+    def derives_progress(self) -> bool:
+        """Whether status and completion follow from the completed lessons."""
+        return (
+            self.completed_lesson is not None
+            and self.status is None
+            and self.completion_percentage is None
+        )
+
+    def insert_values(self, now: datetime) -> Dict[str, Any]:
+        """Column values of the row created when no progress exists yet.
+
+        Raises ``ValueError`` for a lesson outside the course.
+        """
+        completed_lessons = None
+        completion_percentage = self.completion_percentage
+        status = self.status or ProgressStatus.NOT_STARTED
+        if self.completed_lesson is not None:
+            completed_lessons = lesson_bits(self.completed_lesson, self.lesson_count)
+        if self.derives_progress:
+            completion_percentage = 100.0 / self.lesson_count if self.lesson_count else None
+            status = ProgressStatus.COMPLETED if self.lesson_count == 1 else ProgressStatus.IN_PROGRESS
+
+        completed = status == ProgressStatus.COMPLETED
+        return {
+            "user_id": self.user_id,
+            "course_id": self.course_id,
+            "status": status,
+            "started_at": now if status != ProgressStatus.NOT_STARTED else None,
+            "completed_at": now if completed else None,
+            "last_accessed_at": self.accessed_at or now,
+            "completion_percentage": 100.0 if completed else (completion_percentage or 0.0),
+            "total_time_spent": self.time_spent_seconds or 0,
+            "completed_lessons": completed_lessons,
+            "lesson_count": self.lesson_count,
+            "notes": self.notes,
+        }
+
+
+# Each upserted row binds 13 parameters, asyncpg allows 32767 per statement
+UPSERT_CHUNK_SIZE = 1000
+
+_UPSERT_COLUMNS = [
+    "user_id",
+    "course_id",
+    "status",
+    "started_at",
+    "completed_at",
+    "last_accessed_at",
+    "completion_percentage",
+    "total_time_spent",
+    "completed_lessons",
+    "lesson_count",
+    "notes",
+]
+
+
+def _upsert_set(excluded: Any, update: ProgressUpdate) -> Dict[str, Any]:
+    """``ON CONFLICT DO UPDATE`` assignments for the fields present in ``update``.
+
+    ``excluded`` holds the row from :meth:`ProgressUpdate.insert_values`, and
+    ``Progress`` columns refer to the stored row before the update.
+    """
+    completed = ProgressStatus.COMPLETED
+    values: Dict[str, Any] = {
+        "last_accessed_at": func.greatest(Progress.last_accessed_at, excluded.last_accessed_at),
+        "updated_at": func.now(),
+    }
+
+    if update.status is not None:
+        values["status"] = excluded.status
+        # excluded.started_at is only set for statuses other than NOT_STARTED
+        values["started_at"] = func.coalesce(Progress.started_at, excluded.started_at)
+        values["completed_at"] = case(
+            (
+                and_(
+                    excluded.status == completed,
+                    or_(Progress.status != completed, Progress.completed_at.is_(None)),
+                ),
+                excluded.completed_at,
+            ),
+            else_=Progress.completed_at,
+        )
+
+    if update.completion_percentage is not None:
+        values["completion_percentage"] = excluded.completion_percentage
+    elif update.status is not None:
+        values["completion_percentage"] = case(
+            (excluded.status == completed, excluded.completion_percentage),
+            else_=Progress.completion_percentage,
+        )
+
+    if update.time_spent_seconds is not None:
+        values["total_time_spent"] = Progress.total_time_spent + excluded.total_time_spent
+
+    if update.notes is not None:
+        values["notes"] = excluded.notes
+
+    if update.completed_lesson is not None:
+        values.update(lesson_values(excluded, update.derives_progress))
+
+    return values
+
+
+class UpsertedProgress(NamedTuple):
+    progress: Progress
+    # State before the statement; None when created, or when the row was
+    # inserted by a concurrent transaction after ``previous`` was read
+    before: Optional[ProgressState]
+    created: bool
+
+
+async def _upsert_progresses(
+    db: AsyncSession, updates: Sequence[ProgressUpdate], now: datetime
+) -> List[UpsertedProgress]:
+    """Apply updates touching the same fields in one ``INSERT ... ON CONFLICT``.
+
+    Keys must be unique within ``updates``. Returns the stored rows in the
+    order of ``updates``, with their state before the statement and whether
+    it created them.
+    """
+    table = Progress.__table__
+
+    # Lock and read the current rows first so the statistics delta of
+    # updated rows is exact even when concurrent requests update them. Rows
+    # that concurrent transactions are inserting are not seen here; whether
+    # a row was created comes from the upsert itself.
+    previous = (
+        select(Progress.user_id, Progress.course_id, Progress.status,
+               Progress.completion_percentage, Progress.total_time_spent,
+               completed_count_sql(Progress.completed_lessons).label("completed_lessons"))
+        .where(tuple_(Progress.user_id, Progress.course_id).in_([u.key for u in updates]))
+        .with_for_update()
+        .cte("previous")
+    )
+
+    rows = [u.insert_values(now) for u in updates]
+    source = values(
+        *[column(name, table.c[name].type) for name in _UPSERT_COLUMNS], name="source"
+    ).data([tuple(row[name] for name in _UPSERT_COLUMNS) for row in rows])
+    source_select = select(
+        *[cast(source.c[name], table.c[name].type) for name in _UPSERT_COLUMNS]
+    ).where(
+        # Uncorrelated subquery, evaluated once before any row is written,
+        # so ``previous`` never sees rows already modified by this statement.
+        select(func.count()).select_from(previous).scalar_subquery() >= 0
+    )
+
+    insert_stmt = pg_insert(Progress).from_select(_UPSERT_COLUMNS, source_select)
+    insert_stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[Progress.user_id, Progress.course_id],
+        set_=_upsert_set(insert_stmt.excluded, updates[0]),
+        # Rows failing it are neither updated nor returned
+        where=lessons_fit(insert_stmt.excluded) if updates[0].completed_lesson is not None else None,
+    )
+    # xmax is 0 for rows the statement inserted, and set for updated ones
+    upserted = insert_stmt.returning(
+        *table.c, literal_column("xmax = 0", Boolean).label("created")
+    ).cte("upserted")
+
+    query = (
+        select(
+            aliased(Progress, upserted),
+            upserted.c.created,
+            previous.c.status,
+            previous.c.completion_percentage,
+            previous.c.total_time_spent,
+            previous.c.completed_lessons,
+        )
+        .select_from(upserted)
+        .outerjoin(
+            previous,
+            and_(
+                previous.c.user_id == upserted.c.user_id,
+                previous.c.course_id == upserted.c.course_id,
+            ),
+        )
+    )
+    result = await db.execute(query, execution_options={"populate_existing": True})
+
+    by_key: Dict[Tuple[int, int], UpsertedProgress] = {}
+    for progress, created, status, completion_percentage, total_time_spent, completed_lessons in result:
+        before = (
+            ProgressState(status, completion_percentage, total_time_spent, completed_lessons)
+            if status is not None else None
+        )
+        by_key[(progress.user_id, progress.course_id)] = UpsertedProgress(progress, before, created)
+    for update in updates:
+        if update.key not in by_key:
+            raise ValueError(
+                f"lesson_index {update.completed_lesson} does not fit the lesson count "
+                f"of course {update.course_id}"
+            )
+    return [by_key[u.key] for u in updates]
 
 
 class ProgressService:
@@ -60,12 +310,88 @@ class ProgressService:
                 course_id=course_id,
             )
             db.add(certificate)
+            await StatisticsService.apply_delta(db, user_id, StatisticsDelta(total_certificates=1))
             await db.commit()
+            await result_cache.invalidate_user(user_id)
             await db.refresh(certificate)
+            certificate_renderer.submit([certificate])
             return certificate
 
         return None
 
+    @staticmethod
+    async def upsert_progresses(
+        db: AsyncSession, updates: Sequence[ProgressUpdate]
+    ) -> List[Progress]:
+        """Create or update many progress rows with set-based upserts.
+
+        Updates are grouped by the fields they set and written with one
+        multi-row ``INSERT ... ON CONFLICT`` per group and chunk. Repeated
+        ``(user_id, course_id)`` keys are applied in order in later rounds.
+        The statistics rollup and learning streaks of the users are updated
+        too. Returns the stored row for each update, in order; the caller
+        commits.
+        """
+        now = datetime.now(timezone.utc)
+
+        # A statement may touch each row only once, so the n-th update of
+        # a key goes into round n.
+        rounds: List[Dict[Tuple[bool, ...], List[int]]] = []
+        occurrences: Dict[Tuple[int, int], int] = defaultdict(int)
+        for index, update in enumerate(updates):
+            round_number = occurrences[update.key]
+            occurrences[update.key] += 1
+            if round_number == len(rounds):
+                rounds.append(defaultdict(list))
+            rounds[round_number][update.shape].append(index)
+
+        results: List[Optional[Progress]] = [None] * len(updates)
+        deltas: Dict[int, StatisticsDelta] = defaultdict(StatisticsDelta)
+        # Users with a row whose state before the update is unknown
+        unknown: Set[int] = set()
+        for groups in rounds:
+            for indexes in groups.values():
+                for start in range(0, len(indexes), UPSERT_CHUNK_SIZE):
+                    chunk = indexes[start:start + UPSERT_CHUNK_SIZE]
+                    upserted = await _upsert_progresses(db, [updates[i] for i in chunk], now)
+                    for index, (progress, before, created) in zip(chunk, upserted):
+                        results[index] = progress
+                        if before is None and not created:
+                            # Lost an insert race: the row was first written
+                            # by a concurrent transaction, with values unseen
+                            unknown.add(progress.user_id)
+                        deltas[progress.user_id] += StatisticsDelta.for_progress(
+                            before, ProgressState.of(progress)
+                        )
+
+        await StatisticsService.apply_deltas(
+            db, {user_id: delta for user_id, delta in deltas.items() if user_id not in unknown}
+        )
+        if unknown:
+            # Rare; rebuilt from the base tables, which include this transaction
+            await StatisticsService.reconcile(db, sorted(unknown))
+        days: Dict[int, Set[int]] = defaultdict(set)
+        for update in updates:
+            days[update.user_id].add(day_number(update.accessed_at or now))
+        await StatisticsService.record_activity(db, days)
+        stored = [progress for progress in results if progress is not None]
+        # Repeated keys share one row object; notify once per row
+        await NotificationService.publish(db, PROGRESS_UPDATED, list(dict.fromkeys(stored)))
+        return stored
+
+    @staticmethod
+    async def upsert_progress(
+        db: AsyncSession, update: ProgressUpdate
+    ) -> Progress:
+        """Create or update a progress row with a single atomic upsert.
+
+        Status transitions and the ``total_time_spent`` increment are
+        evaluated in SQL against the locked row, so concurrent updates of
+        the same course do not lose increments. The caller commits.
+        """
+        [progress] = await ProgressService.upsert_progresses(db, [update])
+        return progress
+
     @staticmethod
     async def get_user_progress(
         db: AsyncSession, user_id: int, course_id: Optional[int] = None
@@ -90,67 +416,71 @@ class ProgressService:
         return list(result.scalars().all())
 
     @staticmethod
-    async def get_user_statistics(
-        db: AsyncSession, user_id: int
-    ) -> Dict[str, Any]:
-        # Total completed courses
-        completed_query = select(func.count()).select_from(Progress).where(
-            and_(
-                Progress.user_id == user_id,
-                Progress.status == ProgressStatus.COMPLETED
-            )
-        )
-        total_completed_courses = (await db.execute(completed_query)).scalar() or 0
+    async def aggregate_users_statistics(
+        db: AsyncSession, user_ids: Sequence[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Aggregate statistics for several users from the base tables.
 
-        # Total courses in progress
-        in_progress_query = select(func.count()).select_from(Progress).where(
-            and_(
-                Progress.user_id == user_id,
-                Progress.status == ProgressStatus.IN_PROGRESS
-            )
+        Runs as a single statement and returns values keyed like the
+        columns of ``user_statistics``.
+        """
+        # One array parameter, so the statement compiles once for any batch
+        users = (
+            func.unnest(bindparam("user_ids", list(user_ids), type_=ARRAY(Integer)))
+            .table_valued("user_id")
+            .render_derived(name="users")
         )
-        total_courses_in_progress = (await db.execute(in_progress_query)).scalar() or 0
+        certificates = select(func.count()).where(
+            CourseCertificate.user_id == users.c.user_id
+        ).scalar_subquery()
+        achievements = select(func.count()).where(
+            Achievement.user_id == users.c.user_id
+        ).scalar_subquery()
 
-        # Total courses with any progress
-        total_courses_query = select(func.count()).select_from(Progress).where(
-            Progress.user_id == user_id
-        )
-        total_courses = (await db.execute(total_courses_query)).scalar() or 0
-
-        # Total certificates
-        certs_query = select(func.count()).select_from(CourseCertificate).where(
-            CourseCertificate.user_id == user_id
-        )
-        total_certificates = (await db.execute(certs_query)).scalar() or 0
-
-        # Total achievements
-        achievements_query = select(func.count()).select_from(Achievement).where(
-            Achievement.user_id == user_id
-        )
-        total_achievements = (await db.execute(achievements_query)).scalar() or 0
-
-        # Total time spent
-        time_query = select(func.sum(Progress.total_time_spent)).where(
-            Progress.user_id == user_id
-        )
-        total_time = (await db.execute(time_query)).scalar() or 0
-
-        # Average completion
-        avg_query = select(func.avg(Progress.completion_percentage)).where(
-            Progress.user_id == user_id
+        query = (
+            select(
+                users.c.user_id,
+                func.count(Progress.id).label("total_courses"),
+                func.count(Progress.id).filter(
+                    Progress.status == ProgressStatus.IN_PROGRESS
+                ).label("total_courses_in_progress"),
+                func.count(Progress.id).filter(
+                    Progress.status == ProgressStatus.COMPLETED
+                ).label("total_completed_courses"),
+                certificates.label("total_certificates"),
+                achievements.label("total_achievements"),
+                func.coalesce(func.sum(Progress.total_time_spent), 0).label("total_time_spent"),
+                func.coalesce(
+                    func.sum(completed_count_sql(Progress.completed_lessons)), 0
+                ).label("total_completed_lessons"),
+                func.coalesce(func.sum(Progress.completion_percentage), 0.0).label("completion_percentage_sum"),
+            )
+            .select_from(users)
+            .outerjoin(Progress, Progress.user_id == users.c.user_id)
+            .group_by(users.c.user_id)
         )
-        avg_completion = (await db.execute(avg_query)).scalar() or 0.0
+        result = await db.execute(query)
 
         return {
-            "total_completed_courses": total_completed_courses,
-            "total_courses_in_progress": total_courses_in_progress,
-            "total_courses": total_courses,
-            "total_certificates": total_certificates,
-            "total_achievements": total_achievements,
-            "total_time_spent": total_time,
-            "average_completion": float(avg_completion) if avg_completion else 0.0,
+            row.user_id: {
+                name: getattr(row, name) for name in STATISTICS_COLUMNS
+            }
+            for row in result
         }
 
+    @staticmethod
+    async def get_users_statistics(
+        db: AsyncSession, user_ids: Sequence[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        return await StatisticsService.get_users_statistics(db, user_ids)
+
+    @staticmethod
+    async def get_user_statistics(
+        db: AsyncSession, user_id: int
+    ) -> Dict[str, Any]:
+        statistics = await ProgressService.get_users_statistics(db, [user_id])
+        return statistics[user_id]
+
     @staticmethod
     async def get_user_certificates(
         db: AsyncSession, user_id: int, course_id: Optional[int] = None
@@ -180,16 +510,23 @@ class ProgressService:
         achievement_type: str,
         achievement_name: str,
         description: Optional[str] = None,
-        metadata: Optional[str] = None,
+        notes: Optional[str] = None,
     ) -> Achievement:
-        achievement = Achievement(
-            user_id=user_id,
-            achievement_type=achievement_type,
-            achievement_name=achievement_name,
-            description=description,
-            metadata=metadata,
-        )
-        db.add(achievement)
-        await db.commit()
-        await db.refresh(achievement)
-        return achievement
+        """Award an achievement, or return the one the user already has of that type.
+
+        The caller commits.
+        """
+        inserted = await AchievementService.insert(db, [{
+            "user_id": user_id,
+            "achievement_type": achievement_type,
+            "achievement_name": achievement_name,
+            "description": description,
+            "notes": notes,
+        }])
+        if not inserted:
+            existing = await AchievementService.get_achievement(db, user_id, achievement_type)
+            assert existing is not None
+            return existing
+
+        await StatisticsService.apply_delta(db, user_id, StatisticsDelta(total_achievements=1))
+        return inserted[0]
@@ -0,0 +1,124 @@
+"""Sorted integer set with logarithmic rank lookups.
+
+Keys are kept in sorted buckets of bounded size; a Fenwick tree over the
+bucket lengths turns a key into its position, and a position into its key,
+in O(log n) without scanning the buckets before it.
+"""
+from bisect import bisect_left, insort
+from collections.abc import Iterable, Iterator
+from typing import List, Optional
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of counters."""
+
+    def __init__(self, values: List[int]) -> None:
+        self._tree = [0] + values
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def add(self, index: int, value: int) -> None:
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += value
+            i += i & -i
+
+    def prefix_sum(self, index: int) -> int:
+        """Sum of the counters before ``index``."""
+        total = 0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, position: int) -> tuple[int, int]:
+        """Index of the counter holding ``position`` and the offset into it."""
+        index = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            following = index + step
+            if following < len(self._tree) and self._tree[following] <= position:
+                index = following
+                position -= self._tree[following]
+            step >>= 1
+        return index, position
+
+
+class RankedSet:
+    """A set of integers answering "how many keys are smaller" in O(log n)."""
+
+    def __init__(self, keys: Iterable[int] = (), bucket_size: int = 1000) -> None:
+        self.bucket_size = bucket_size
+        ordered = sorted(set(keys))
+        self._buckets: List[List[int]] = [
+            ordered[start:start + bucket_size] for start in range(0, len(ordered), bucket_size)
+        ]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._sizes = FenwickTree([len(bucket) for bucket in self._buckets])
+        self._len = sum(len(bucket) for bucket in self._buckets)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def last(self) -> Optional[int]:
+        """The largest key, ``None`` when empty."""
+        return self._maxes[-1] if self._buckets else None
+
+    def add(self, key: int) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._reindex()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        position = bisect_left(bucket, key)
+        if position < len(bucket) and bucket[position] == key:
+            return
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.bucket_size:
+            # Splitting is rare, so rebuilding the index stays amortised
+            self._buckets[i:i + 1] = [bucket[:self.bucket_size], bucket[self.bucket_size:]]
+            self._reindex()
+        else:
+            self._sizes.add(i, 1)
+
+    def discard(self, key: int) -> None:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return
+        bucket = self._buckets[i]
+        position = bisect_left(bucket, key)
+        if position == len(bucket) or bucket[position] != key:
+            return
+        del bucket[position]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[i]
+            self._reindex()
+        else:
+            self._maxes[i] = bucket[-1]
+            self._sizes.add(i, -1)
+
+    def bisect_left(self, key: int) -> int:
+        """Number of keys smaller than ``key``."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return self._len
+        return self._sizes.prefix_sum(i) + bisect_left(self._buckets[i], key)
+
+    def iter_from(self, position: int) -> Iterator[int]:
+        """Keys in ascending order, starting at index ``position``."""
+        if position >= self._len:
+            return
+        i, offset = self._sizes.find(position)
+        for bucket in self._buckets[i:]:
+            yield from bucket[offset:]
+            offset = 0
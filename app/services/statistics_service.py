@@ -0,0 +1,388 @@
+from collections import defaultdict
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Integer, bindparam, event, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ..core.config import settings
+from ..db.base import Base
+from ..models.progress import Progress, ProgressStatus
+from ..models.user_statistics import UserStatistics
+from .achievement_service import AchievementService, achievement_rules
+from .leaderboard import METRIC_COLUMNS
+from .lessons import completed_count
+from .notifications import STATISTICS_UPDATED, NotificationService
+from .streaks import RecordedDays, activity_changes, activity_values
+
+# Tolerance when comparing the incrementally summed completion percentages
+COMPLETION_SUM_TOLERANCE = 1e-6
+
+# The Core table, for the statements that bypass the ORM
+USER_STATISTICS = Base.metadata.tables[UserStatistics.__tablename__]
+
+_recorded_days = RecordedDays(settings.activity_cache_size)
+
+# Session.info entry of the days recorded by its transaction, marked in
+# _recorded_days once it commits
+RECORDED_DAYS_KEY = "recorded_days"
+
+
+class ProgressState(NamedTuple):
+    """The columns of a progress row that feed the statistics rollup."""
+
+    status: ProgressStatus
+    completion_percentage: float
+    total_time_spent: int
+    completed_lessons: int
+
+    @classmethod
+    def of(cls, progress: Progress) -> "ProgressState":
+        return cls(
+            status=progress.status,
+            completion_percentage=progress.completion_percentage,
+            total_time_spent=progress.total_time_spent,
+            completed_lessons=completed_count(progress.completed_lessons),
+        )
+
+
+@dataclass
+class StatisticsDelta:
+    """Change to apply to a user's ``user_statistics`` row."""
+
+    total_courses: int = 0
+    total_courses_in_progress: int = 0
+    total_completed_courses: int = 0
+    total_certificates: int = 0
+    total_achievements: int = 0
+    total_time_spent: int = 0
+    total_completed_lessons: int = 0
+    completion_percentage_sum: float = 0.0
+
+    @classmethod
+    def for_progress(
+        cls, before: Optional[ProgressState], after: ProgressState
+    ) -> "StatisticsDelta":
+        """Delta caused by a progress row moving from ``before`` to ``after``.
+
+        ``before`` is ``None`` when the row was just created.
+        """
+        delta = cls(
+            total_courses=1,
+            total_courses_in_progress=int(after.status == ProgressStatus.IN_PROGRESS),
+            total_completed_courses=int(after.status == ProgressStatus.COMPLETED),
+            total_time_spent=after.total_time_spent,
+            total_completed_lessons=after.completed_lessons,
+            completion_percentage_sum=after.completion_percentage,
+        )
+        if before is not None:
+            delta.total_courses -= 1
+            delta.total_courses_in_progress -= int(before.status == ProgressStatus.IN_PROGRESS)
+            delta.total_completed_courses -= int(before.status == ProgressStatus.COMPLETED)
+            delta.total_time_spent -= before.total_time_spent
+            delta.total_completed_lessons -= before.completed_lessons
+            delta.completion_percentage_sum -= before.completion_percentage
+        return delta
+
+    def __add__(self, other: "StatisticsDelta") -> "StatisticsDelta":
+        return StatisticsDelta(
+            **{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)}
+        )
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, f.name) for f in fields(self))
+
+
+STATISTICS_COLUMNS = [f.name for f in fields(StatisticsDelta)]
+
+
+def to_statistics(columns: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Convert rollup column values into the statistics returned by the API."""
+    if columns is None:
+        columns = {name: 0 for name in STATISTICS_COLUMNS}
+
+    total_courses = columns["total_courses"]
+    return {
+        "total_completed_courses": columns["total_completed_courses"],
+        "total_courses_in_progress": columns["total_courses_in_progress"],
+        "total_courses": total_courses,
+        "total_certificates": columns["total_certificates"],
+        "total_achievements": columns["total_achievements"],
+        "total_time_spent": columns["total_time_spent"],
+        "total_completed_lessons": columns["total_completed_lessons"],
+        "average_completion": (
+            float(columns["completion_percentage_sum"]) / total_courses if total_courses else 0.0
+        ),
+        "last_active_day": columns.get("last_active_day"),
+        "current_streak": columns.get("current_streak", 0),
+        "longest_streak": columns.get("longest_streak", 0),
+    }
+
+
+def _columns(row: UserStatistics) -> Dict[str, Any]:
+    return {name: getattr(row, name) for name in STATISTICS_COLUMNS}
+
+
+async def _upsert(db: AsyncSession, stmt: Any, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run an upsert of rollup rows and publish the leaderboard scores it stored.
+
+    ``rows`` are bound as executemany parameters rather than rendered into
+    the statement, so it compiles once however many rows there are. Returns
+    the stored counters of each row.
+    """
+    stmt = stmt.returning(
+        UserStatistics.user_id, *(getattr(UserStatistics, name) for name in STATISTICS_COLUMNS)
+    )
+    result = await db.execute(stmt, rows)
+    stored = [dict(row) for row in result.mappings()]
+    await NotificationService.publish_events(
+        db,
+        STATISTICS_UPDATED,
+        [{"user_id": row["user_id"], **{name: row[name] for name in METRIC_COLUMNS}} for row in stored],
+    )
+    return stored
+
+
+async def _award_achievements(
+    db: AsyncSession, changes: Iterable[Tuple[int, Optional[Dict[str, Any]], Dict[str, Any]]]
+) -> None:
+    """Award the achievements whose rules the ``(user_id, before, after)`` counters crossed."""
+    awards = [
+        (user_id, rule)
+        for user_id, before, after in changes
+        for rule in achievement_rules.crossed(before, after)
+    ]
+    if not awards:
+        return
+    earned: Dict[int, StatisticsDelta] = defaultdict(StatisticsDelta)
+    for achievement in await AchievementService.award(db, awards):
+        earned[achievement.user_id].total_achievements += 1
+    # No rule listens to total_achievements, so this does not award again
+    await StatisticsService.apply_deltas(db, earned)
+
+
+async def _record_days(db: AsyncSession, days: Mapping[int, int]) -> List[Any]:
+    """Record one day per user; returns a row per user with a rollup row.
+
+    ``current_streak`` and ``previous_streak`` are set for the rows the day
+    changed. The rows are locked before they are read, so the previous
+    streak is the one the update replaced.
+    """
+    activity = (
+        func.unnest(
+            bindparam("user_ids", list(days), type_=ARRAY(Integer)),
+            bindparam("days", list(days.values()), type_=ARRAY(Integer)),
+        )
+        .table_valued("user_id", "day")
+        .render_derived(name="activity")
+    )
+    old = (
+        select(UserStatistics.user_id, UserStatistics.current_streak)
+        .where(UserStatistics.user_id.in_(select(activity.c.user_id)))
+        .with_for_update()
+        .cte("old")
+    )
+    updated = (
+        update(USER_STATISTICS)
+        .where(
+            UserStatistics.user_id == activity.c.user_id,
+            old.c.user_id == activity.c.user_id,
+            activity_changes(activity.c.day),
+        )
+        .values(activity_values(activity.c.day))
+        .returning(
+            UserStatistics.user_id,
+            UserStatistics.current_streak,
+            old.c.current_streak.label("previous_streak"),
+        )
+        .cte("updated")
+    )
+    query = select(old.c.user_id, updated.c.current_streak, updated.c.previous_streak).select_from(
+        old.outerjoin(updated, updated.c.user_id == old.c.user_id)
+    )
+    return list((await db.execute(query)).all())
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_recorded_days(session: Session) -> None:
+    days = session.info.pop(RECORDED_DAYS_KEY, None)
+    if days:
+        _recorded_days.mark(days)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_recorded_days(session: Session, transaction: SessionTransaction) -> None:
+    # Rolled back or closed without committing: the days were not recorded
+    if transaction.parent is None:
+        session.info.pop(RECORDED_DAYS_KEY, None)
+
+
+class StatisticsService:
+
+    @staticmethod
+    async def apply_deltas(
+        db: AsyncSession, deltas: Mapping[int, StatisticsDelta]
+    ) -> None:
+        """Add deltas to the rollup rows of several users in one statement.
+
+        Runs inside the caller's transaction, together with any
+        achievements the new counters earn; the caller commits.
+        """
+        rows = [
+            {"user_id": user_id, **{name: getattr(delta, name) for name in STATISTICS_COLUMNS}}
+            for user_id, delta in deltas.items()
+            if delta
+        ]
+        if not rows:
+            return
+
+        stmt = pg_insert(USER_STATISTICS)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStatistics.user_id],
+            set_={
+                **{
+                    name: getattr(UserStatistics, name) + getattr(stmt.excluded, name)
+                    for name in STATISTICS_COLUMNS
+                },
+                "updated_at": func.now(),
+            },
+        )
+        stored = await _upsert(db, stmt, rows)
+        await _award_achievements(db, [
+            (
+                row["user_id"],
+                {name: row[name] - getattr(deltas[row["user_id"]], name) for name in STATISTICS_COLUMNS},
+                row,
+            )
+            for row in stored
+        ])
+
+    @staticmethod
+    async def apply_delta(
+        db: AsyncSession, user_id: int, delta: StatisticsDelta
+    ) -> None:
+        await StatisticsService.apply_deltas(db, {user_id: delta})
+
+    @staticmethod
+    async def get_users_statistics(
+        db: AsyncSession, user_ids: Sequence[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Read statistics for several users from the rollup table."""
+        query = select(UserStatistics).where(UserStatistics.user_id.in_(user_ids))
+        result = await db.execute(query)
+        rows = {
+            row.user_id: {
+                **_columns(row),
+                "last_active_day": row.last_active_day,
+                "current_streak": row.current_streak,
+                "longest_streak": row.longest_streak,
+            }
+            for row in result.scalars().all()
+        }
+        return {user_id: to_statistics(rows.get(user_id)) for user_id in user_ids}
+
+    @staticmethod
+    async def record_activity(db: AsyncSession, days: Mapping[int, Iterable[int]]) -> None:
+        """Record that users were active on the given days, updating their streaks.
+
+        Users this process already recorded for the same day are skipped, so
+        the update runs about once per user and day; the days count as
+        recorded once the caller's transaction commits. Runs inside that
+        transaction, together with any streak achievements.
+        """
+        pending = _recorded_days.pending(days)
+        if not pending:
+            return
+
+        recorded: Dict[int, int] = {}
+        changes: List[Tuple[int, Optional[Dict[str, Any]], Dict[str, Any]]] = []
+        # A statement updates each row once, so the n-th day of a user, in
+        # day order, goes into round n
+        for round_number in range(max(len(user_days) for user_days in pending.values())):
+            batch = {
+                user_id: user_days[round_number]
+                for user_id, user_days in pending.items()
+                if round_number < len(user_days)
+            }
+            for row in await _record_days(db, batch):
+                recorded[row.user_id] = batch[row.user_id]
+                if row.current_streak is not None:
+                    changes.append((
+                        row.user_id,
+                        {"current_streak": row.previous_streak},
+                        {"current_streak": row.current_streak},
+                    ))
+        await _award_achievements(db, changes)
+
+        committed = db.info.setdefault(RECORDED_DAYS_KEY, {})
+        for user_id, day in recorded.items():
+            committed[user_id] = max(day, committed.get(user_id, day))
+
+    @staticmethod
+    async def reconcile(
+        db: AsyncSession, user_ids: Sequence[int], dry_run: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Rebuild the rollup rows of ``user_ids`` from the base tables.
+
+        Returns one entry per user whose stored row was missing or had
+        drifted, listing the stored and the recomputed values. Achievements
+        whose thresholds the rebuilt counters pass are awarded.
+
+        Unless ``dry_run``, the rollup rows are created if missing and locked
+        before aggregating, so deltas of concurrent transactions wait for the
+        rebuilt rows instead of being overwritten by them.
+        """
+        from .progress_service import ProgressService
+
+        user_ids = sorted(set(user_ids))
+        created: Set[int] = set()
+        query = select(UserStatistics).where(UserStatistics.user_id.in_(user_ids))
+        if not dry_run:
+            # In user_id order, like the lock below, to avoid deadlocks
+            insert = (
+                pg_insert(USER_STATISTICS)
+                .on_conflict_do_nothing(index_elements=[UserStatistics.user_id])
+                .returning(UserStatistics.user_id)
+            )
+            inserted = await db.execute(insert, [{"user_id": user_id} for user_id in user_ids])
+            created = set(inserted.scalars().all())
+            query = query.order_by(UserStatistics.user_id).with_for_update()
+        result = await db.execute(query, execution_options={"populate_existing": True})
+        stored = {
+            row.user_id: _columns(row)
+            for row in result.scalars().all()
+            if row.user_id not in created
+        }
+        expected = await ProgressService.aggregate_users_statistics(db, user_ids)
+
+        drift: List[Dict[str, Any]] = []
+        for user_id in user_ids:
+            values = expected[user_id]
+            current = stored.get(user_id)
+            if current is not None and all(
+                abs(current[name] - values[name]) <= COMPLETION_SUM_TOLERANCE
+                for name in STATISTICS_COLUMNS
+            ):
+                continue
+            drift.append({"user_id": user_id, "stored": current, "expected": values})
+
+        if drift and not dry_run:
+            stmt = pg_insert(USER_STATISTICS)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserStatistics.user_id],
+                set_={
+                    **{name: getattr(stmt.excluded, name) for name in STATISTICS_COLUMNS},
+                    "updated_at": func.now(),
+                },
+            )
+            await _upsert(
+                db, stmt, [{"user_id": entry["user_id"], **entry["expected"]} for entry in drift]
+            )
+            await _award_achievements(
+                db, [(entry["user_id"], entry["stored"], entry["expected"]) for entry in drift]
+            )
+
+        return drift
@@ -0,0 +1,106 @@
+"""Learning streaks kept as a bitmap of recent active days per user.
+
+Days are numbered from 1970-01-01 in UTC. Each ``user_statistics`` row
+holds its last active day, a bitmap of the ``WINDOW_DAYS`` days ending
+there (bit ``n`` is ``n`` days earlier), and the current and longest
+streak. A new day shifts the bitmap and extends or restarts the streak; a
+day that arrives late, such as heartbeats flushed after midnight, sets its
+bit and recounts the run of active days ending at the last one. Both are a
+fixed number of integer operations, whatever the length of the history.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import BigInteger, Text, and_, case, cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import BIT
+
+from ..models.user_statistics import UserStatistics
+
+EPOCH = date(1970, 1, 1)
+
+# Days covered by the bitmap; bit 63 stays clear so it fits a signed bigint
+WINDOW_DAYS = 63
+WINDOW_MASK = (1 << WINDOW_DAYS) - 1
+
+
+def day_number(moment: datetime) -> int:
+    return (moment.astimezone(timezone.utc).date() - EPOCH).days
+
+
+def current_streak(last_active_day: Optional[int], streak: int, today: int) -> int:
+    """The stored streak, or 0 once a whole day has passed without activity."""
+    if last_active_day is None or today - last_active_day > 1:
+        return 0
+    return streak
+
+
+def _trailing_ones(bitmap: Any) -> Any:
+    bits = cast(cast(bitmap, BIT(64)), Text)
+    return 64 - func.length(func.rtrim(bits, "1"))
+
+
+def activity_values(day: Any) -> Dict[str, Any]:
+    """``SET`` expressions recording activity on ``day`` in a ``user_statistics`` row."""
+    last = UserStatistics.last_active_day
+    recent = UserStatistics.recent_activity
+    streak = UserStatistics.current_streak
+    gap = day - last
+    one = literal(1, BigInteger)
+
+    new_recent = case(
+        (or_(last.is_(None), gap >= WINDOW_DAYS), one),
+        (gap > 0, (recent.op("<<")(gap)).op("|")(one).op("&")(WINDOW_MASK)),
+        else_=recent.op("|")(one.op("<<")(-gap)),
+    )
+    new_streak = case(
+        (or_(last.is_(None), gap > 1), 1),
+        (gap == 1, streak + 1),
+        # The whole window is one run already; a late day changes nothing
+        (streak >= WINDOW_DAYS, streak),
+        else_=_trailing_ones(new_recent),
+    )
+    return {
+        "last_active_day": func.greatest(last, day),
+        "recent_activity": new_recent,
+        "current_streak": new_streak,
+        "longest_streak": func.greatest(UserStatistics.longest_streak, new_streak),
+    }
+
+
+def activity_changes(day: Any) -> Any:
+    """Rows whose streak state changes when ``day`` is recorded."""
+    last = UserStatistics.last_active_day
+    gap = day - last
+    late_bit = literal(1, BigInteger).op("<<")(-gap)
+    return or_(
+        last.is_(None),
+        gap > 0,
+        and_(gap > -WINDOW_DAYS, UserStatistics.recent_activity.op("&")(late_bit) == 0),
+    )
+
+
+class RecordedDays:
+    """The last day recorded per user by this process, for the most recent users.
+
+    Lets writers skip the streak update for users already recorded today.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._days: "OrderedDict[int, int]" = OrderedDict()
+
+    def pending(self, days: Mapping[int, Iterable[int]]) -> Dict[int, List[int]]:
+        """The days of each user in ``days`` that may not be recorded yet, in order."""
+        pending = {
+            user_id: sorted(day for day in set(user_days) if day != self._days.get(user_id))
+            for user_id, user_days in days.items()
+        }
+        return {user_id: user_days for user_id, user_days in pending.items() if user_days}
+
+    def mark(self, days: Mapping[int, int]) -> None:
+        for user_id, day in days.items():
+            self._days[user_id] = max(day, self._days.get(user_id, day))
+            self._days.move_to_end(user_id)
+        while len(self._days) > self.max_size:
+            self._days.popitem(last=False)
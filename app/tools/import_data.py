@@ -0,0 +1,350 @@
+"""Bulk-load progress, certificate and achievement rows from CSV or NDJSON.
+
+Records are read in chunks, copied into a temporary staging table with
+``COPY`` and merged into the target table with one statement per chunk:
+records are upserted on the unique index of the table, ``(user_id,
+course_id)`` or ``(user_id, achievement_type)``, with the last record of a
+key winning. Each chunk commits together with its checkpoint, so a rerun with
+the same job name resumes after the last committed chunk. The statistics
+rollup of the users in a chunk is rebuilt in the same transaction.
+
+Columns are named as in the table, as written by ``GET /export/{table}``;
+``id`` is ignored and missing columns take their defaults.
+
+Usage::
+
+    python -m app.tools.import_data progresses progress.csv [--chunk-size 50000]
+    python -m app.tools.import_data achievements achievements.ndjson --job legacy-achievements
+"""
+import argparse
+import asyncio
+import csv
+import enum
+import io
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from typing import IO, Any, Callable, Dict, List, Sequence, Tuple, cast
+
+from asyncpg import BitString
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, MetaData, Table, delete, func, select
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
+
+from ..cache.result_cache import result_cache
+from ..core.config import settings
+from ..db.base import Base
+from ..db.session import engine
+from ..models.achievement import Achievement
+from ..models.certificate import CourseCertificate
+from ..models.import_checkpoint import ImportCheckpoint
+from ..models.progress import Bits, Progress
+from ..services.statistics_service import StatisticsService
+
+# Target table and the unique key records are merged on
+TABLES: Dict[str, Tuple[Table, Tuple[str, ...]]] = {
+    "progresses": (Progress.__table__, ("user_id", "course_id")),  # type: ignore[dict-item]
+    "certificates": (CourseCertificate.__table__, ("user_id", "course_id")),  # type: ignore[dict-item]
+    "achievements": (Achievement.__table__, ("user_id", "achievement_type")),  # type: ignore[dict-item]
+}
+
+# Kept as they are when an existing row is merged
+PRESERVED_COLUMNS = ("created_at", "certificate_id")
+
+# Position of a record in its file; orders duplicates of a key
+RECORD_COLUMN = "import_record"
+
+# Users rebuilt per statement, which keeps below the bind parameter limit
+STATISTICS_BATCH_SIZE = 1000
+
+Record = Dict[str, Any]
+
+
+class ImportDataError(Exception):
+    pass
+
+
+def _parse_datetime(value: Any) -> datetime:
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    # Timestamps without a zone are taken as UTC
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _parse_enum(enum_class: type[enum.Enum]) -> Callable[[Any], str]:
+    def parse(value: Any) -> str:
+        # Accept values as exported ("completed") and member names
+        try:
+            return enum_class(value).name
+        except ValueError:
+            return enum_class[value].name
+    return parse
+
+
+def _parser(column: "Column[Any]") -> Callable[[Any], Any]:
+    column_type = column.type
+    if isinstance(column_type, SQLEnum) and column_type.enum_class is not None:
+        return _parse_enum(column_type.enum_class)
+    if isinstance(column_type, DateTime):
+        return _parse_datetime
+    if isinstance(column_type, (Integer, BigInteger)):
+        return int
+    if isinstance(column_type, Float):
+        return float
+    if isinstance(column_type, Bits):
+        return cast(Callable[[Any], Any], BitString)
+    return str
+
+
+class _RowContext:
+    """The part of SQLAlchemy's execution context that column defaults use."""
+
+    def __init__(self, row: Dict[str, Any]) -> None:
+        self.row = row
+
+    def get_current_parameters(self) -> Dict[str, Any]:
+        return self.row
+
+
+class ColumnSpec:
+    """How one column is read from a record, and its value when missing."""
+
+    def __init__(self, column: "Column[Any]", started_at: datetime) -> None:
+        self.name = column.name
+        self.parse = _parser(column)
+        self.required = False
+        self.default: Callable[[Dict[str, Any]], Any] = lambda row: None
+
+        default = column.default
+        if default is not None and getattr(default, "is_scalar", False):
+            value = default.arg  # type: ignore[attr-defined]
+            self.default = lambda row: value
+        elif default is not None and getattr(default, "is_callable", False):
+            # Called with the values of the preceding columns, as on insert
+            generate = default.arg  # type: ignore[attr-defined]
+            self.default = lambda row: generate(_RowContext(row))
+        elif column.server_default is not None and isinstance(column.type, DateTime):
+            # now() for the whole import
+            self.default = lambda row: started_at
+        elif column.server_default is not None:
+            raise ImportDataError(f"Column {column.name} has a server default that is not supported")
+        elif not column.nullable:
+            self.required = True
+
+    def value(self, record: Record, number: int, row: Dict[str, Any]) -> Any:
+        raw = record.get(self.name)
+        if raw is None or raw == "":
+            if self.required:
+                raise ImportDataError(f"Record {number}: {self.name} is required")
+            return self.default(row)
+        try:
+            return self.parse(raw)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ImportDataError(f"Record {number}: invalid {self.name} {raw!r}") from exc
+
+
+def read_records(source: IO[str], data_format: str) -> Iterator[Record]:
+    if data_format == "csv":
+        yield from csv.DictReader(source)
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    chunk: List[Record] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _staging_table(target: Table, columns: Sequence["Column[Any]"]) -> Table:
+    return Table(
+        f"import_{target.name}",
+        MetaData(),
+        Column(RECORD_COLUMN, BigInteger, nullable=False),
+        *(Column(column.name, column.type) for column in columns),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DELETE ROWS",
+    )
+
+
+def _merge_statement(
+        target: Table,
+        staging: Table,
+        names: Sequence[str],
+        key: Tuple[str, ...]
+) -> Any:
+    # A statement may update a row only once, so keep the last record of a key
+    ranked = select(
+        *(staging.c[name] for name in names),
+        func.row_number().over(
+            partition_by=[staging.c[name] for name in key],
+            order_by=staging.c[RECORD_COLUMN].desc(),
+        ).label("position"),
+    ).subquery()
+    source = select(*(ranked.c[name] for name in names)).where(ranked.c.position == 1)
+    stmt = pg_insert(target).from_select(names, source)
+    return stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            name: stmt.excluded[name]
+            for name in names
+            if name not in key and name not in PRESERVED_COLUMNS
+        },
+    )
+
+
+async def _records_done(db: AsyncSession, job: str) -> Tuple[int, bool]:
+    checkpoint = await db.get(ImportCheckpoint, job)
+    if checkpoint is None:
+        return 0, False
+    return checkpoint.records_done, checkpoint.completed
+
+
+async def _save_checkpoint(db: AsyncSession, job: str, records_done: int, completed: bool) -> None:
+    stmt = pg_insert(ImportCheckpoint).values(name=job, records_done=records_done, completed=completed)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImportCheckpoint.name],
+        set_={"records_done": records_done, "completed": completed, "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+
+
+async def import_file(
+        table_name: str,
+        path: str,
+        data_format: str,
+        chunk_size: int,
+        job: str,
+        restart: bool = False,
+        update_statistics: bool = True
+) -> int:
+    """Import ``path`` into ``table_name``; returns the records merged by this run."""
+    target, key = TABLES[table_name]
+    columns = [column for column in target.columns if column.name != "id"]
+    specs = [ColumnSpec(column, datetime.now(timezone.utc)) for column in columns]
+    names = [spec.name for spec in specs]
+    staging = _staging_table(target, columns)
+    merge = _merge_statement(target, staging, names, key)
+
+    if settings.create_schema_on_startup:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Base.metadata.tables[ImportCheckpoint.__tablename__]])
+
+    # One connection throughout, which keeps the temporary table
+    async with engine.connect() as conn, AsyncSession(bind=conn) as db:
+        if restart:
+            await _save_checkpoint(db, job, 0, False)
+            await db.commit()
+        skip, completed = await _records_done(db, job)
+        if completed:
+            print(f"Job {job!r} already imported {skip} records; use --restart to import again")
+            return 0
+
+        await db.execute(CreateTable(staging))
+        await db.commit()
+        raw_connection = (await conn.get_raw_connection()).driver_connection
+        assert raw_connection is not None
+
+        size = os.path.getsize(path)
+        started = time.perf_counter()
+        imported = 0
+        with open(path, "rb") as raw, io.TextIOWrapper(raw, newline="", encoding="utf-8") as source:
+            records = read_records(source, data_format)
+            if skip:
+                print(f"Resuming job {job!r} after {skip} records")
+                for _ in zip(range(skip), records):
+                    pass
+
+            number = skip
+            for chunk in _chunks(records, chunk_size):
+                rows = []
+                user_ids = set()
+                for record in chunk:
+                    number += 1
+                    row: Dict[str, Any] = {}
+                    for spec in specs:
+                        row[spec.name] = spec.value(record, number, row)
+                    rows.append((number, *row.values()))
+                    user_ids.add(row["user_id"])
+
+                # Opens the chunk's transaction; COPY on its own would commit
+                # straight away, and the commit empties the staging table
+                await db.execute(delete(staging))
+                await raw_connection.copy_records_to_table(
+                    staging.name, records=rows, columns=[RECORD_COLUMN, *names]
+                )
+                await db.execute(merge)
+                if update_statistics:
+                    ordered = sorted(user_ids)
+                    for start in range(0, len(ordered), STATISTICS_BATCH_SIZE):
+                        await StatisticsService.reconcile(db, ordered[start:start + STATISTICS_BATCH_SIZE])
+                await _save_checkpoint(db, job, number, False)
+                await db.commit()
+                await result_cache.invalidate_users(user_ids)
+
+                imported += len(chunk)
+                elapsed = time.perf_counter() - started
+                position = raw.tell()
+                print(
+                    f"{number} records ({position / size * 100 if size else 100:5.1f}% of file), "
+                    f"{imported / elapsed:,.0f} records/s"
+                )
+
+        await _save_checkpoint(db, job, number, True)
+        await db.commit()
+
+    print(f"Imported {imported} records into {target.name} in {time.perf_counter() - started:.1f}s")
+    if not update_statistics:
+        print("Statistics were not updated; run python -m app.tools.reconcile_statistics")
+    return imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path")
+    parser.add_argument(
+        "--format",
+        choices=("csv", "ndjson"),
+        help="Defaults to the file extension, NDJSON unless it is .csv",
+    )
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--job", help="Checkpoint name, defaults to the table and absolute path")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of the job")
+    parser.add_argument(
+        "--no-statistics",
+        action="store_true",
+        help="Do not rebuild user statistics per chunk; reconcile them afterwards",
+    )
+    args = parser.parse_args()
+
+    data_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    job = args.job or f"{args.table}:{os.path.abspath(args.path)}"
+    try:
+        asyncio.run(
+            import_file(
+                args.table,
+                args.path,
+                data_format,
+                args.chunk_size,
+                job,
+                restart=args.restart,
+                update_statistics=not args.no_statistics,
+            )
+        )
+    except ImportDataError as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Rebuild the ``user_statistics`` rollup from the base tables and report drift.
+
+Usage::
+
+    python -m app.tools.reconcile_statistics [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.result_cache import result_cache
+from ..db.session import AsyncSessionLocal
+from ..models.achievement import Achievement
+from ..models.certificate import CourseCertificate
+from ..models.progress import Progress
+from ..models.user_statistics import UserStatistics
+from ..services.statistics_service import StatisticsService
+
+
+async def _next_user_ids(
+    db: AsyncSession, after: Optional[int], batch_size: int
+) -> List[int]:
+    user_ids = union(
+        select(Progress.user_id),
+        select(CourseCertificate.user_id),
+        select(Achievement.user_id),
+        select(UserStatistics.user_id),
+    ).subquery()
+
+    query = select(user_ids.c.user_id)
+    if after is not None:
+        query = query.where(user_ids.c.user_id > after)
+    query = query.order_by(user_ids.c.user_id).limit(batch_size)
+
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def reconcile(batch_size: int, dry_run: bool) -> int:
+    checked = 0
+    drifted = 0
+    last_user_id: Optional[int] = None
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            user_ids = await _next_user_ids(db, last_user_id, batch_size)
+            if not user_ids:
+                break
+
+            drift = await StatisticsService.reconcile(db, user_ids, dry_run=dry_run)
+            await db.commit()
+        if not dry_run:
+            await result_cache.invalidate_users(entry["user_id"] for entry in drift)
+
+        for entry in drift:
+            print(f"user {entry['user_id']}: stored={entry['stored']} expected={entry['expected']}")
+
+        checked += len(user_ids)
+        drifted += len(drift)
+        last_user_id = user_ids[-1]
+
+    action = "would be rebuilt" if dry_run else "rebuilt"
+    print(f"Checked {checked} users, {drifted} {action}")
+    return drifted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report drift, do not rewrite rollup rows",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(reconcile(args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
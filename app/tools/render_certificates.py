@@ -0,0 +1,82 @@
+"""Render the PDFs of certificates that have no ``pdf_url`` yet.
+
+Picks up certificates the background renderer dropped (full queue,
+shutdown, failed renders) and those issued before it existed. Already
+rendered contents are cache hits.
+
+Usage::
+
+    python -m app.tools.render_certificates [--batch-size 500] [--workers 4]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache.result_cache import result_cache
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.certificate import CourseCertificate
+from ..services.certificate_renderer import CertificateRenderer, certificate_content
+
+
+async def _next_certificates(
+    db: AsyncSession, after: int, batch_size: int
+) -> List[CourseCertificate]:
+    query = (
+        select(CourseCertificate)
+        .where(CourseCertificate.pdf_url.is_(None), CourseCertificate.id > after)
+        .order_by(CourseCertificate.id)
+        .limit(batch_size)
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def render_missing(batch_size: int, workers: int) -> int:
+    renderer = CertificateRenderer(
+        enabled=True,
+        workers=workers,
+        queue_size=0,
+        directory=settings.certificate_store_path,
+    )
+    started = time.perf_counter()
+    stored = 0
+    last_id = 0
+    try:
+        while True:
+            async with AsyncSessionLocal() as db:
+                certificates = await _next_certificates(db, last_id, batch_size)
+                if not certificates:
+                    break
+                last_id = certificates[-1].id
+                urls = await renderer.render([certificate_content(c) for c in certificates])
+                user_ids = await renderer.store_urls(db, urls)
+                await db.commit()
+            await result_cache.invalidate_users(user_ids)
+            stored += len(user_ids)
+            print(f"{stored} certificates, {renderer.rendered} rendered, {renderer.hits} cache hits")
+    finally:
+        await renderer.stop()
+
+    print(
+        f"Stored {stored} PDF URLs in {time.perf_counter() - started:.1f}s, "
+        f"{renderer.failed} renders failed"
+    )
+    return stored
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=settings.certificate_render_workers)
+    args = parser.parse_args()
+
+    asyncio.run(render_missing(args.batch_size, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Issue the certificates of completed courses that have none yet.
+
+Runs the background sweep once, from where the last sweep stopped, or from
+the start with ``--restart`` (after importing progress, for example). The
+PDFs of the new certificates are left to ``app.tools.render_certificates``.
+
+Usage::
+
+    python -m app.tools.sweep_certificates [--batch-size 1000] [--restart]
+"""
+import argparse
+import asyncio
+import time
+
+from ..core.config import settings
+from ..db.base import Base
+from ..db.session import engine
+from ..models.sweep_checkpoint import SweepCheckpoint
+from ..services.certificate_sweeper import CertificateSweeper
+
+
+async def sweep(batch_size: int, restart: bool) -> int:
+    if settings.create_schema_on_startup:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Base.metadata.tables[SweepCheckpoint.__tablename__]])
+
+    sweeper = CertificateSweeper(
+        enabled=True,
+        interval=settings.certificate_sweep_interval,
+        batch_size=batch_size,
+        lag=settings.certificate_sweep_lag,
+    )
+    started = time.perf_counter()
+    issued = await sweeper.sweep(restart=restart)
+    print(f"Issued {issued} certificates in {time.perf_counter() - started:.1f}s")
+    return issued
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=settings.certificate_sweep_batch_size)
+    parser.add_argument("--restart", action="store_true", help="Sweep from the start, not the checkpoint")
+    args = parser.parse_args()
+
+    asyncio.run(sweep(args.batch_size, args.restart))
+
+
+if __name__ == "__main__":
+    main()
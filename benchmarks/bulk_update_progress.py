@@ -0,0 +1,120 @@
+"""Compare rows/second of bulkUpdateProgress against looped updateUserProgress.
+
+Runs the GraphQL schema in-process against the database configured in
+``.env``. Rows are written for users starting at ``--first-user-id`` and
+deleted again afterwards.
+
+Usage::
+
+    python -m benchmarks.bulk_update_progress [--rows 5000] [--courses 10]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import delete
+
+from app.db.session import AsyncSessionLocal
+from app.graphql.loaders import Loaders
+from app.graphql.schema import schema
+from app.models.progress import Progress
+from app.models.user_statistics import UserStatistics
+
+SINGLE_MUTATION = """
+mutation($userId: Int!, $input: UpdateProgressInput!) {
+  updateUserProgress(userId: $userId, input: $input) { id }
+}
+"""
+
+BULK_MUTATION = """
+mutation($inputs: [UserProgressUpdateInput!]!) {
+  bulkUpdateProgress(inputs: $inputs) { id }
+}
+"""
+
+
+def _inputs(rows: int, courses: int, first_user_id: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "userId": first_user_id + i // courses,
+            "courseId": i % courses + 1,
+            "status": "IN_PROGRESS",
+            "completionPercentage": float(i % 100),
+            "timeSpentSeconds": 30,
+        }
+        for i in range(rows)
+    ]
+
+
+async def _execute(query: str, variables: Dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as db_session:
+        context = {"db_session": db_session, "loaders": Loaders(db_session)}
+        result = await schema.execute(query, variable_values=variables, context_value=context)
+        if result.errors:
+            raise RuntimeError(result.errors)
+
+
+async def _cleanup(first_user_id: int, last_user_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        for model in (Progress, UserStatistics):
+            await db_session.execute(
+                delete(model).where(model.user_id.between(first_user_id, last_user_id))
+            )
+        await db_session.commit()
+
+
+async def _single(inputs: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    for item in inputs:
+        single_input = {k: v for k, v in item.items() if k != "userId"}
+        await _execute(SINGLE_MUTATION, {"userId": item["userId"], "input": single_input})
+    return time.perf_counter() - start
+
+
+async def _bulk(inputs: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    await _execute(BULK_MUTATION, {"inputs": inputs})
+    return time.perf_counter() - start
+
+
+def _report(label: str, rows: int, single: float, bulk: float) -> None:
+    print(
+        f"{label:>7}: updateUserProgress x{rows}: {rows / single:10.0f} rows/s | "
+        f"bulkUpdateProgress: {rows / bulk:10.0f} rows/s | "
+        f"speedup {single / bulk:5.1f}x"
+    )
+
+
+async def run(rows: int, courses: int, first_user_id: int) -> None:
+    inputs = _inputs(rows, courses, first_user_id)
+    last_user_id = inputs[-1]["userId"]
+
+    try:
+        # New rows
+        await _cleanup(first_user_id, last_user_id)
+        single = await _single(inputs)
+        await _cleanup(first_user_id, last_user_id)
+        bulk = await _bulk(inputs)
+        _report("inserts", rows, single, bulk)
+
+        # Existing rows
+        single = await _single(inputs)
+        bulk = await _bulk(inputs)
+        _report("updates", rows, single, bulk)
+    finally:
+        await _cleanup(first_user_id, last_user_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=10, help="Courses per user")
+    parser.add_argument("--first-user-id", type=int, default=900_000_000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rows, args.courses, args.first_user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compare CPU time per request with and without the parsed-document cache.
+
+Executes a large dashboard document repeatedly through the schema in-process,
+once with the parser and validation cache extensions of the application
+schema and once without them, against the database configured in ``.env``. Reports
+CPU time (not wall time) per request, and the parse and validate share of it.
+
+Usage::
+
+    python -m benchmarks.document_cache [--requests 2000] [--courses 20]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+import strawberry
+from graphql import parse, specified_rules
+from strawberry.schema.schema import validate_document
+
+from app.db.session import AsyncSessionLocal
+from app.graphql.loaders import Loaders
+from app.graphql.mutations import Mutation
+from app.graphql.queries import Query
+from app.graphql.schema import schema as cached_schema
+
+PROGRESS_FIELDS = """
+fragment ProgressFields on Progress {
+  id
+  courseId
+  status
+  completionPercentage
+  totalTimeSpent
+  lastAccessedAt
+  startedAt
+  completedAt
+  certificate { certificateId grade finalScore earnedAt pdfUrl }
+}
+"""
+
+
+def dashboard_query(courses: int) -> str:
+    """A dashboard document with one aliased progress lookup per course."""
+    aliases = "\n".join(
+        f"  course{course}: getProgress(userId: $userId, courseId: {course}) {{ ...ProgressFields }}"
+        for course in range(1, courses + 1)
+    )
+    return f"""
+query Dashboard($userId: Int!) {{
+{aliases}
+  getUserStatistics(userId: $userId) {{
+    totalCoursesInProgress totalCompletedCourses totalCertificates
+    totalAchievements totalTimeSpentSeconds averageCompletionPercentage
+  }}
+  getUserAchievements(userId: $userId) {{ id achievementType achievementName earnedAt }}
+  getCompletedCourses(userId: $userId)
+}}
+{PROGRESS_FIELDS}
+"""
+
+
+async def _cpu_per_request(schema: strawberry.Schema, query: str, requests: int) -> float:
+    variables: Dict[str, Any] = {"userId": -1}
+    start = time.process_time()
+    for _ in range(requests):
+        async with AsyncSessionLocal() as db_session:
+            context = {"db_session": db_session, "loaders": Loaders(db_session)}
+            result = await schema.execute(query, variable_values=variables, context_value=context)
+        if result.errors:
+            raise RuntimeError(result.errors)
+    return (time.process_time() - start) / requests
+
+
+def _parse_validate_cpu(schema: strawberry.Schema, query: str, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        validate_document(schema._schema, parse(query), tuple(specified_rules))
+    return (time.process_time() - start) / requests
+
+
+async def run(requests: int, courses: int) -> None:
+    query = dashboard_query(courses)
+    uncached_schema = strawberry.Schema(query=Query, mutation=Mutation)
+
+    # Warm up both, which also fills the cache
+    await _cpu_per_request(uncached_schema, query, 10)
+    await _cpu_per_request(cached_schema, query, 10)
+
+    uncached = await _cpu_per_request(uncached_schema, query, requests)
+    cached = await _cpu_per_request(cached_schema, query, requests)
+    parse_validate = _parse_validate_cpu(uncached_schema, query, requests)
+
+    print(f"document: {len(query)} characters, {courses + 3} top-level fields")
+    print(f"without cache: {uncached * 1e6:8.0f} us CPU/request")
+    print(f"with cache:    {cached * 1e6:8.0f} us CPU/request  ({(1 - cached / uncached) * 100:4.1f}% less)")
+    print(f"parse+validate alone: {parse_validate * 1e6:8.0f} us ({parse_validate / uncached * 100:4.1f}% of uncached)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=20, help="Aliased getProgress fields")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.courses))
+
+
+if __name__ == "__main__":
+    main()
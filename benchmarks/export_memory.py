@@ -0,0 +1,153 @@
+"""Check that streaming exports keep the server's memory flat.
+
+Seeds ``--rows`` progress rows for one course (``--course-id``) into the
+database configured in ``.env``, starts ``uvicorn`` and downloads the
+course's export in every format while sampling the server's resident set
+size. Exits with status 1 if the RSS ever exceeds ``--max-rss-mb``. With
+``--read-delay`` the client pauses between reads, to check that a slow
+reader holds back the server instead of making it buffer. The seeded rows
+are deleted afterwards.
+
+Usage::
+
+    python -m benchmarks.export_memory [--rows 1000000] [--max-rss-mb 200]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict
+
+from sqlalchemy import delete, text
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.progress import Progress
+from benchmarks.startup_time import _free_port, _wait_for
+
+SEED = text("""
+INSERT INTO progresses (user_id, course_id, status, completion_percentage,
+                        total_time_spent, last_accessed_at, notes)
+SELECT u, CAST(:course_id AS integer),
+       (ARRAY['NOT_STARTED', 'IN_PROGRESS', 'COMPLETED'])[1 + u % 3]::progressstatus,
+       u % 101, u % 10000, now() - make_interval(secs => u), 'note, "quoted"'
+FROM generate_series(1, CAST(:rows AS integer)) u
+""")
+
+
+async def _seed(rows: int, course_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(SEED, {"rows": rows, "course_id": course_id})
+        await db_session.commit()
+    # Pooled connections belong to this event loop
+    await engine.dispose()
+
+
+async def _cleanup(course_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(delete(Progress).where(Progress.course_id == course_id))
+        await db_session.commit()
+    await engine.dispose()
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not reported")
+
+
+class RSSSampler(threading.Thread):
+
+    def __init__(self, pid: int, interval: float = 0.05) -> None:
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0.0
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self.peak = max(self.peak, _rss_mb(self.pid))
+            time.sleep(self.interval)
+
+    def stop(self) -> float:
+        self._stopped.set()
+        self.join()
+        return self.peak
+
+
+def _download(url: str, read_delay: float) -> Dict[str, float]:
+    start = time.perf_counter()
+    size = 0
+    lines = 0
+    with urllib.request.urlopen(url, timeout=600) as response:
+        while True:
+            chunk = response.read(1 << 16)
+            if not chunk:
+                break
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+            if read_delay:
+                time.sleep(read_delay)
+    return {"seconds": time.perf_counter() - start, "mb": size / 1e6, "lines": lines}
+
+
+def measure_exports(rows: int, course_id: int, read_delay: float = 0.0) -> Dict[str, Dict[str, float]]:
+    """Seed, export in every format and return the download and peak RSS of each.
+
+    The idle RSS of the server is reported under ``"idle"``.
+    """
+    asyncio.run(_seed(rows, course_id))
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+        stdout=subprocess.DEVNULL,
+    )
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        _wait_for(f"{base_url}/ready", time.perf_counter(), 60.0)
+        results["idle"] = {"peak_rss_mb": _rss_mb(process.pid)}
+        for export_format in ("ndjson", "csv"):
+            sampler = RSSSampler(process.pid)
+            sampler.start()
+            url = f"{base_url}/export/progresses?format={export_format}&course_id={course_id}"
+            results[export_format] = _download(url, read_delay)
+            results[export_format]["peak_rss_mb"] = sampler.stop()
+    finally:
+        process.terminate()
+        process.wait()
+        asyncio.run(_cleanup(course_id))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--course-id", type=int, default=900000000)
+    parser.add_argument("--max-rss-mb", type=float, default=200.0)
+    parser.add_argument("--read-delay", type=float, default=0.0, help="Seconds between 64 KiB reads")
+    args = parser.parse_args()
+
+    results = measure_exports(args.rows, args.course_id, args.read_delay)
+    idle = results.pop("idle")["peak_rss_mb"]
+    print(f"{args.rows} rows, server RSS {idle:.0f} MB when idle, ceiling {args.max_rss_mb:.0f} MB")
+    failed = False
+    for export_format, result in results.items():
+        peak = result["peak_rss_mb"]
+        failed = failed or peak > args.max_rss_mb
+        print(
+            f"  {export_format:7} {result['mb']:7.1f} MB in {result['seconds']:6.2f}s "
+            f"({result['lines']:.0f} lines), peak RSS {peak:.0f} MB"
+            + ("  OVER CEILING" if peak > args.max_rss_mb else "")
+        )
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare userRank from the in-memory rankings with counting users in SQL.
+
+Seeds ``--users`` rows into ``user_statistics`` for user ids starting at
+``--first-user-id`` in the database configured in ``.env``, loads the
+leaderboard, and times rank lookups for random users both ways. The rows
+are deleted again afterwards.
+
+Usage::
+
+    python -m benchmarks.leaderboard [--users 1000000] [--lookups 1000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import delete, func, select, text
+
+from app.db.session import AsyncSessionLocal
+from app.models.user_statistics import UserStatistics
+from app.services.leaderboard import LeaderboardMetric, leaderboard
+from app.services.notifications import notification_hub
+
+SEED = text("""
+INSERT INTO user_statistics (user_id, total_time_spent, total_completed_courses, total_achievements)
+SELECT id, (random() * 1000000)::bigint, (random() * 50)::int, (random() * 200)::int
+FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) AS id
+""")
+
+
+async def _seed(first_user_id: int, last_user_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(SEED, {"first": first_user_id, "last": last_user_id})
+        await db_session.commit()
+
+
+async def _cleanup(first_user_id: int, last_user_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(
+            delete(UserStatistics).where(UserStatistics.user_id.between(first_user_id, last_user_id))
+        )
+        await db_session.commit()
+
+
+async def _sql_rank(user_id: int) -> int:
+    async with AsyncSessionLocal() as db_session:
+        score = select(UserStatistics.total_time_spent).where(
+            UserStatistics.user_id == user_id
+        ).scalar_subquery()
+        stmt = select(func.count() + 1).where(UserStatistics.total_time_spent > score)
+        return int((await db_session.execute(stmt)).scalar_one())
+
+
+async def run(users: int, lookups: int, first_user_id: int) -> None:
+    last_user_id = first_user_id + users - 1
+    await _seed(first_user_id, last_user_id)
+    try:
+        start = time.perf_counter()
+        await leaderboard.load()
+        load = time.perf_counter() - start
+
+        sample = [random.randint(first_user_id, last_user_id) for _ in range(lookups)]
+        start = time.perf_counter()
+        for user_id in sample:
+            await leaderboard.rank(user_id, LeaderboardMetric.TIME_SPENT)
+        in_memory = (time.perf_counter() - start) / lookups
+
+        sql_sample = sample[:max(1, lookups // 100)]
+        start = time.perf_counter()
+        for user_id in sql_sample:
+            await _sql_rank(user_id)
+        sql = (time.perf_counter() - start) / len(sql_sample)
+
+        for user_id in sql_sample:
+            entry = await leaderboard.rank(user_id, LeaderboardMetric.TIME_SPENT)
+            assert entry is not None and entry.rank == await _sql_rank(user_id)
+    finally:
+        await notification_hub.stop()
+        await _cleanup(first_user_id, last_user_id)
+
+    print(f"{users} users, loaded in {load:.2f}s")
+    print(f"in-memory rank: {in_memory * 1e6:10.1f} us/lookup")
+    print(f"SQL count rank: {sql * 1e6:10.1f} us/lookup ({sql / in_memory:.0f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--first-user-id", type=int, default=900000000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.users, args.lookups, args.first_user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Load-test every Query and Mutation operation and compare runs.
+
+Seeds the data set of ``benchmarks.seed_data`` (unless ``--skip-seed``),
+then sends ``--requests`` requests of each operation from ``--concurrency``
+concurrent clients, and reports throughput and p50/p95/p99 latency per
+operation. Variables are drawn from a seeded ``random.Random``, so runs
+with the same arguments send the same requests. Requests run through the
+GraphQL schema in-process against the database configured in ``.env``, or
+against a running server with ``--url``.
+
+``--output`` saves the results as JSON. ``--baseline`` compares them with
+an earlier run and exits with status 1 if an operation's p50 or p95 grew,
+or its throughput fell, by more than ``--threshold``. ``--compare`` only
+compares two saved runs.
+
+Usage::
+
+    python -m benchmarks.load_test [--users 10000] [--requests 500] [--concurrency 10]
+    python -m benchmarks.load_test --output after.json --baseline before.json
+    python -m benchmarks.load_test --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal, engine
+from app.graphql.loaders import Loaders
+from app.graphql.schema import schema
+from app.models.certificate import CourseCertificate
+from app.services.notifications import notification_hub
+
+from .seed_data import FIRST_USER_ID, LESSONS, cleanup, seed
+
+Variables = Dict[str, Any]
+Execute = Callable[[str, Variables], Awaitable[None]]
+
+
+@dataclass
+class Workload:
+    """What the variables of a request are drawn from."""
+
+    rng: random.Random
+    first_user_id: int
+    users: int
+    courses: int
+    # (certificate_id, digital_signature) of seeded certificates
+    certificates: List[Tuple[str, str]]
+
+    def user(self) -> int:
+        return self.first_user_id + self.rng.randrange(self.users)
+
+    def course(self) -> int:
+        return self.rng.randint(1, self.courses)
+
+
+def _progress_input(load: Workload) -> Variables:
+    return {
+        "courseId": load.course(),
+        "timeSpentSeconds": load.rng.randint(10, 120),
+        "completionPercentage": float(load.rng.randint(0, 100)),
+    }
+
+
+def _verify(load: Workload) -> Variables:
+    certificate_id, signature = load.rng.choice(load.certificates)
+    return {"c": certificate_id, "s": signature}
+
+
+# Operation name: (document, variables of one request)
+OPERATIONS: Dict[str, Tuple[str, Callable[[Workload], Variables]]] = {
+    "getUserProgress": (
+        "query($u: Int!) { getUserProgress(userId: $u) { courseId status completionPercentage } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getUserProgressConnection": (
+        "query($u: Int!) { getUserProgressConnection(userId: $u, first: 10) "
+        "{ edges { node { courseId } } pageInfo { endCursor hasNextPage } } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getProgress": (
+        "query($u: Int!, $c: Int!) { getProgress(userId: $u, courseId: $c) "
+        "{ status completedLessons certificate { certificateId } } }",
+        lambda load: {"u": load.user(), "c": load.course()},
+    ),
+    "getCompletedCourses": (
+        "query($u: Int!) { getCompletedCourses(userId: $u) }",
+        lambda load: {"u": load.user()},
+    ),
+    "getUserAchievements": (
+        "query($u: Int!) { getUserAchievements(userId: $u) { achievementType earnedAt } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getUserAchievementsConnection": (
+        "query($u: Int!) { getUserAchievementsConnection(userId: $u, first: 5) "
+        "{ edges { node { achievementType } } pageInfo { endCursor } } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getUserCertificates": (
+        "query($u: Int!) { getUserCertificates(userId: $u) { certificateId grade pdfUrl } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getUserCertificatesConnection": (
+        "query($u: Int!) { getUserCertificatesConnection(userId: $u, first: 5) "
+        "{ edges { node { certificateId } } pageInfo { endCursor } } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getCertificate": (
+        "query($u: Int!, $c: Int!) { getCertificate(userId: $u, courseId: $c) "
+        "{ certificateId progress { status } } }",
+        lambda load: {"u": load.user(), "c": load.course()},
+    ),
+    "verifyCertificate": (
+        "query($c: String!, $s: String!) { verifyCertificate(certificateId: $c, signature: $s) "
+        "{ status } }",
+        _verify,
+    ),
+    "getUserStatistics": (
+        "query($u: Int!) { getUserStatistics(userId: $u) "
+        "{ totalCompletedCourses totalTimeSpentSeconds currentStreakDays } }",
+        lambda load: {"u": load.user()},
+    ),
+    "getCourseStatistics": (
+        "query($c: Int!) { getCourseStatistics(courseId: $c) { totalLearners funnel { completed } } }",
+        lambda load: {"c": load.course()},
+    ),
+    "leaderboard": (
+        "query($c: Int) { leaderboard(metric: TIME_SPENT, courseId: $c, limit: 10) { rank userId score } }",
+        lambda load: {"c": load.course() if load.rng.random() < 0.5 else None},
+    ),
+    "userRank": (
+        "query($u: Int!) { userRank(userId: $u, metric: COMPLETED_COURSES) { rank score } }",
+        lambda load: {"u": load.user()},
+    ),
+    "updateUserProgress": (
+        "mutation($u: Int!, $i: UpdateProgressInput!) { updateUserProgress(userId: $u, input: $i) { id } }",
+        lambda load: {"u": load.user(), "i": _progress_input(load)},
+    ),
+    "bulkUpdateProgress": (
+        "mutation($i: [UserProgressUpdateInput!]!) { bulkUpdateProgress(inputs: $i) { id } }",
+        lambda load: {"i": [{"userId": load.user(), **_progress_input(load)} for _ in range(10)]},
+    ),
+    "completeLesson": (
+        "mutation($u: Int!, $i: CompleteLessonInput!) { completeLesson(userId: $u, input: $i) "
+        "{ completionPercentage } }",
+        lambda load: {"u": load.user(), "i": {
+            "courseId": load.course(), "lessonIndex": load.rng.randrange(LESSONS), "lessonCount": LESSONS,
+        }},
+    ),
+    "createAchievement": (
+        "mutation($u: Int!, $i: CreateAchievementInput!) { createAchievement(userId: $u, input: $i) { id } }",
+        lambda load: {"u": load.user(), "i": {
+            "achievementType": f"benchmark_{load.rng.randrange(20)}", "achievementName": "Benchmark",
+        }},
+    ),
+    "createCertificate": (
+        "mutation($u: Int!, $i: CreateCertificateInput!) { createCertificate(userId: $u, input: $i) "
+        "{ certificateId } }",
+        lambda load: {"u": load.user(), "i": {"courseId": load.course(), "finalScore": 90.0}},
+    ),
+}
+
+
+def uncovered_operations() -> List[str]:
+    """Query and Mutation fields of the schema that have no entry in OPERATIONS."""
+    graphql_schema = schema._schema
+    assert graphql_schema.query_type is not None
+    fields = [
+        *graphql_schema.query_type.fields,
+        *(graphql_schema.mutation_type.fields if graphql_schema.mutation_type else ()),
+    ]
+    return [name for name in fields if name not in OPERATIONS]
+
+
+async def _execute_in_process(query: str, variables: Variables) -> None:
+    # As app.graphql_context.get_context does per request
+    async with AsyncSessionLocal() as db_session:
+        context = {"db_session": db_session, "loaders": Loaders(db_session)}
+        result = await schema.execute(query, variable_values=variables, context_value=context)
+        await db_session.commit()
+    if result.errors:
+        raise RuntimeError(result.errors)
+
+
+def _http_executor(url: str, concurrency: int) -> Tuple[Execute, Callable[[], Awaitable[None]]]:
+    import httpx
+
+    client = httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=concurrency))
+
+    async def execute(query: str, variables: Variables) -> None:
+        response = await client.post(url, json={"query": query, "variables": variables})
+        response.raise_for_status()
+        if response.json().get("errors"):
+            raise RuntimeError(response.json()["errors"])
+
+    return execute, client.aclose
+
+
+def _percentile(latencies: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``latencies``."""
+    index = max(0, min(len(latencies) - 1, round(fraction * len(latencies) + 0.5) - 1))
+    return latencies[index]
+
+
+async def _measure(
+    execute: Execute, query: str, requests: List[Variables], concurrency: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    pending = iter(requests)
+
+    async def client() -> None:
+        for variables in pending:
+            started = time.perf_counter()
+            try:
+                await execute(query, variables)
+            except Exception as exc:
+                errors.append(repr(exc))
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    milliseconds = [latency * 1000 for latency in latencies] or [0.0]
+    return {
+        "requests": len(requests),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(milliseconds) / len(milliseconds), 3),
+        "p50_ms": round(_percentile(milliseconds, 0.50), 3),
+        "p95_ms": round(_percentile(milliseconds, 0.95), 3),
+        "p99_ms": round(_percentile(milliseconds, 0.99), 3),
+    }
+
+
+async def _sample_certificates(first_user_id: int, users: int) -> List[Tuple[str, str]]:
+    stmt = (
+        select(CourseCertificate.certificate_id, CourseCertificate.digital_signature)
+        .where(CourseCertificate.user_id.between(first_user_id, first_user_id + users - 1))
+        .order_by(CourseCertificate.id)
+        .limit(1000)
+    )
+    async with AsyncSessionLocal() as db_session:
+        rows = [(row[0], row[1]) for row in (await db_session.execute(stmt)).all()]
+    # Unknown ids as well, which the Bloom filter turns away
+    return rows + [(f"unknown-{i}", "unsigned") for i in range(max(1, len(rows) // 10))]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    names = args.operations.split(",") if args.operations else list(OPERATIONS)
+    unknown = [name for name in names if name not in OPERATIONS]
+    if unknown:
+        raise SystemExit(f"Unknown operations: {', '.join(unknown)}")
+    for name in uncovered_operations():
+        print(f"warning: {name} has no load-test operation")
+
+    if not args.skip_seed:
+        digest = await seed(args.seed, args.first_user_id, args.users, args.courses)
+        print(f"Seeded {args.users} users x {args.courses} courses, sha256 {digest[:16]}")
+    load = Workload(
+        rng=random.Random(args.seed),
+        first_user_id=args.first_user_id,
+        users=args.users,
+        courses=args.courses,
+        certificates=await _sample_certificates(args.first_user_id, args.users),
+    )
+
+    close: Optional[Callable[[], Awaitable[None]]] = None
+    execute: Execute = _execute_in_process
+    if args.url:
+        execute, close = _http_executor(args.url, args.concurrency)
+
+    results: Dict[str, Any] = {}
+    try:
+        for name in names:
+            query, make_variables = OPERATIONS[name]
+            warmup = [make_variables(load) for _ in range(args.warmup)]
+            requests = [make_variables(load) for _ in range(args.requests)]
+            await _measure(execute, query, warmup, args.concurrency)
+            results[name] = stats = await _measure(execute, query, requests, args.concurrency)
+            print(
+                f"{name:<32} {stats['throughput']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  "
+                f"errors {stats['errors']}"
+            )
+            if stats["first_error"]:
+                print(f"    {stats['first_error'][:200]}")
+    finally:
+        if close is not None:
+            await close()
+        await notification_hub.stop()
+        if args.cleanup:
+            await cleanup(args.first_user_id, args.users)
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "seed": args.seed,
+            "users": args.users,
+            "courses": args.courses,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "operations": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """Print the change of each operation; returns False if any regressed."""
+    ok = True
+    print(f"{'operation':<32} {'p50 ms':>17} {'p95 ms':>17} {'req/s':>19}")
+    for name, stats in current["operations"].items():
+        base = baseline["operations"].get(name)
+        if base is None:
+            print(f"{name:<32} (not in baseline)")
+            continue
+        regressions = [
+            metric for metric in ("p50_ms", "p95_ms")
+            if stats[metric] > base[metric] * (1 + threshold)
+        ]
+        if stats["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append("throughput")
+        if stats["errors"] > base["errors"]:
+            regressions.append("errors")
+        ok = ok and not regressions
+        print(
+            f"{name:<32} {base['p50_ms']:>8.2f} {stats['p50_ms']:>8.2f} "
+            f"{base['p95_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+            f"{base['throughput']:>9.1f} {stats['throughput']:>9.1f}"
+            + (f"  REGRESSION ({', '.join(regressions)})" if regressions else "")
+        )
+    return ok
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path) as source:
+        return json.load(source)  # type: ignore[no-any-return]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--courses", type=int, default=20, help="Courses per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--first-user-id", type=int, default=FIRST_USER_ID)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data of an earlier run")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded users afterwards")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per operation")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per operation")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--operations", help="Comma-separated operations, all by default")
+    parser.add_argument("--url", help="GraphQL endpoint of a running server, e.g. http://localhost:8300/graphql")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Tolerated slowdown, 0.1 is 10%%")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files without running")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(_read(args.compare[0]), _read(args.compare[1]), args.threshold) else 1)
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as target:
+            json.dump(results, target, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline and not compare(_read(args.baseline), results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Check that every read resolver is served by an index, not a sequential scan.
+
+Seeds users starting at ``--first-user-id`` into the database configured in
+``.env``, runs each query through the GraphQL schema in-process, and runs
+EXPLAIN on every statement it issued. Exits with status 1 if any statement
+plans a sequential scan of a seeded table. The seeded rows are deleted
+afterwards.
+
+Usage::
+
+    python -m benchmarks.query_plans [--users 2000] [--courses 20]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import delete, event, text
+
+from app.cache.result_cache import ResultCache
+from app.db.session import AsyncSessionLocal, engine
+from app.graphql.loaders import Loaders
+from app.graphql.schema import schema
+from app.models.achievement import Achievement
+from app.models.certificate import CourseCertificate
+from app.models.progress import Progress
+from app.models.user_statistics import UserStatistics
+from app.services.statistics_service import StatisticsService
+
+TABLES = ("progresses", "achievements", "course_certificates", "user_statistics")
+
+QUERIES: Dict[str, str] = {
+    "getUserProgress": "query($u: Int!) { getUserProgress(userId: $u) { id } }",
+    "getUserProgress(courseId)": "query($u: Int!) { getUserProgress(userId: $u, courseId: 3) { id } }",
+    "getProgress": "query($u: Int!) { getProgress(userId: $u, courseId: 5) { id certificate { id } } }",
+    "getCompletedCourses": "query($u: Int!) { getCompletedCourses(userId: $u) }",
+    "getUserAchievements": "query($u: Int!) { getUserAchievements(userId: $u) { id } }",
+    "getUserAchievements(type)": (
+        'query($u: Int!) { getUserAchievements(userId: $u, achievementType: "type_2") { id } }'
+    ),
+    "getUserCertificates": "query($u: Int!) { getUserCertificates(userId: $u) { id } }",
+    "getCertificate": "query($u: Int!) { getCertificate(userId: $u, courseId: 5) { id progress { id } } }",
+    "getUserStatistics": "query($u: Int!) { getUserStatistics(userId: $u) { totalCertificates } }",
+    "getUserProgressConnection": (
+        "query($u: Int!) { getUserProgressConnection(userId: $u, first: 5) "
+        "{ pageInfo { endCursor } } }"
+    ),
+    "getUserAchievementsConnection": (
+        "query($u: Int!) { getUserAchievementsConnection(userId: $u, first: 5) "
+        "{ pageInfo { endCursor } } }"
+    ),
+    "getUserCertificatesConnection": (
+        "query($u: Int!) { getUserCertificatesConnection(userId: $u, first: 2) "
+        "{ pageInfo { endCursor } } }"
+    ),
+    "leaderboard(courseId)": (
+        "{ leaderboard(metric: TIME_SPENT, courseId: 3, limit: 10) { userId } }"
+    ),
+}
+
+# Second pages, fetched with the end cursor of the first
+CONNECTIONS = (
+    "getUserProgressConnection",
+    "getUserAchievementsConnection",
+    "getUserCertificatesConnection",
+)
+
+Statement = Tuple[str, Any]
+
+
+async def _seed(first_user_id: int, users: int, courses: int) -> None:
+    last_user_id = first_user_id + users - 1
+    params = {"first": first_user_id, "last": last_user_id, "courses": courses}
+    async with AsyncSessionLocal() as db_session:
+        await db_session.execute(text("""
+            INSERT INTO progresses (user_id, course_id, status, completion_percentage,
+                                    total_time_spent, last_accessed_at)
+            SELECT u, c,
+                   (ARRAY['NOT_STARTED', 'IN_PROGRESS', 'COMPLETED'])[1 + (u + c) % 3]::progressstatus,
+                   (u + c) % 101, 60 * c, now() - make_interval(mins => u + c)
+            FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) u,
+                 generate_series(1, CAST(:courses AS integer)) c
+        """), params)
+        await db_session.execute(text("""
+            INSERT INTO achievements (user_id, achievement_type, achievement_name, earned_at)
+            SELECT u, 'type_' || a, 'Achievement ' || a, now() - make_interval(hours => a)
+            FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) u,
+                 generate_series(1, CAST(:courses AS integer)) a
+        """), params)
+        await db_session.execute(text("""
+            INSERT INTO course_certificates (certificate_id, user_id, course_id, completion_time,
+                                             digital_signature, earned_at)
+            SELECT gen_random_uuid()::text, u, c, 3600, md5(u || ':' || c),
+                   now() - make_interval(days => c)
+            FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) u,
+                 generate_series(1, CAST(:courses AS integer), 4) c
+        """), params)
+        await StatisticsService.reconcile(
+            db_session, list(range(first_user_id, last_user_id + 1))
+        )
+        await db_session.commit()
+
+    # Committed, or the statistics are rolled back with the transaction
+    async with engine.begin() as conn:
+        for table in TABLES:
+            await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def _cleanup(first_user_id: int, last_user_id: int) -> None:
+    async with AsyncSessionLocal() as db_session:
+        for model in (Progress, Achievement, CourseCertificate, UserStatistics):
+            await db_session.execute(
+                delete(model).where(model.user_id.between(first_user_id, last_user_id))
+            )
+        await db_session.commit()
+
+
+async def _capture(query: str, variables: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Statement]]:
+    """Execute ``query`` and return its data and the statements it issued."""
+    statements: List[Statement] = []
+
+    def record(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with AsyncSessionLocal() as db_session:
+            # Bypass the result cache so every lookup reaches the database
+            loaders = Loaders(db_session, cache=ResultCache(None, ttl=0))
+            context = {"db_session": db_session, "loaders": loaders}
+            result = await schema.execute(query, variable_values=variables, context_value=context)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    if result.errors:
+        raise RuntimeError(result.errors)
+    assert result.data is not None
+    return result.data, statements
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _explain(statements: List[Statement]) -> Tuple[List[str], List[str]]:
+    """Return the indexes and the sequentially scanned tables of ``statements``."""
+    indexes: List[str] = []
+    seq_scans: List[str] = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for node in _plan_nodes(plan[0]["Plan"]):
+                if "Index Name" in node:
+                    indexes.append(node["Index Name"])
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in TABLES:
+                    seq_scans.append(node["Relation Name"])
+    return indexes, seq_scans
+
+
+async def check_plans(users: int, courses: int, first_user_id: int) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Seed, run every query and return ``name: (indexes, seq scanned tables)``."""
+    last_user_id = first_user_id + users - 1
+    user_id = first_user_id + users // 2
+    plans: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    try:
+        await _cleanup(first_user_id, last_user_id)
+        await _seed(first_user_id, users, courses)
+
+        checks: List[Tuple[str, str, Dict[str, Any]]] = [
+            (name, query, {"u": user_id}) for name, query in QUERIES.items()
+        ]
+        for name in CONNECTIONS:
+            data, _ = await _capture(QUERIES[name], {"u": user_id})
+            cursor = data[name]["pageInfo"]["endCursor"]
+            query = QUERIES[name].replace("first:", f'after: "{cursor}", first:')
+            checks.append((f"{name}(after)", query, {"u": user_id}))
+
+        for name, query, variables in checks:
+            _, statements = await _capture(query, variables)
+            plans[name] = await _explain(statements)
+    finally:
+        await _cleanup(first_user_id, last_user_id)
+
+    return plans
+
+
+async def run(users: int, courses: int, first_user_id: int) -> bool:
+    ok = True
+    for name, (indexes, seq_scans) in (await check_plans(users, courses, first_user_id)).items():
+        if seq_scans:
+            ok = False
+        status = "FAIL" if seq_scans else "ok"
+        detail = f"seq scan on {', '.join(seq_scans)}" if seq_scans else ", ".join(indexes)
+        print(f"{status:>4}  {name:<36} {detail}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=20, help="Courses and achievements per user")
+    parser.add_argument("--first-user-id", type=int, default=900_000_000)
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args.users, args.courses, args.first_user_id)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Seed a reproducible data set of users x courses for benchmarks.
+
+Rows are drawn from a ``random.Random`` seeded with ``--seed`` and dated
+relative to a fixed base time, so the same arguments give the same rows,
+down to the certificate ids (and signatures, for the same
+``CERTIFICATE_SIGNING_KEY``; without one they are random). Every user has a progress row per course,
+completed courses have a certificate, and users have the achievements the
+rules award for their counters. The ``user_statistics`` rollup is rebuilt
+from them. The SHA-256 printed at the end covers the generated rows, except
+the signatures.
+
+Usage::
+
+    python -m benchmarks.seed_data [--users 10000] [--courses 20] [--seed 1]
+    python -m benchmarks.seed_data --users 10000 --cleanup
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from asyncpg import BitString
+from sqlalchemy import delete, text
+
+from app.core.certificate_signing import new_signature
+from app.db.session import AsyncSessionLocal, engine
+from app.models.achievement import Achievement
+from app.models.certificate import CourseCertificate
+from app.models.progress import Progress
+from app.models.user_statistics import UserStatistics
+from app.services.achievement_service import achievement_rules
+from app.services.statistics_service import StatisticsService
+
+FIRST_USER_ID = 900_000_000
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# Lessons in every seeded course
+LESSONS = 20
+
+PROGRESS_COLUMNS = (
+    "user_id", "course_id", "status", "started_at", "completed_at", "last_accessed_at",
+    "completion_percentage", "total_time_spent", "completed_lessons", "lesson_count",
+)
+CERTIFICATE_COLUMNS = (
+    "certificate_id", "user_id", "course_id", "earned_at", "expires_at", "final_score",
+    "grade", "completion_time", "digital_signature",
+)
+ACHIEVEMENT_COLUMNS = ("user_id", "achievement_type", "achievement_name", "description", "earned_at")
+
+# Users written and rebuilt per transaction
+CHUNK_USERS = 1000
+
+Row = Tuple[Any, ...]
+
+
+@dataclass
+class UserRows:
+    progresses: List[Row] = field(default_factory=list)
+    certificates: List[Row] = field(default_factory=list)
+    achievements: List[Row] = field(default_factory=list)
+
+
+def _grade(score: float) -> str:
+    for threshold, grade in ((90, "A"), (80, "B"), (70, "C")):
+        if score >= threshold:
+            return grade
+    return "D"
+
+
+def _user_rows(rng: random.Random, user_id: int, courses: int, base_time: datetime) -> UserRows:
+    rows = UserRows()
+    counters = {"total_completed_courses": 0, "total_certificates": 0, "total_time_spent": 0,
+                "total_completed_lessons": 0}
+    last_active = base_time - timedelta(days=365)
+
+    for course_id in range(1, courses + 1):
+        draw = rng.random()
+        if draw < 0.3:
+            status, done = "COMPLETED", LESSONS
+        elif draw < 0.8:
+            status, done = "IN_PROGRESS", rng.randint(1, LESSONS - 1)
+        else:
+            status, done = "NOT_STARTED", 0
+
+        lessons = sorted(rng.sample(range(LESSONS), done))
+        bits = (
+            BitString("".join("1" if i in lessons else "0" for i in range(lessons[-1] + 1)))
+            if lessons else None
+        )
+        time_spent = done * rng.randint(300, 1800)
+        started_at = base_time - timedelta(days=rng.randint(1, 365), seconds=rng.randint(0, 86399))
+        last_accessed_at = started_at + timedelta(seconds=time_spent + rng.randint(0, 86400 * 30))
+        completed_at = last_accessed_at if status == "COMPLETED" else None
+        rows.progresses.append((
+            user_id, course_id, status, started_at if done else None, completed_at, last_accessed_at,
+            done * 100.0 / LESSONS, time_spent, bits, LESSONS if done else None,
+        ))
+        counters["total_time_spent"] += time_spent
+        counters["total_completed_lessons"] += done
+        last_active = max(last_active, last_accessed_at)
+
+        if completed_at is not None:
+            score = round(rng.uniform(60.0, 100.0), 1)
+            certificate: Dict[str, Any] = {
+                "certificate_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "user_id": user_id,
+                "course_id": course_id,
+                "earned_at": completed_at,
+                "expires_at": completed_at + timedelta(days=730) if rng.random() < 0.2 else None,
+                "final_score": score,
+                "grade": _grade(score),
+                "completion_time": time_spent / 3600.0,
+            }
+            certificate["digital_signature"] = new_signature(certificate)
+            rows.certificates.append(tuple(certificate[name] for name in CERTIFICATE_COLUMNS))
+            counters["total_completed_courses"] += 1
+            counters["total_certificates"] += 1
+
+    for rule in achievement_rules.crossed(None, counters):
+        rows.achievements.append((
+            user_id, rule.achievement_type, rule.achievement_name, rule.description, last_active,
+        ))
+    return rows
+
+
+def generate(
+    seed: int, first_user_id: int, users: int, courses: int, base_time: datetime = BASE_TIME
+) -> Iterator[UserRows]:
+    """The rows of each user in turn; the same arguments give the same rows."""
+    rng = random.Random(seed)
+    for user_id in range(first_user_id, first_user_id + users):
+        yield _user_rows(rng, user_id, courses, base_time)
+
+
+async def cleanup(first_user_id: int, users: int) -> None:
+    last_user_id = first_user_id + users - 1
+    async with AsyncSessionLocal() as db_session:
+        for model in (Progress, Achievement, CourseCertificate, UserStatistics):
+            await db_session.execute(
+                delete(model).where(model.user_id.between(first_user_id, last_user_id))
+            )
+        await db_session.commit()
+
+
+async def seed(
+    seed: int, first_user_id: int, users: int, courses: int, base_time: datetime = BASE_TIME
+) -> str:
+    """Replace the seeded users' rows; returns the SHA-256 of the generated rows."""
+    await cleanup(first_user_id, users)
+    digest = hashlib.sha256()
+    generated = generate(seed, first_user_id, users, courses, base_time)
+
+    done = 0
+    while done < users:
+        chunk = [next(generated) for _ in range(min(CHUNK_USERS, users - done))]
+        progresses = [row for user in chunk for row in user.progresses]
+        certificates = [row for user in chunk for row in user.certificates]
+        achievements = [row for user in chunk for row in user.achievements]
+        for row in progresses + achievements:
+            digest.update(repr(row).encode())
+        for row in certificates:
+            digest.update(repr(row[:-1]).encode())
+
+        async with AsyncSessionLocal() as db_session:
+            conn = await db_session.connection()
+            raw_connection = (await conn.get_raw_connection()).driver_connection
+            assert raw_connection is not None
+            await raw_connection.copy_records_to_table(
+                "progresses", columns=PROGRESS_COLUMNS, records=progresses
+            )
+            await raw_connection.copy_records_to_table(
+                "course_certificates", columns=CERTIFICATE_COLUMNS, records=certificates
+            )
+            await raw_connection.copy_records_to_table(
+                "achievements", columns=ACHIEVEMENT_COLUMNS, records=achievements
+            )
+            user_ids = list(range(first_user_id + done, first_user_id + done + len(chunk)))
+            await StatisticsService.reconcile(db_session, user_ids)
+            await db_session.commit()
+        done += len(chunk)
+
+    async with engine.connect() as conn:
+        for table in ("progresses", "achievements", "course_certificates", "user_statistics"):
+            await conn.execute(text(f"ANALYZE {table}"))
+    return digest.hexdigest()
+
+
+async def run(seed_value: int, first_user_id: int, users: int, courses: int, remove: bool) -> None:
+    started = time.perf_counter()
+    if remove:
+        await cleanup(first_user_id, users)
+        print(f"Deleted users {first_user_id}..{first_user_id + users - 1}")
+        return
+    digest = await seed(seed_value, first_user_id, users, courses)
+    print(
+        f"Seeded {users} users x {courses} courses in {time.perf_counter() - started:.1f}s, "
+        f"sha256 {digest}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--courses", type=int, default=20, help="Courses per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--first-user-id", type=int, default=FIRST_USER_ID)
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded users instead")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.seed, args.first_user_id, args.users, args.courses, args.cleanup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Measure import time and time to first served request of the application.
+
+Each run starts a fresh ``uvicorn`` process against the database configured
+in ``.env`` and reports, from the moment the process is spawned:
+
+* ``live``: ``GET /`` first answers
+* ``ready``: ``GET /ready`` first answers 200
+* ``first``: the first GraphQL request has been served, with its latency
+* ``second``: latency of the same request sent again
+
+Settings can be overridden per run with ``--env``, e.g. to compare startup
+modes::
+
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --env db_pool_prewarm=5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+FIRST_REQUEST = """
+query($userId: Int!) {
+  getUserProgress(userId: $userId) { id courseId completionPercentage }
+  getUserStatistics(userId: $userId) { totalTimeSpentSeconds }
+}
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _get(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return int(response.status)
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return None
+
+
+def _post_graphql(url: str, user_id: int) -> float:
+    body = json.dumps({"query": FIRST_REQUEST, "variables": {"userId": user_id}}).encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        payload = json.loads(response.read())
+    if payload.get("errors"):
+        raise RuntimeError(payload["errors"])
+    return time.perf_counter() - start
+
+
+def _wait_for(url: str, spawned_at: float, timeout: float) -> float:
+    while _get(url) != 200:
+        if time.perf_counter() - spawned_at > timeout:
+            raise TimeoutError(f"{url} did not answer 200 within {timeout}s")
+        time.sleep(0.005)
+    return time.perf_counter() - spawned_at
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_boot(env: Dict[str, str], user_id: int, timeout: float) -> Dict[str, float]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    spawned_at = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        live = _wait_for(f"{base_url}/", spawned_at, timeout)
+        ready = _wait_for(f"{base_url}/ready", spawned_at, timeout)
+        first_latency = _post_graphql(f"{base_url}/graphql", user_id)
+        first = time.perf_counter() - spawned_at
+        second_latency = _post_graphql(f"{base_url}/graphql", user_id)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "live": live,
+        "ready": ready,
+        "first": first,
+        "first_latency": first_latency,
+        "second_latency": second_latency,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE")
+    args = parser.parse_args()
+
+    env = dict(os.environ, log_level="warning")
+    env.update(item.split("=", 1) for item in args.env)
+
+    imports: List[float] = []
+    boots: List[Dict[str, float]] = []
+    for _ in range(args.runs):
+        imports.append(measure_import(env))
+        boots.append(measure_boot(env, args.user_id, args.timeout))
+
+    def median_ms(values: List[float]) -> str:
+        return f"{statistics.median(values) * 1000:8.1f} ms"
+
+    print(f"median of {args.runs} runs")
+    print(f"  import app.main        {median_ms(imports)}")
+    print(f"  live (GET /)           {median_ms([b['live'] for b in boots])}")
+    print(f"  ready (GET /ready)     {median_ms([b['ready'] for b in boots])}")
+    print(f"  first request served   {median_ms([b['first'] for b in boots])}")
+    print(f"  first request latency  {median_ms([b['first_latency'] for b in boots])}")
+    print(f"  second request latency {median_ms([b['second_latency'] for b in boots])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Tests needing PostgreSQL run against ``TEST_DATABASE_URL`` and are skipped without it."""
+import asyncio
+import os
+from typing import Any, Callable, Coroutine, TypeVar
+
+import pytest
+from sqlalchemy.engine import make_url
+
+T = TypeVar("T")
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    # Before anything imports app.core.config, whose settings the engine is built from
+    url = make_url(TEST_DATABASE_URL)
+    os.environ.update(
+        DB_USER=url.username or "",
+        DB_PASSWORD=url.password or "",
+        DB_HOST=url.host or "localhost",
+        DB_PORT=str(url.port or 5432),
+        DB_NAME=url.database or "",
+    )
+
+
+@pytest.fixture(scope="session")
+def database() -> None:
+    """Migrate the database of ``TEST_DATABASE_URL`` to the head revision."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from alembic import command
+    from alembic.config import Config
+
+    from app.db.schema_version import ALEMBIC_INI
+
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+
+
+@pytest.fixture(scope="session")
+def run_db(database: None) -> Callable[[Coroutine[Any, Any, T]], T]:
+    """Run a coroutine using the app's engine in its own event loop.
+
+    The pooled connections belong to the loop that opened them, so the pool
+    is emptied before the loop closes.
+    """
+    from app.db.session import engine
+
+    def run(coro: Coroutine[Any, Any, T]) -> T:
+        async def main() -> T:
+            try:
+                return await coro
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
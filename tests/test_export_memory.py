@@ -0,0 +1,29 @@
+"""Streaming exports of a million rows keep the server's memory flat."""
+from typing import Dict
+
+import pytest
+
+ROWS = 1_000_000
+COURSE_ID = 900_000_000
+# Peak resident set size of the server process; buffering the export of a
+# million rows instead of streaming it takes several times as much
+MAX_RSS_MB = 200.0
+
+
+@pytest.fixture(scope="module")
+def exports(database: None) -> Dict[str, Dict[str, float]]:
+    from benchmarks.export_memory import measure_exports
+
+    return measure_exports(ROWS, COURSE_ID)
+
+
+@pytest.mark.parametrize("export_format, header_lines", [("ndjson", 0), ("csv", 1)])
+def test_export_streams_under_rss_ceiling(
+    exports: Dict[str, Dict[str, float]], export_format: str, header_lines: int
+) -> None:
+    result = exports[export_format]
+    assert result["lines"] == ROWS + header_lines
+    assert result["peak_rss_mb"] < MAX_RSS_MB, (
+        f"{export_format} export peaked at {result['peak_rss_mb']:.0f} MB "
+        f"(idle {exports['idle']['peak_rss_mb']:.0f} MB)"
+    )
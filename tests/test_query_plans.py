@@ -0,0 +1,48 @@
+"""Every read resolver is served by its index on a seeded dataset."""
+from typing import Any, Callable, Coroutine, Dict, List, Set, Tuple
+
+import pytest
+
+Plans = Dict[str, Tuple[List[str], List[str]]]
+
+# Indexes any of which may serve each query; lookups by user alone can use
+# any index leading with user_id
+BY_USER = {"idx_user_course_progress", "idx_progress_user_status", "idx_progress_user_last_accessed"}
+EXPECTED_INDEXES: Dict[str, Set[str]] = {
+    "getUserProgress": BY_USER,
+    "getUserProgress(courseId)": {"idx_user_course_progress"},
+    "getProgress": {"idx_user_course_progress"},
+    "getCompletedCourses": {"idx_progress_user_status"},
+    "getUserAchievements": {"idx_achievement_user_type", "idx_achievement_user_earned"},
+    "getUserAchievements(type)": {"idx_achievement_user_type"},
+    "getUserCertificates": {"idx_user_course_cert", "idx_cert_user_earned"},
+    "getCertificate": {"idx_user_course_cert"},
+    "getUserStatistics": {"user_statistics_pkey"},
+    "getUserProgressConnection": {"idx_progress_user_last_accessed"},
+    "getUserAchievementsConnection": {"idx_achievement_user_earned"},
+    "getUserCertificatesConnection": {"idx_cert_user_earned"},
+    "getUserProgressConnection(after)": {"idx_progress_user_last_accessed"},
+    "getUserAchievementsConnection(after)": {"idx_achievement_user_earned"},
+    "getUserCertificatesConnection(after)": {"idx_cert_user_earned"},
+    "leaderboard(courseId)": {"idx_progress_course_time_spent"},
+}
+
+
+@pytest.fixture(scope="module")
+def plans(run_db: Callable[[Coroutine[Any, Any, Plans]], Plans]) -> Plans:
+    # Imported once TEST_DATABASE_URL is known to be set; the benchmark
+    # module builds the schema and the engine on import
+    from benchmarks.query_plans import check_plans
+
+    return run_db(check_plans(users=2000, courses=20, first_user_id=900_000_000))
+
+
+def test_every_query_is_checked(plans: Plans) -> None:
+    assert set(plans) == set(EXPECTED_INDEXES)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_INDEXES))
+def test_query_uses_its_index(plans: Plans, name: str) -> None:
+    indexes, seq_scans = plans[name]
+    assert not seq_scans, f"{name} scans {', '.join(seq_scans)} sequentially"
+    assert EXPECTED_INDEXES[name] & set(indexes), f"{name} uses {', '.join(indexes) or 'no index'}"
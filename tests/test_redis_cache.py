@@ -0,0 +1,135 @@
+"""RedisCache against a local fake server speaking the commands it needs."""
+import asyncio
+from typing import Dict, List, Optional, Set
+
+import pytest
+
+from app.cache.backends import RedisCache, RedisProtocolError
+
+
+class FakeRedis:
+    """``GET``/``MGET``/``SET``/``DEL`` over RESP2, one task per connection.
+
+    ``held`` commands wait for ``release`` before being answered, and ``SET``
+    of a key in ``failing`` replies with an error.
+    """
+
+    def __init__(self) -> None:
+        self.store: Dict[str, str] = {}
+        self.failing: Set[str] = set()
+        self.held: Set[str] = set()
+        self.received = asyncio.Event()
+        self.release = asyncio.Event()
+        self._server: Optional[asyncio.Server] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}/0"
+
+    async def stop(self) -> None:
+        assert self._server is not None
+        self._server.close()
+
+    @staticmethod
+    def _bulk(value: Optional[str]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        data = value.encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[str]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    def _reply(self, command: str, args: List[str]) -> bytes:
+        if command == "MGET":
+            return b"*%d\r\n" % len(args) + b"".join(self._bulk(self.store.get(key)) for key in args)
+        if command == "GET":
+            return self._bulk(self.store.get(args[0]))
+        if command == "SET":
+            if args[0] in self.failing:
+                return b"-ERR OOM command not allowed\r\n"
+            if "NX" in args[2:] and args[0] in self.store:
+                return b"$-1\r\n"
+            self.store[args[0]] = args[1]
+            return b"+OK\r\n"
+        if command == "DEL":
+            return b":%d\r\n" % (self.store.pop(args[0], None) is not None)
+        return b"-ERR unknown command\r\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (command := await self._read_command(reader)) is not None:
+                name, args = command[0].upper(), command[1:]
+                if self.held.intersection(args):
+                    self.received.set()
+                    await self.release.wait()
+                writer.write(self._reply(name, args))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _cache() -> tuple[FakeRedis, RedisCache]:
+    server = FakeRedis()
+    cache = RedisCache(await server.start(), key_prefix="")
+    server.store.update({"user:A": "progress of A", "user:B": "progress of B"})
+    return server, cache
+
+
+def test_cancelled_read_does_not_leak_its_reply() -> None:
+    async def run() -> None:
+        server, cache = await _cache()
+        server.held.add("user:A")
+        read = asyncio.create_task(cache.get_many(["user:A"]))
+        await server.received.wait()
+        read.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await read
+        # The reply to the cancelled read arrives after it gave up
+        server.release.set()
+        await asyncio.sleep(0.01)
+
+        assert await cache.get_many(["user:B"]) == ["progress of B"]
+        await cache.close()
+        await server.stop()
+
+    asyncio.run(run())
+
+
+def test_error_reply_inside_pipeline_does_not_leak_the_rest() -> None:
+    async def run() -> None:
+        server, cache = await _cache()
+        server.failing.add("user:A")
+        # SET fails; the GET queued behind it is answered with A's value
+        with pytest.raises(RedisProtocolError):
+            await cache.set_if_absent("user:A", "new")
+
+        assert await cache.get_many(["user:B"]) == ["progress of B"]
+        await cache.close()
+        await server.stop()
+
+    asyncio.run(run())
+
+
+def test_pipelined_commands() -> None:
+    async def run() -> None:
+        server, cache = await _cache()
+        await cache.set_many({"user:C": "progress of C"}, ttl=60)
+        assert await cache.get_many(["user:A", "user:C", "user:D"]) == ["progress of A", "progress of C", None]
+        assert await cache.set_if_absent("user:A", "new") == "progress of A"
+        await cache.delete("user:A")
+        assert await cache.get_many(["user:A"]) == [None]
+        await cache.close()
+        await server.stop()
+
+    asyncio.run(run())